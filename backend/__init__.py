@@ -1,2 +1,16 @@
 # Backend package initializer for importability
-__all__ = ["main", "data", "models", "agent_langgraph"]
+import os
+
+__all__ = ["main", "data", "models", "agent_langgraph", "llm_cache"]
+
+# Modules read their settings from the environment at import, so a .env file
+# is applied here, once, before any of them load. python-dotenv is only
+# imported when there is a file to read.
+for _path in (
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".env"),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env"),
+):
+    if os.path.isfile(_path):
+        from dotenv import load_dotenv
+
+        load_dotenv(_path)
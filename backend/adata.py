@@ -0,0 +1,51 @@
+"""
+Async data access for the API.
+
+There is no async SQLite driver in the stack. Instead, each coroutine here
+runs the matching `data` function on a dedicated pool of DB_WORKERS threads.
+Each thread keeps its own pooled connection (see data._conn), which is the
+same one-thread-per-connection model aiosqlite uses. Endpoints await these
+rather than occupying Starlette's shared threadpool, so dashboard reads keep
+their own threads while agent passes run on the job pool (see jobs.py).
+"""
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from . import data
+
+DB_WORKERS = int(os.getenv("DB_WORKERS", 8))
+
+_executor = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="db")
+
+
+async def run(fn: Callable, *args, **kwargs) -> Any:
+    """Await fn(*args, **kwargs) on the DB pool, keeping the caller's context (trace id)."""
+    ctx = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(_executor, functools.partial(ctx.run, fn, *args, **kwargs))
+
+
+def _async(name: str):
+    # Looked up per call, so swapping or patching data functions is honoured
+    async def wrapper(*args, **kwargs):
+        return await run(getattr(data, name), *args, **kwargs)
+
+    wrapper.__name__ = wrapper.__qualname__ = name
+    wrapper.__doc__ = f"data.{name}, awaited on the DB pool."
+    return wrapper
+
+
+current_version = _async("current_version")
+get_approval = _async("get_approval")
+list_approvals_page = _async("list_approvals_page")
+save_approval = _async("save_approval")
+approve_approvals = _async("approve_approvals")
+log_audit = _async("log_audit")
+list_audit = _async("list_audit")
+list_audit_for_approval = _async("list_audit_for_approval")
+list_changes = _async("list_changes")
+get_agent_job = _async("get_agent_job")
+list_agent_jobs = _async("list_agent_jobs")
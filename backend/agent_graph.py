@@ -0,0 +1,148 @@
+"""
+Small graph runner for the SLA agent.
+
+A graph is an ordered list of named nodes compiled once and shared by every
+request. Each node takes the item's state dict and returns updates to merge
+into it. A node can end an item early by setting "done"; later nodes then
+skip it.
+
+Nodes come in three flavours:
+- per-item nodes run for one state at a time. In a batch, consecutive
+  per-item nodes run as one chain per item on the caller's executor.
+- a node with a `batch` function is run once over all live states of a batch
+  (e.g. a vectorized classifier); `invoke` still uses its per-item function.
+- `ordered` nodes run serially in input order after everything before them
+  (e.g. persisting, so audit rows keep selection order).
+
+Every node run is reported to the graph's hooks as (node name, seconds,
+states it ran over), so timings can be collected without touching the nodes.
+"""
+import importlib
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+State = Dict[str, Any]
+Hook = Callable[[str, float, List[State]], None]
+
+
+@dataclass
+class Node:
+    name: str
+    fn: Callable[[State], Optional[State]]
+    batch: Optional[Callable[[List[State]], List[Optional[State]]]] = None
+    ordered: bool = False
+
+
+class NodeTimings:
+    """Hook that keeps call counts and total/max seconds per node."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.nodes: Dict[str, Dict[str, float]] = {}
+
+    def __call__(self, name: str, seconds: float, states: List[State]):
+        with self._lock:
+            s = self.nodes.setdefault(name, {"runs": 0, "items": 0, "total_s": 0.0, "max_s": 0.0})
+            s["runs"] += 1
+            s["items"] += len(states)
+            s["total_s"] += seconds
+            s["max_s"] = max(s["max_s"], seconds)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                name: {**s, "total_s": round(s["total_s"], 4), "max_s": round(s["max_s"], 4),
+                       "avg_item_ms": round(1000 * s["total_s"] / s["items"], 3) if s["items"] else 0.0}
+                for name, s in self.nodes.items()
+            }
+
+
+class CompiledGraph:
+    def __init__(self, nodes: List[Node], hooks: Optional[List[Hook]] = None):
+        if len({n.name for n in nodes}) != len(nodes):
+            raise ValueError("duplicate node names in agent graph")
+        self.nodes = list(nodes)
+        self.hooks: List[Hook] = list(hooks or [])
+
+    @property
+    def node_names(self) -> List[str]:
+        return [n.name for n in self.nodes]
+
+    def add_hook(self, hook: Hook):
+        self.hooks.append(hook)
+
+    def _report(self, name: str, seconds: float, states: List[State]):
+        for hook in self.hooks:
+            try:
+                hook(name, seconds, states)
+            except Exception as e:
+                print(f"⚠️ Agent graph hook failed: {e}")
+
+    def _run_node(self, node: Node, state: State):
+        start = time.perf_counter()
+        try:
+            update = node.fn(state)
+        finally:
+            self._report(node.name, time.perf_counter() - start, [state])
+        if update:
+            state.update(update)
+
+    def _run_chain(self, nodes: List[Node], state: State) -> State:
+        for node in nodes:
+            if state.get("done"):
+                break
+            self._run_node(node, state)
+        return state
+
+    def invoke(self, state: State) -> State:
+        """Run every node over one state (updated in place and returned)."""
+        return self._run_chain(self.nodes, state)
+
+    def batch(self, states: List[State], map_fn: Callable = map) -> List[State]:
+        """Run the graph over many states, returned in input order.
+
+        `map_fn` runs the per-item chains (e.g. an executor's map); ordered
+        nodes always run serially afterwards in input order.
+        """
+        i = 0
+        while i < len(self.nodes):
+            node = self.nodes[i]
+            live = [s for s in states if not s.get("done")]
+            if not live:
+                break
+            if node.batch is not None:
+                start = time.perf_counter()
+                updates = node.batch(live)
+                self._report(node.name, time.perf_counter() - start, live)
+                for s, update in zip(live, updates):
+                    if update:
+                        s.update(update)
+                i += 1
+            elif node.ordered:
+                for s in live:
+                    self._run_node(node, s)
+                i += 1
+            else:
+                chain = []
+                while i < len(self.nodes) and self.nodes[i].batch is None and not self.nodes[i].ordered:
+                    chain.append(self.nodes[i])
+                    i += 1
+                list(map_fn(lambda s: self._run_chain(chain, s), live))
+        return states
+
+
+def resolve_node(spec: str, registry: Dict[str, Node]) -> Node:
+    """A registered node name, or "package.module:attr" naming a Node (or a plain function)."""
+    if spec in registry:
+        return registry[spec]
+    if ":" not in spec:
+        raise ValueError(f"unknown agent graph node {spec!r} (known: {', '.join(registry)})")
+    module, attr = spec.split(":", 1)
+    obj = getattr(importlib.import_module(module), attr)
+    return obj if isinstance(obj, Node) else Node(attr, obj)
+
+
+def compile_graph(specs: List[str], registry: Dict[str, Node], hooks: Optional[List[Hook]] = None) -> CompiledGraph:
+    return CompiledGraph([resolve_node(s.strip(), registry) for s in specs if s.strip()], hooks)
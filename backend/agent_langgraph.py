@@ -1,56 +1,361 @@
 """
-LangGraph-based agent for SLA checks, reminders, and escalations.
+Graph-based agent for SLA checks, reminders, and escalations.
+
+The agent is a graph of nodes (classify -> compose -> generate -> notify ->
+persist, see agent_graph) compiled once at import and shared by the
+scheduler, POST /agent/run and the workers.
 """
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import contextvars
+import importlib.util
+import json
+import logging
 import os
-import requests
-from typing import Dict, Any
+import random
+import threading
+import time
+from typing import Dict, Any, List, Optional
 from .notifications import NotificationManager
+from .llm_cache import cache_key, default_cache
 from . import data
+from .directory import FALLBACK_RECIPIENT, directory
+from . import sla_batch
+from . import telemetry
+from .agent_graph import Node, NodeTimings, compile_graph
+
+# The openai SDK is slow to import, so it is only loaded when the first client is built.
+AZURE_AVAILABLE = importlib.util.find_spec("openai") is not None
+
+# Concurrency and resilience settings for LLM calls made during an agent pass.
+LLM_CONCURRENCY = int(os.getenv("AGENT_LLM_CONCURRENCY", 8))
+# Size of the shared agent pool; a pass asking for more workers is clamped to it.
+LLM_CONCURRENCY_MAX = max(LLM_CONCURRENCY, int(os.getenv("AGENT_LLM_CONCURRENCY_MAX", 32)))
+LLM_TIMEOUT_SECONDS = float(os.getenv("AZURE_OPENAI_TIMEOUT", 30))
+LLM_MAX_RETRIES = int(os.getenv("AZURE_OPENAI_MAX_RETRIES", 3))
+LLM_BACKOFF_SECONDS = float(os.getenv("AZURE_OPENAI_BACKOFF", 1.0))
+LLM_BACKOFF_MAX_SECONDS = 30.0
+# Batch mode (AGENT_LLM_BATCH=1): prompts per request, the request's token
+# budget (prompt + reply) and the reply tokens reserved per item.
+LLM_BATCH_ENABLED = os.getenv("AGENT_LLM_BATCH", "0") == "1"
+LLM_BATCH_MAX_ITEMS = int(os.getenv("AGENT_LLM_BATCH_MAX_ITEMS", 20))
+LLM_BATCH_TOKEN_BUDGET = int(os.getenv("AGENT_LLM_BATCH_TOKEN_BUDGET", 8000))
+LLM_BATCH_ITEM_TOKENS = int(os.getenv("AGENT_LLM_BATCH_ITEM_TOKENS", 250))
+# Keep-alive connections per client; at least one per concurrent agent worker.
+AZURE_POOL_SIZE = int(os.getenv("AZURE_OPENAI_POOL_SIZE", max(LLM_CONCURRENCY, 10)))
+
+# Process-wide clients keyed on (endpoint, deployment, version). Each holds its
+# own HTTP connection pool, so TLS sessions survive across calls.
+_clients: Dict[tuple, "_SharedClient"] = {}
+_clients_lock = threading.Lock()
+client_stats = {"created": 0, "reused": 0, "reloaded": 0}
+
+
+class _SharedClient:
+    """A cached client, how many calls are using it, and whether a newer config replaced it."""
+
+    def __init__(self, api_key: str, client):
+        self.api_key = api_key
+        self.client = client
+        self.in_flight = 0
+        self.retired = False
+
+# Rewrites keyed on (deployment, prompt); see llm_cache. None disables caching.
+response_cache = default_cache()
+
+
+def set_response_cache(cache):
+    """Swap the response cache (anything with get/set/stats), or None to disable it."""
+    global response_cache
+    response_cache = cache
+
+
+def _azure_config() -> Optional[Dict[str, str]]:
+    config = {
+        "api_key": os.getenv("AZURE_OPENAI_API_KEY"),
+        "endpoint": os.getenv("AZURE_OPENAI_ENDPOINT"),
+        "deployment": os.getenv("AZURE_OPENAI_DEPLOYMENT"),
+        "version": os.getenv("AZURE_OPENAI_API_VERSION"),
+    }
+    return config if all(config.values()) else None
+
+
+def _new_client(config: Dict[str, str]):
+    from openai import AzureOpenAI, DefaultHttpxClient
+    from openai._constants import DEFAULT_CONNECTION_LIMITS
+
+    # Same Limits type the installed SDK uses, sized to our concurrency.
+    limits = type(DEFAULT_CONNECTION_LIMITS)(
+        max_connections=AZURE_POOL_SIZE,
+        max_keepalive_connections=AZURE_POOL_SIZE,
+    )
+    return AzureOpenAI(
+        api_key=config["api_key"],
+        api_version=config["version"],
+        azure_endpoint=config["endpoint"],
+        max_retries=0,
+        http_client=DefaultHttpxClient(limits=limits),
+    )
+
+
+def _acquire_client(config: Dict[str, str]) -> _SharedClient:
+    """Borrow the shared client for this configuration, creating it on first use; pair with _release_client.
+
+    The environment names one endpoint/deployment/version and key at a time,
+    so a new client supersedes every cached one. Superseded clients are
+    closed as soon as no call is using them, so calls already in flight on
+    other threads finish on the client they started with.
+    """
+    key = (config["endpoint"], config["deployment"], config["version"])
+    idle = []
+    with _clients_lock:
+        entry = _clients.get(key)
+        if entry is not None and entry.api_key == config["api_key"]:
+            client_stats["reused"] += 1
+        else:
+            client_stats["reloaded" if entry is not None else "created"] += 1
+            new = _SharedClient(config["api_key"], _new_client(config))
+            idle = _retire_clients()
+            _clients[key] = entry = new
+        entry.in_flight += 1
+    for old in idle:
+        old.client.close()
+    return entry
+
+
+def _release_client(entry: _SharedClient):
+    with _clients_lock:
+        entry.in_flight -= 1
+        close = entry.retired and entry.in_flight == 0
+    if close:
+        entry.client.close()
+
+
+def _retire_clients() -> List[_SharedClient]:
+    # Caller holds _clients_lock; returns the retired clients nobody is using
+    for entry in _clients.values():
+        entry.retired = True
+    idle = [entry for entry in _clients.values() if entry.in_flight == 0]
+    _clients.clear()
+    return idle
+
+
+def reset_azure_clients():
+    """Forget every cached client (e.g. on shutdown); each closes once its in-flight calls return."""
+    with _clients_lock:
+        idle = _retire_clients()
+    for entry in idle:
+        entry.client.close()
+
 
-try:
-    import langgraph as lg
-    LANGGRAPH_AVAILABLE = True
-except Exception:
-    LANGGRAPH_AVAILABLE = False
+def _retry_delay(error: Exception, attempt: int) -> Optional[float]:
+    """Seconds to wait before retrying a rate-limited call, or None if not rate limited."""
+    if getattr(error, "status_code", None) != 429:
+        return None
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    try:
+        return min(LLM_BACKOFF_MAX_SECONDS, float(retry_after))
+    except (TypeError, ValueError):
+        delay = min(LLM_BACKOFF_MAX_SECONDS, LLM_BACKOFF_SECONDS * 2 ** attempt)
+        return delay * random.uniform(0.5, 1.0)
+
+
+SYSTEM_PROMPT = "You are a professional administrative assistant for a purchasing committee. Your job is to rewrite raw technical status alerts into polite but firm professional notifications."
+
+
+def _complete(client, config: Dict[str, str], messages: List[Dict[str, str]], max_tokens: int, **kwargs) -> str:
+    """One chat completion under the timeout and 429 retry policy; raises once retries run out."""
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        start = time.perf_counter()
+        try:
+            response = client.chat.completions.create(
+                model=config["deployment"],
+                messages=messages,
+                max_completion_tokens=max_tokens,
+                temperature=0.7,
+                timeout=LLM_TIMEOUT_SECONDS,
+                **kwargs,
+            )
+            text = response.choices[0].message.content.strip()
+            _observe_llm(time.perf_counter() - start, "ok", attempt, getattr(response, "usage", None))
+            return text
+        except Exception as e:
+            delay = _retry_delay(e, attempt)
+            _observe_llm(time.perf_counter() - start, "error" if delay is None else "rate_limited", attempt)
+            if delay is not None and attempt < LLM_MAX_RETRIES:
+                time.sleep(delay)
+                continue
+            raise
 
-try:
-    from openai import AzureOpenAI
-    AZURE_AVAILABLE = True
-except ImportError:
-    AZURE_AVAILABLE = False
 
 def generate_llm_text(prompt: str) -> str:
-    """Generate text using Azure OpenAI if configured, otherwise return the template prompt."""
-    api_key = os.getenv("AZURE_OPENAI_API_KEY")
-    endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
-    deployment = os.getenv("AZURE_OPENAI_DEPLOYMENT")
-    version = os.getenv("AZURE_OPENAI_API_VERSION")
+    """Generate text using Azure OpenAI if configured, otherwise return the template prompt.
 
-    if not all([api_key, endpoint, deployment, version]) or not AZURE_AVAILABLE:
+    Each call is bounded by LLM_TIMEOUT_SECONDS; HTTP 429 responses are retried
+    up to LLM_MAX_RETRIES times, honouring Retry-After or backing off
+    exponentially with jitter. Successful rewrites are stored in
+    `response_cache`, so identical prompts skip the API on later ticks.
+    """
+    config = _azure_config()
+    if config is None or not AZURE_AVAILABLE:
         # Falls back to standard prompt template if Azure is not configured
         return prompt
 
+    cache = response_cache
+    key = cache_key(config["deployment"], prompt)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
     try:
-        client = AzureOpenAI(
-            api_key=api_key,
-            api_version=version,
-            azure_endpoint=endpoint
-        )
-
-        response = client.chat.completions.create(
-            model=deployment,
-            messages=[
-                {"role": "system", "content": "You are a professional administrative assistant for a purchasing committee. Your job is to rewrite raw technical status alerts into polite but firm professional notifications."},
+        entry = _acquire_client(config)
+        try:
+            text = _complete(entry.client, config, [
+                {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": f"Please rewrite this notification into a professional message: {prompt}"}
-            ],
-            max_completion_tokens=500,
-            temperature=0.7
-        )
-        return response.choices[0].message.content.strip()
+            ], 500)
+        finally:
+            _release_client(entry)
     except Exception as e:
         print(f"⚠️ Azure OpenAI Error: {e}")
         return prompt
+    if cache is not None:
+        cache.set(key, text)
+    return text
+
+
+# --- batch mode ---------------------------------------------------------------
+# Many prompts per request: the system prompt is sent once per chunk and the
+# model answers with one JSON object holding a message per item.
+
+BATCH_INSTRUCTIONS = (
+    " You will receive a JSON array of alerts, each with a \"key\" and a \"text\"."
+    " Rewrite every alert on its own into a professional message and answer with"
+    " only a JSON object of the form {\"messages\": [{\"key\": ..., \"message\": ...}]}"
+    " that contains every key exactly once."
+)
+
+
+def _estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English prose; only used to size batches
+    return len(text) // 4 + 1
+
+
+def _pack_prompts(prompts: List[str]) -> List[List[int]]:
+    """Indexes of `prompts` grouped into requests within LLM_BATCH_MAX_ITEMS and LLM_BATCH_TOKEN_BUDGET.
+
+    The budget covers the instructions, every item's text and the reply
+    tokens reserved per item (LLM_BATCH_ITEM_TOKENS).
+    """
+    base = _estimate_tokens(SYSTEM_PROMPT + BATCH_INSTRUCTIONS)
+    chunks: List[List[int]] = []
+    current: List[int] = []
+    used = base
+    for i, prompt in enumerate(prompts):
+        cost = _estimate_tokens(prompt) + 10 + LLM_BATCH_ITEM_TOKENS
+        if current and (len(current) >= LLM_BATCH_MAX_ITEMS or used + cost > LLM_BATCH_TOKEN_BUDGET):
+            chunks.append(current)
+            current, used = [], base
+        current.append(i)
+        used += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _parse_batch_reply(text: str, keys: List[str]) -> Dict[str, str]:
+    """Messages by key from a batch reply; malformed, empty or unknown entries are left out."""
+    text = text.strip()
+    if text.startswith("```"):
+        # Tolerate a fenced ```json block
+        text = text.split("\n", 1)[-1].rsplit("```", 1)[0]
+    try:
+        payload = json.loads(text)
+    except ValueError:
+        return {}
+    items = payload.get("messages") if isinstance(payload, dict) else payload
+    if not isinstance(items, list):
+        return {}
+    wanted = set(keys)
+    out = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        key, message = str(item.get("key")), item.get("message")
+        if key in wanted and isinstance(message, str) and message.strip():
+            out[key] = message.strip()
+    return out
+
+
+def _generate_chunk(client, config: Dict[str, str], prompts: List[str]) -> List[str]:
+    """One batched request. Items missing from the reply get a per-item call; a failed request keeps the templates."""
+    keys = [str(i) for i in range(len(prompts))]
+    telemetry.LLM_BATCH_ITEMS.observe(len(prompts))
+    try:
+        text = _complete(client, config, [
+            {"role": "system", "content": SYSTEM_PROMPT + BATCH_INSTRUCTIONS},
+            {"role": "user", "content": json.dumps([{"key": k, "text": p} for k, p in zip(keys, prompts)])},
+        ], LLM_BATCH_ITEM_TOKENS * len(prompts), response_format={"type": "json_object"})
+    except Exception as e:
+        print(f"⚠️ Azure OpenAI Error: {e}")
+        telemetry.LLM_BATCH_FALLBACKS.inc(len(prompts), reason="template")
+        return list(prompts)
+    parsed = _parse_batch_reply(text, keys)
+    missing = len(keys) - len(parsed)
+    if missing:
+        telemetry.LLM_BATCH_FALLBACKS.inc(missing, reason="single")
+        telemetry.log_event("llm_batch_fallback", logging.WARNING, items=len(keys), missing=missing)
+    return [parsed[k] if k in parsed else generate_llm_text(p) for k, p in zip(keys, prompts)]
+
+
+def generate_llm_texts(prompts: List[str], concurrency: Optional[int] = None) -> List[str]:
+    """generate_llm_text for many prompts, packed into few requests (see _pack_prompts).
+
+    Cached rewrites are reused and new ones cached per prompt, as in the
+    single-item path. Chunks go out in parallel on the agent's LLM pool, up
+    to `concurrency` at a time (default LLM_CONCURRENCY). Results are in
+    input order.
+    """
+    config = _azure_config()
+    if config is None or not AZURE_AVAILABLE:
+        return list(prompts)
+
+    cache = response_cache
+    keys = [cache_key(config["deployment"], p) for p in prompts]
+    out = [cache.get(k) if cache is not None else None for k in keys]
+    todo = [i for i, text in enumerate(out) if text is None]
+    if not todo:
+        return out
+
+    try:
+        entry = _acquire_client(config)
+    except Exception as e:
+        print(f"⚠️ Azure OpenAI Error: {e}")
+        return [prompts[i] if text is None else text for i, text in enumerate(out)]
+    chunks = [[todo[j] for j in chunk] for chunk in _pack_prompts([prompts[i] for i in todo])]
+    try:
+        # list(): the serial map is lazy, and every chunk must finish before the release
+        replies = list(_map_fn(concurrency, len(chunks))(lambda chunk: _generate_chunk(entry.client, config, [prompts[i] for i in chunk]), chunks))
+    finally:
+        _release_client(entry)
+    for chunk, texts in zip(chunks, replies):
+        for i, text in zip(chunk, texts):
+            out[i] = text
+            if cache is not None and text != prompts[i]:
+                cache.set(keys[i], text)
+    return out
+
+def _observe_llm(seconds: float, outcome: str, attempt: int, usage=None):
+    telemetry.LLM_SECONDS.observe(seconds, outcome=outcome)
+    tokens = {}
+    if usage is not None:
+        tokens = {"prompt": usage.prompt_tokens, "completion": usage.completion_tokens}
+        for kind, count in tokens.items():
+            telemetry.LLM_TOKENS.observe(count, kind=kind)
+    telemetry.log_event("llm_call", outcome=outcome, attempt=attempt, duration_ms=round(1000 * seconds, 1),
+                        **{f"{kind}_tokens": count for kind, count in tokens.items()})
 
 def _build_prompt_for_reminder(approval: Dict[str, Any]) -> str:
     return (
@@ -67,74 +372,245 @@ def _build_prompt_for_escalation(approval: Dict[str, Any]) -> str:
     )
 
 def _get_recipient_for_escalation(level: int) -> str:
-    """Helper to find the email for a specific escalation level."""
-    role_map = {0: "reviewer", 1: "chair", 2: "finance"}
-    user = data.get_user(role_map.get(level, "reviewer"))
-    return user["email"] if user else "admin@example.com"
-
-class SimpleLangGraph:
-    def __init__(self):
-        pass
-
-    def run(self, state: Dict[str, Any]) -> Dict[str, Any]:
-        pending = state["pending_hours"]
-        sla = state["sla_hours"]
-        result = {"action": "no_action", "message": None}
-        if pending < 0.5 * sla:
-            return result
-        
-        if 0.5 * sla <= pending <= sla:
-            prompt = _build_prompt_for_reminder(state["approval_raw"])
-            text = generate_llm_text(prompt)
-            
-            # NOTIFY
-            NotificationManager.notify_all(
-                title=f"📅 SLA Reminder: {state['approval_raw']['vendor_name']}",
-                message=text,
-                recipient_email=_get_recipient_for_escalation(0)
-            )
+    """Helper to find the email(s) for a specific escalation level.
 
-            result["action"] = "send_reminder"
-            result["message"] = text
-            return result
-            
-        if pending > sla:
-            prompt = _build_prompt_for_escalation(state["approval_raw"])
-            text = generate_llm_text(prompt)
-            
-            # NOTIFY
-            current_level = state.get("escalation_level", 0)
-            next_level = min(2, current_level + 1)
-            NotificationManager.notify_all(
-                title=f"🚨 SLA BREACH: {state['approval_raw']['vendor_name']}",
-                message=text,
-                recipient_email=_get_recipient_for_escalation(next_level)
-            )
+    Every user holding the level's role (see directory.ESCALATION_ROLES) is
+    addressed, as one comma-separated To header.
+    """
+    emails = directory.recipients_for_level(level)
+    return ", ".join(emails) if emails else FALLBACK_RECIPIENT
 
-            result["action"] = "escalate"
-            result["message"] = text
-            return result
-            
-        return result
+# --- graph nodes ------------------------------------------------------------
+# Each takes the item state ({"approval", "now", ...}) and returns updates.
 
-def run_once(approval: Dict[str, Any], now: datetime) -> Dict[str, Any]:
-    submitted = datetime.fromisoformat(approval["submitted_at"])
-    pending = (now - submitted).total_seconds() / 3600.0
-    state = {
-        "approval_id": approval["id"],
-        "pending_hours": pending,
-        "sla_hours": approval["sla_hours"],
-        "escalation_level": approval.get("escalation_level", 0),
-        "approval_raw": approval,
+def classify_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Decide the action from the SLA thresholds; no_action ends the item here."""
+    action = sla_batch.classify_one(state["approval"], state["now"])
+    return {"action": action, "done": action == "no_action"}
+
+
+def classify_batch(states: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    actions = sla_batch.classify([s["approval"] for s in states], states[0]["now"]) if states else []
+    return [{"action": action, "done": action == "no_action"} for action in actions]
+
+
+def compose_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the prompt, title and recipient for the chosen action."""
+    a = state["approval"]
+    if state["action"] == "send_reminder":
+        return {
+            "kind": "reminder",
+            "prompt": _build_prompt_for_reminder(a),
+            "title": f"📅 SLA Reminder: {a['vendor_name']}",
+            "recipient": _get_recipient_for_escalation(0),
+        }
+    next_level = min(2, a.get("escalation_level", 0) + 1)
+    return {
+        "kind": "escalation",
+        "prompt": _build_prompt_for_escalation(a),
+        "title": f"🚨 SLA BREACH: {a['vendor_name']}",
+        "recipient": _get_recipient_for_escalation(next_level),
+        "escalation_level": next_level,
     }
 
-    if LANGGRAPH_AVAILABLE:
+
+def generate_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    return {"message": generate_llm_text(state["prompt"])}
+
+
+def generate_batch(states: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Every state of a pass carries the pass's concurrency
+    concurrency = states[0].get("concurrency") if states else None
+    return [{"message": text} for text in generate_llm_texts([s["prompt"] for s in states], concurrency)]
+
+
+def _pass_now(state: Dict[str, Any]) -> datetime:
+    # The pass's `now` plus the time spent since it started, so a virtual
+    # clock (see simulate.py) and the real one both line up with the lease.
+    return state["now"] + timedelta(seconds=time.monotonic() - state["started"])
+
+
+def notify_node(state: Dict[str, Any]) -> None:
+    uow = state.get("uow")
+    if uow is not None and not uow.hold(state["approval"]["id"], _pass_now(state)):
+        # The lease expired mid-pass and another pass may own the item now
+        state["done"] = True
+        return
+    NotificationManager.notify_all(
+        title=state["title"],
+        message=state.get("message") or state["prompt"],
+        recipient_email=state.get("recipient"),
+        kind=state["kind"],
+    )
+
+
+def persist_node(state: Dict[str, Any]) -> None:
+    """Record the transition and audit row in the pass's UnitOfWork (if any)."""
+    uow = state.get("uow")
+    if uow is None:
+        return
+    a, now = state["approval"], state["now"]
+    message = state.get("message") or state.get("prompt")
+    if state["action"] == "send_reminder":
+        a["last_reminder_at"] = now.isoformat()
+        uow.update_state(a["id"], a["status"], a["escalation_level"], a["last_reminder_at"],
+                         reminder_due_at=data.sla_deadlines(a["submitted_at"], a["sla_hours"], a["last_reminder_at"])[0])
+        uow.log_audit({
+            "timestamp": now.isoformat(),
+            "approval_id": a["id"],
+            "actor": "agent",
+            "action": "reminder",
+            "message": message,
+            "meta": {"trace_id": state.get("trace_id")},
+        })
+    elif state["action"] == "escalate":
+        a["escalation_level"] = state.get("escalation_level", min(2, a.get("escalation_level", 0) + 1))
+        a["status"] = "ESCALATED"
+        uow.update_state(a["id"], a["status"], a["escalation_level"], a["last_reminder_at"])
+        uow.log_audit({
+            "timestamp": now.isoformat(),
+            "approval_id": a["id"],
+            "actor": "agent",
+            "action": "escalation",
+            "message": message,
+            "meta": {"escalation_level": a["escalation_level"], "trace_id": state.get("trace_id")},
+        })
+
+
+NODES = {
+    "classify": Node("classify", classify_node, batch=classify_batch),
+    "compose": Node("compose", compose_node),
+    "generate": Node("generate", generate_node, batch=generate_batch if LLM_BATCH_ENABLED else None),
+    "notify": Node("notify", notify_node),
+    "persist": Node("persist", persist_node, ordered=True),
+}
+
+# Node list per deployment: drop "generate" for template-only messages, drop
+# "notify" for a dry run, or add "package.module:attr" custom nodes.
+AGENT_GRAPH_NODES = os.getenv("AGENT_GRAPH_NODES", "classify,compose,generate,notify,persist").split(",")
+
+
+
+def _observe_node(name: str, seconds: float, states: List[Dict[str, Any]]):
+    """Graph hook: node histogram, plus per-item timings kept on the state for the action log."""
+    telemetry.AGENT_NODE_SECONDS.observe(seconds, node=name)
+    ms = round(1000 * seconds, 3)
+    for s in states:
+        s.setdefault("timings_ms", {})[name] = ms
+
+
+node_timings = NodeTimings()
+graph = compile_graph(AGENT_GRAPH_NODES, NODES, hooks=[node_timings, _observe_node])
+
+
+def set_graph(nodes: List[str]):
+    """Recompile the shared graph from node specs (keeps the timing hooks)."""
+    global graph
+    graph = compile_graph(nodes, NODES, hooks=graph.hooks)
+
+
+def _initial_state(approval: Dict[str, Any], now: datetime, uow=None, concurrency: Optional[int] = None) -> Dict[str, Any]:
+    return {"approval": approval, "now": now, "uow": uow, "concurrency": concurrency, "action": "no_action", "message": None,
+            "trace_id": telemetry.current_trace_id(), "started": time.monotonic()}
+
+
+def _result(state: Dict[str, Any]) -> Dict[str, Any]:
+    message = state.get("message") or state.get("prompt") if state["action"] != "no_action" else None
+    return {"action": state["action"], "message": message}
+
+
+def run_once(approval: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+    """Run the graph for one approval without persisting; returns {"action", "message"}."""
+    return _result(graph.invoke(_initial_state(approval, now)))
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    # One long-lived pool at LLM_CONCURRENCY_MAX, so worker threads (and their
+    # pooled DB connections) are reused across passes whatever their
+    # concurrency; _map_fn bounds each pass's share of it.
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=LLM_CONCURRENCY_MAX, thread_name_prefix="agent-llm")
+        return _executor
+
+
+def _map_fn(concurrency: Optional[int], items: int):
+    workers = min(concurrency or LLM_CONCURRENCY, LLM_CONCURRENCY_MAX)
+    if workers <= 1 or items <= 1:
+        return map
+    executor = _get_executor()
+
+    def run(fn, states):
+        # At most `workers` of this call's items in flight, however many other
+        # passes share the pool. Pool threads don't inherit contextvars; give
+        # each item the caller's (trace id).
+        slots = threading.Semaphore(workers)
+        futures = []
+        for s in states:
+            slots.acquire()
+            future = executor.submit(contextvars.copy_context().run, fn, s)
+            future.add_done_callback(lambda _: slots.release())
+            futures.append(future)
+        return [f.result() for f in futures]
+
+    return run
+
+
+def run_many(approvals: List[Dict[str, Any]], now: datetime, concurrency: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Run the agent over many approvals with up to `concurrency` LLM calls in flight.
+
+    Results are returned in the order of `approvals`, so callers can write
+    audit rows deterministically. concurrency=1 runs serially. Nothing is
+    persisted.
+    """
+    states = [_initial_state(a, now, concurrency=concurrency) for a in approvals]
+    return [_result(s) for s in graph.batch(states, _map_fn(concurrency, len(states)))]
+
+
+def run_agent_pass(
+    approvals: List[Dict[str, Any]],
+    now: datetime,
+    concurrency: Optional[int] = None,
+    lease_token: Optional[str] = None,
+    lease_seconds: Optional[float] = None,
+) -> List[Dict[str, Any]]:
+    """Run the agent graph over `approvals` and persist the outcome.
+
+    Reminders and escalations update the approval dicts in place and are
+    written, with their audit rows, in one transaction. Returns the actions
+    taken as {"id", "action"} dicts in input order.
+
+    With `lease_token` the approvals must have been claimed with it (see
+    data.claim_due_approvals): each item's lease is checked, and renewed for
+    `lease_seconds`, before its notification goes out, items whose lease ran
+    out are skipped, transitions only land while the lease is held, and every
+    lease is released when the pass ends.
+    """
+    start = time.perf_counter()
+    with telemetry.trace(telemetry.current_trace_id()):
         try:
-            sm = SimpleLangGraph()
-            return sm.run(state)
-        except Exception:
-            sm = SimpleLangGraph()
-            return sm.run(state)
-    else:
-        sm = SimpleLangGraph()
-        return sm.run(state)
+            with data.UnitOfWork(lease_token, lease_seconds) as uow:
+                states = [_initial_state(a, now, uow, concurrency) for a in approvals]
+                graph.batch(states, _map_fn(concurrency, len(states)))
+        finally:
+            if lease_token:
+                data.release_leases([a["id"] for a in approvals], lease_token)
+        lost = set(uow.lost)
+        names = {"send_reminder": "reminder", "escalate": "escalation"}
+        actions = []
+        for s in states:
+            if s["action"] not in names or s["approval"]["id"] in lost:
+                continue
+            action = names[s["action"]]
+            actions.append({"id": s["approval"]["id"], "action": action})
+            telemetry.AGENT_ACTIONS.inc(action=action)
+            telemetry.log_event("agent_action", approval_id=s["approval"]["id"], action=action, timings_ms=s.get("timings_ms", {}))
+        seconds = time.perf_counter() - start
+        telemetry.AGENT_PASS_SECONDS.observe(seconds)
+        telemetry.log_event("agent_pass", items=len(approvals), actions=len(actions), lost=len(lost), duration_ms=round(1000 * seconds, 1))
+    return actions
@@ -0,0 +1,70 @@
+"""
+Standalone agent worker for sharded deployments.
+
+Runs beside (or instead of) the API's in-process scheduler. Each worker claims
+the due approvals of its shard in batches under a lease, runs the agent over
+them and sleeps when nothing is due. Workers on the same shard, or an API
+process running /agent/run at the same time, are kept apart by the leases.
+
+Usage:
+    python -m backend.agent_worker --shard 0 --shards 4
+"""
+import argparse
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from . import data
+from .agent_langgraph import run_agent_pass
+from .scheduler import LEASE_SECONDS, _utcnow
+
+
+def drain(
+    shard: int = 0,
+    shards: int = 1,
+    batch: int = 500,
+    concurrency: Optional[int] = None,
+    clock: Callable[[], datetime] = _utcnow,
+) -> Dict[str, int]:
+    """Process the due approvals of one shard until none are left; returns counts."""
+    totals = {"passes": 0, "claimed": 0, "reminder": 0, "escalation": 0}
+    while True:
+        now = clock()
+        token = uuid.uuid4().hex
+        approvals = data.claim_due_approvals(now, token, LEASE_SECONDS, shard, shards, limit=batch)
+        if not approvals:
+            return totals
+        actions = run_agent_pass(approvals, now, concurrency=concurrency, lease_token=token, lease_seconds=LEASE_SECONDS)
+        totals["passes"] += 1
+        totals["claimed"] += len(approvals)
+        for act in actions:
+            totals[act["action"]] += 1
+        if not actions:
+            # Claimed rows that the agent left alone would be claimed again forever
+            return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the SLA agent over one shard of the due approvals.")
+    parser.add_argument("--shard", type=int, default=0)
+    parser.add_argument("--shards", type=int, default=1)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--poll-seconds", type=float, default=30.0)
+    parser.add_argument("--once", action="store_true", help="drain once and exit")
+    args = parser.parse_args()
+    if not 0 <= args.shard < args.shards:
+        parser.error("--shard must be in [0, --shards)")
+
+    data.init_db()
+    while True:
+        totals = drain(args.shard, args.shards, args.batch)
+        if totals["passes"]:
+            print(f"🤖 Shard {args.shard}/{args.shards}: {totals}")
+        if args.once:
+            return
+        time.sleep(args.poll_seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Audit retention and archival.
+
+Rows older than the retention window are moved out of the live audit table
+into gzip-compressed JSONL segments (one per month per archival run) under
+AUDIT_ARCHIVE_DIR. Each segment is registered in audit_archive_segments, and
+audit_archive_index records which approvals it covers, so a single approval's
+timeline only opens the segments that mention it.
+
+Run by hand with:
+    python -m backend.audit_archive --older-than-days 90
+or set AUDIT_RETENTION_DAYS to have the app archive on a timer.
+"""
+import argparse
+import gzip
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from itertools import groupby
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from . import data
+
+AUDIT_RETENTION_DAYS = float(os.getenv("AUDIT_RETENTION_DAYS", 0))  # 0 = keep everything live
+AUDIT_RETENTION_INTERVAL_HOURS = float(os.getenv("AUDIT_RETENTION_INTERVAL_HOURS", 24))
+AUDIT_ARCHIVE_BATCH = int(os.getenv("AUDIT_ARCHIVE_BATCH", 50_000))
+
+
+def archive_dir() -> str:
+    return os.getenv("AUDIT_ARCHIVE_DIR") or os.path.join(os.path.dirname(os.path.abspath(data.DB_PATH)), "audit_archive")
+
+
+def _write_segment(name: str, rows: List[Dict[str, Any]]):
+    path = os.path.join(archive_dir(), name)
+    tmp = path + ".tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        for r in rows:
+            f.write(json.dumps(r, separators=(",", ":")) + "\n")
+    with open(tmp, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def read_segment(name: str) -> Iterator[Dict[str, Any]]:
+    with gzip.open(os.path.join(archive_dir(), name), "rt", encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def archive_audit(older_than_days: float, now: Optional[datetime] = None) -> Dict[str, int]:
+    """Move audit rows older than `older_than_days` into archive segments.
+
+    The segment file is written and fsynced before its rows are deleted, and
+    the delete happens in the same transaction that registers the segment, so
+    a crash leaves at worst an unregistered (ignored) file, never lost rows.
+    """
+    now = now or datetime.now(timezone.utc)
+    cutoff = (now - timedelta(days=older_than_days)).isoformat()
+    os.makedirs(archive_dir(), exist_ok=True)
+    stamp = now.strftime("%Y%m%dT%H%M%S")
+    segments = archived = 0
+    while True:
+        rows = data.fetch_audit_for_archive(cutoff, AUDIT_ARCHIVE_BATCH)
+        if not rows:
+            break
+        for month, group in groupby(rows, key=lambda r: r["timestamp"][:7]):
+            group = list(group)
+            name = f"audit-{month}-{stamp}-{segments:04d}.jsonl.gz"
+            _write_segment(name, group)
+            data.commit_archive_segment(name, group, now.isoformat())
+            segments += 1
+            archived += len(group)
+    return {"segments": segments, "rows": archived}
+
+
+def archived_timeline(approval_id: str) -> List[Dict[str, Any]]:
+    """Archived audit rows for one approval, oldest first."""
+    rows = [
+        {k: v for k, v in r.items() if k != "version"}
+        for name in data.archive_segments_for_approval(approval_id)
+        for r in read_segment(name)
+        if r["approval_id"] == approval_id
+    ]
+    return sorted(rows, key=lambda r: (r["timestamp"], r["id"]))
+
+
+def list_archived_page(limit: int, after: Optional[Tuple[str, int]] = None) -> Tuple[List[Dict[str, Any]], Optional[Tuple[str, int]]]:
+    """Archived rows older than `after`, newest first, with the same cursor shape as the live stream."""
+    collected: List[Dict[str, Any]] = []
+    segments = data.list_archive_segments(before=after[0] if after else None)
+    for i, seg in enumerate(segments):
+        for r in read_segment(seg["path"]):
+            if after is None or (r["timestamp"], r["id"]) < tuple(after):
+                collected.append(r)
+        collected.sort(key=lambda r: (r["timestamp"], r["id"]), reverse=True)
+        del collected[limit + 1:]
+        # Stop once no later segment can hold a row newer than what we keep
+        if len(collected) > limit and (i + 1 == len(segments) or segments[i + 1]["max_timestamp"] < collected[-1]["timestamp"]):
+            break
+    next_after = None
+    if len(collected) > limit:
+        collected = collected[:limit]
+        next_after = (collected[-1]["timestamp"], collected[-1]["id"]) if collected else tuple(after)
+    return [{k: v for k, v in r.items() if k != "version"} for r in collected], next_after
+
+
+def list_audit_stream(limit: int, after: Optional[Tuple[str, int]] = None, include_archived: bool = False):
+    """Live audit page, continuing into the archive once the live rows run out."""
+    items, next_after = data.list_audit_page(limit, after)
+    if next_after or not include_archived:
+        return items, next_after
+    last = (items[-1]["timestamp"], items[-1]["id"]) if items else after
+    more, next_after = list_archived_page(limit - len(items), last)
+    return items + more, next_after
+
+
+_retention_thread: Optional[threading.Thread] = None
+_retention_stop = threading.Event()
+
+
+def _retention_loop():
+    while not _retention_stop.is_set():
+        try:
+            result = archive_audit(AUDIT_RETENTION_DAYS)
+            if result["rows"]:
+                print(f"🗄️ Archived {result['rows']} audit rows into {result['segments']} segments")
+        except Exception as e:
+            print(f"❌ Audit archival failed: {e}")
+        _retention_stop.wait(AUDIT_RETENTION_INTERVAL_HOURS * 3600)
+
+
+def start_retention():
+    global _retention_thread
+    if AUDIT_RETENTION_DAYS <= 0 or _retention_thread is not None:
+        return
+    _retention_stop.clear()
+    _retention_thread = threading.Thread(target=_retention_loop, name="audit-retention", daemon=True)
+    _retention_thread.start()
+
+
+def stop_retention():
+    global _retention_thread
+    _retention_stop.set()
+    if _retention_thread is not None:
+        _retention_thread.join(5)
+        _retention_thread = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive old audit rows into compressed segments.")
+    parser.add_argument("--older-than-days", type=float, default=AUDIT_RETENTION_DAYS or 90)
+    args = parser.parse_args()
+    data.init_db()
+    print(json.dumps(archive_audit(args.older_than_days)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Bulk import and approval.
+
+Uploads are read as a stream of NDJSON objects or CSV rows (header first;
+`approvers` is a JSON array in its cell), validated one by one with
+ApprovalRequest, and written in chunks of BULK_CHUNK_SIZE rows, each chunk a
+single transaction of executemany inserts. Every input row gets a result, so
+a bad line is reported without failing the rest of the upload.
+
+Imports only create PENDING approvals: approving and escalating go through
+the API and the agent, which write the audit trail for them.
+"""
+import csv
+import json
+import os
+import time
+from datetime import timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from . import data
+from .models import ApprovalRequest
+
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", 1000))
+
+
+async def _lines(stream: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    buf = b""
+    async for chunk in stream:
+        buf += chunk
+        *complete, buf = buf.split(b"\n")
+        for line in complete:
+            yield line.decode("utf-8-sig").rstrip("\r")
+    if buf:
+        yield buf.decode("utf-8-sig").rstrip("\r")
+
+
+async def iter_records(stream: AsyncIterator[bytes], fmt: str) -> AsyncIterator[Tuple[int, Any]]:
+    """Yield (line number, parsed record) pairs; the record is an Exception if it failed to parse."""
+    header = None
+    pending, start = "", 0
+    line_no = 0
+    async for line in _lines(stream):
+        line_no += 1
+        if fmt == "csv":
+            # A quoted cell may contain newlines: keep joining until the quotes balance
+            pending = f"{pending}\n{line}" if pending else line
+            start = start or line_no
+            if pending.count('"') % 2:
+                continue
+            record, pending, at, start = pending, "", start, 0
+            if not record.strip():
+                continue
+            values = next(csv.reader([record]))
+            if header is None:
+                header = [h.strip() for h in values]
+                continue
+            if len(values) != len(header):
+                yield at, ValueError(f"expected {len(header)} columns, got {len(values)}")
+                continue
+            row = {k: (v if v != "" else None) for k, v in zip(header, values)}
+            try:
+                if row.get("approvers") is not None:
+                    row["approvers"] = json.loads(row["approvers"])
+            except ValueError as e:
+                yield at, ValueError(f"approvers: {e}")
+                continue
+            yield at, {k: v for k, v in row.items() if v is not None}
+        else:
+            if not line.strip():
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except ValueError as e:
+                yield line_no, e
+    if pending:
+        yield start, ValueError("unterminated quoted field")
+
+
+def _to_record(obj: ApprovalRequest, default_requester: Optional[str]) -> Dict[str, Any]:
+    item = obj.model_dump()
+    for key in ("submitted_at", "last_reminder_at"):
+        if item[key] is not None:
+            ts = item[key]
+            item[key] = (ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts.astimezone(timezone.utc)).isoformat()
+    item["requester"] = item["requester"] or default_requester
+    return item
+
+
+def validate(line: int, raw: Any, default_requester: Optional[str] = None) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+    """Validate one parsed record; returns (approval or None, result row)."""
+    if isinstance(raw, Exception):
+        return None, {"line": line, "status": "error", "error": str(raw)}
+    try:
+        obj = ApprovalRequest.model_validate(raw)
+    except ValidationError as e:
+        errors = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+        return None, {"line": line, "id": raw.get("id") if isinstance(raw, dict) else None, "status": "error", "error": errors}
+    if obj.status != "PENDING":
+        return None, {"line": line, "id": obj.id, "status": "error", "error": f"status: only PENDING approvals can be imported, got {obj.status}"}
+    return _to_record(obj, default_requester), {"line": line, "id": obj.id, "status": "created"}
+
+
+def import_chunk(batch: List[Tuple[Optional[Dict[str, Any]], Dict[str, Any]]], timestamp: str) -> List[Dict[str, Any]]:
+    """Write the valid approvals of one chunk; returns the approvals actually created."""
+    valid = [(obj, result) for obj, result in batch if obj is not None]
+    if not valid:
+        return []
+    objs = [obj for obj, _ in valid]
+    audit = [
+        {
+            "timestamp": timestamp,
+            "approval_id": o["id"],
+            "actor": o["requester"] or "system",
+            "action": "created",
+            "message": f"Approval imported for {o['vendor_name']} ${o['amount']}",
+        }
+        for o in objs
+    ]
+    inserted = data.insert_approvals(objs, audit)
+    for (_, result), ok in zip(valid, inserted):
+        if not ok:
+            result.update(status="error", error="approval id already exists")
+    return [o for o, ok in zip(objs, inserted) if ok]
+
+
+def summary(results: List[Dict[str, Any]], ok_status: str, started: float) -> Dict[str, Any]:
+    elapsed = time.perf_counter() - started
+    succeeded = sum(1 for r in results if r["status"] == ok_status)
+    return {
+        "rows": len(results),
+        ok_status: succeeded,
+        "failed": len(results) - succeeded,
+        "seconds": round(elapsed, 3),
+        "rows_per_s": round(len(results) / elapsed, 1) if elapsed > 0 else None,
+        "results": results,
+    }
@@ -0,0 +1,96 @@
+"""
+Change feed for dashboards.
+
+Every write bumps a global change version (see data.bump_change_version).
+A single VersionWatcher task polls that O(1) value and wakes all Server-Sent
+Events subscribers when it moves, so idle dashboards cost one tiny query per
+poll interval per process, however many are connected.
+"""
+import asyncio
+import json
+import os
+from typing import Optional
+
+from . import adata
+
+CHANGE_FEED_POLL_SECONDS = float(os.getenv("CHANGE_FEED_POLL_SECONDS", 1.0))
+CHANGE_FEED_HEARTBEAT_SECONDS = 15.0
+
+
+class VersionWatcher:
+    def __init__(self, poll_seconds: float = CHANGE_FEED_POLL_SECONDS):
+        self.poll_seconds = poll_seconds
+        self.version = 0
+        self._cond: Optional[asyncio.Condition] = None
+        self._started: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _ensure_started(self):
+        # Started synchronously, so concurrent callers share one task; they
+        # all wait for its first read of the version
+        if self._task is None or self._task.done():
+            self._cond = asyncio.Condition()
+            self._started = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        await self._started.wait()
+
+    async def _run(self):
+        try:
+            self.version = await adata.current_version()
+        except Exception as e:
+            print(f"❌ Change feed poll failed: {e}")
+        self._started.set()
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            try:
+                version = await adata.current_version()
+            except Exception as e:
+                print(f"❌ Change feed poll failed: {e}")
+                continue
+            if version != self.version:
+                self.version = version
+                async with self._cond:
+                    self._cond.notify_all()
+
+    async def wait_past(self, since: int, timeout: float) -> int:
+        """Wait until the version exceeds `since` (or `timeout`), then return it."""
+        await self._ensure_started()
+        async with self._cond:
+            try:
+                await asyncio.wait_for(self._cond.wait_for(lambda: self.version > since), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.version
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+watcher = VersionWatcher()
+
+
+def _event(version: int) -> str:
+    return f"event: change\nid: {version}\ndata: {json.dumps({'version': version})}\n\n"
+
+
+async def event_stream(request, since: Optional[int]):
+    """SSE body: one `change` event per version bump, with keep-alive comments."""
+    await watcher._ensure_started()
+    version = watcher.version if since is None else since
+    yield "retry: 3000\n\n"
+    if watcher.version > version:
+        version = watcher.version
+        yield _event(version)
+    while not await request.is_disconnected():
+        latest = await watcher.wait_past(version, CHANGE_FEED_HEARTBEAT_SECONDS)
+        if latest > version:
+            version = latest
+            yield _event(version)
+        else:
+            yield ": keep-alive\n\n"
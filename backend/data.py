@@ -1,21 +1,155 @@
 import sqlite3
-from datetime import datetime
-from typing import List, Dict, Any, Optional
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Optional, Tuple
 import json
 import os
+import zlib
 
-DB_PATH = os.path.join(os.path.dirname(__file__), "approvals.db")
+from .telemetry import timed_db
 
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # optional; the stdlib decoder gives the same result, slower
+    _loads = json.loads
 
-def _conn():
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+DB_PATH = os.getenv("APPROVALS_DB_PATH", os.path.join(os.path.dirname(__file__), "approvals.db"))
+
+# Connection tuning. WAL lets dashboard reads run while the agent writes, and
+# synchronous=NORMAL only fsyncs at checkpoints instead of on every commit.
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", -64 * 1024)),  # negative = KiB
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,
+    # REPLACE deletes the old row first; this makes that delete fire the rollup triggers
+    "recursive_triggers": "ON",
+}
+# Prepared statements kept per connection, keyed on the SQL text.
+STATEMENT_CACHE_SIZE = 256
+
+_local = threading.local()
+_pool_lock = threading.Lock()
+_pool: List[sqlite3.Connection] = []
+_generation = 0
+
+
+def shard_of(approval_id: str, shards: int) -> int:
+    """Stable shard number for an approval (same in every process, unlike hash())."""
+    return zlib.crc32(approval_id.encode()) % shards
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE)
     conn.row_factory = sqlite3.Row
+    conn.create_function("shard_of", 2, shard_of, deterministic=True)
+    for name, value in PRAGMAS.items():
+        conn.execute(f"PRAGMA {name}={value}")
+    return conn
+
+
+def _conn() -> sqlite3.Connection:
+    """Return this thread's connection, opening it on first use.
+
+    Each worker thread (uvicorn runs sync endpoints in a threadpool) keeps one
+    connection for its lifetime, so prepared statements and the page cache are
+    reused across requests. Rebinding DB_PATH opens a fresh connection.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.path != DB_PATH or _local.generation != _generation:
+        conn = _connect(DB_PATH)
+        with _pool_lock:
+            _pool.append(conn)
+            _local.generation = _generation
+        _local.conn, _local.path, _local.depth = conn, DB_PATH, 0
     return conn
 
 
-def init_db():
+@contextmanager
+def _transaction():
+    """Yield a cursor inside a transaction on this thread's connection.
+
+    Nested uses join the outermost transaction, which commits (or rolls back)
+    once on exit.
+    """
     conn = _conn()
-    cur = conn.cursor()
+    _local.depth += 1
+    try:
+        yield conn.cursor()
+        if _local.depth == 1:
+            conn.commit()
+    except Exception:
+        if _local.depth == 1:
+            conn.rollback()
+        raise
+    finally:
+        _local.depth -= 1
+
+
+def close_connections():
+    """Close every pooled connection (e.g. on shutdown or after swapping DB_PATH)."""
+    global _generation
+    with _pool_lock:
+        conns = list(_pool)
+        _pool.clear()
+        _generation += 1
+    for conn in conns:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+
+def _utc_iso(dt: datetime) -> str:
+    # Fixed-width UTC strings so deadline columns compare correctly as TEXT.
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc).isoformat(timespec="microseconds")
+
+
+# Minimum gap between reminders for one approval, as a fraction of its SLA.
+REMINDER_CADENCE_FRACTION = float(os.getenv("REMINDER_CADENCE_FRACTION", 0.25))
+
+
+def reminder_cadence_hours(sla_hours: float) -> float:
+    return REMINDER_CADENCE_FRACTION * sla_hours
+
+
+def next_reminder_due(reminded_at: datetime, sla_hours: float) -> str:
+    return _utc_iso(reminded_at + timedelta(hours=reminder_cadence_hours(sla_hours)))
+
+
+def sla_warning_at(submitted_at: str, sla_hours: float) -> str:
+    """The 50% SLA mark: the first reminder, and where GET /stats starts counting an item as "warning"."""
+    return _utc_iso(datetime.fromisoformat(submitted_at) + timedelta(hours=0.5 * sla_hours))
+
+
+def sla_deadlines(submitted_at: str, sla_hours: float, last_reminder_at: Optional[str] = None) -> Tuple[Optional[str], str]:
+    """Return (reminder_due_at, sla_deadline).
+
+    reminder_due_at is the 50% SLA mark, pushed back to one cadence after
+    `last_reminder_at` if a reminder was already sent; sla_deadline is the
+    100% mark. Reminders only go out strictly before the deadline, so once
+    the next one would land at or past it reminder_due_at is None and the
+    deadline (an escalation) is the next crossing.
+    """
+    reminder_due = sla_warning_at(submitted_at, sla_hours)
+    deadline = _utc_iso(datetime.fromisoformat(submitted_at) + timedelta(hours=sla_hours))
+    if last_reminder_at:
+        reminder_due = max(reminder_due, next_reminder_due(datetime.fromisoformat(last_reminder_at), sla_hours))
+    return (reminder_due if reminder_due < deadline else None), deadline
+
+
+def _migration_1(cur: sqlite3.Cursor):
+    """The schema as it stood before versioning.
+
+    Everything here only adds what is missing, so it also upgrades databases
+    created by builds that ran these steps on every start.
+    """
     cur.execute(
         """
         CREATE TABLE IF NOT EXISTS approvals (
@@ -61,6 +195,90 @@ def init_db():
     if "requester" not in columns:
         cur.execute("ALTER TABLE approvals ADD COLUMN requester TEXT")
 
+    # Migration: Stored SLA thresholds so the agent can select due work by index
+    for col in ("reminder_due_at", "sla_deadline"):
+        if col not in columns:
+            cur.execute(f"ALTER TABLE approvals ADD COLUMN {col} TEXT")
+    _backfill_sla_deadlines(cur)
+    # Keyset pagination indexes for GET /approvals (newest first, ties broken by id)
+    cur.execute("DROP INDEX IF EXISTS idx_approvals_status_submitted")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_approvals_status_submitted_id ON approvals(status, submitted_at, id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_approvals_submitted_id ON approvals(submitted_at, id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_approvals_requester_submitted_id ON approvals(requester, submitted_at, id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_approvals_status_reminder_due ON approvals(status, reminder_due_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_approvals_status_sla_deadline ON approvals(status, sla_deadline)")
+
+    # Migration: Change versions for conditional GETs and the change feed
+    cur.execute("CREATE TABLE IF NOT EXISTS change_version (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER)")
+    cur.execute("INSERT OR IGNORE INTO change_version VALUES (1, 0)")
+    if "version" not in columns:
+        cur.execute("ALTER TABLE approvals ADD COLUMN version INTEGER DEFAULT 0")
+    cur.execute("PRAGMA table_info(audit)")
+    if "version" not in [row[1] for row in cur.fetchall()]:
+        cur.execute("ALTER TABLE audit ADD COLUMN version INTEGER DEFAULT 0")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_approvals_version ON approvals(version)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_audit_version ON audit(version)")
+
+    # Migration: Agent leases, so concurrent passes never act on the same row
+    for col in ("lease_token", "lease_expires_at"):
+        if col not in columns:
+            cur.execute(f"ALTER TABLE approvals ADD COLUMN {col} TEXT")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_audit_timestamp_id ON audit(timestamp, id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_audit_approval_timestamp ON audit(approval_id, timestamp, id)")
+
+    # Archived audit segments (see audit_archive.py) and which approvals each covers
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS audit_archive_segments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            path TEXT,
+            min_timestamp TEXT,
+            max_timestamp TEXT,
+            row_count INTEGER,
+            created_at TEXT
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS audit_archive_index (
+            approval_id TEXT,
+            segment_id INTEGER,
+            PRIMARY KEY (approval_id, segment_id)
+        ) WITHOUT ROWID
+        """
+    )
+
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            key TEXT PRIMARY KEY,
+            response TEXT,
+            created_at REAL
+        )
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_created ON llm_cache(created_at)")
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            channel TEXT,
+            kind TEXT,
+            recipient TEXT,
+            title TEXT,
+            message TEXT,
+            status TEXT,
+            attempts INTEGER DEFAULT 0,
+            next_attempt_at REAL,
+            claimed_at REAL,
+            created_at REAL,
+            last_error TEXT
+        )
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_outbox_channel_status_next ON outbox(channel, status, next_attempt_at)")
+
     # Migration: Ensure email column exists
     cur.execute("PRAGMA table_info(users)")
     u_cols = [row[1] for row in cur.fetchall()]
@@ -73,127 +291,1011 @@ def init_db():
     cur.execute("INSERT OR IGNORE INTO users VALUES ('reviewer', 'pass123', 'APPROVER', 'reviewer@example.com')")
     cur.execute("INSERT OR IGNORE INTO users VALUES ('chair', 'pass123', 'CHAIR', 'chair@example.com')")
     cur.execute("INSERT OR IGNORE INTO users VALUES ('finance', 'pass123', 'FINANCE', 'finance@example.com')")
-    
-    conn.commit()
-    conn.close()
 
 
+
+def _migration_2(cur: sqlite3.Cursor):
+    """Agent passes run as background jobs (see jobs.py)."""
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS agent_jobs (
+            id TEXT PRIMARY KEY,
+            status TEXT,
+            submitted_at TEXT,
+            started_at TEXT,
+            finished_at TEXT,
+            trace_id TEXT,
+            params TEXT,
+            result TEXT,
+            error TEXT
+        )
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_agent_jobs_submitted ON agent_jobs(submitted_at)")
+
+
+# Upper bounds (hours) of the approval latency buckets; one more bucket holds the rest.
+# Changing them needs a rebuild_rollups().
+LATENCY_BUCKETS_HOURS = (1, 4, 8, 24, 48, 72, 168)
+_OPEN_STATUSES = "('PENDING', 'ESCALATED')"
+
+
+def _latency_bucket_sql(hours: str) -> str:
+    cases = " ".join(f"WHEN {hours} <= {b} THEN {i}" for i, b in enumerate(LATENCY_BUCKETS_HOURS))
+    return f"CASE {cases} ELSE {len(LATENCY_BUCKETS_HOURS)} END"
+
+
+def _cents_sql(amount: str) -> str:
+    # Rounded per row, the same way in the triggers and the rebuild, so both sum the same integers
+    return f"CAST(ROUND(COALESCE({amount}, 0) * 100) AS INTEGER)"
+
+
+def _seconds_sql(hours: str) -> str:
+    return f"CAST(ROUND({hours} * 3600) AS INTEGER)"
+
+
+def _rollup_approval_sql(row: str, sign: int) -> str:
+    """Statements adding (sign=1) or removing (sign=-1) one approvals row from the rollups."""
+    is_open = f"({row}.status IN {_OPEN_STATUSES})"
+    cents = _cents_sql(f"{row}.amount")
+    return f"""
+        INSERT INTO rollup_approval_counts(status, escalation_level, requester, n, amount_cents)
+        VALUES (COALESCE({row}.status, ''), COALESCE({row}.escalation_level, 0), COALESCE({row}.requester, ''), {sign}, {sign} * {cents})
+        ON CONFLICT(status, escalation_level, requester) DO UPDATE SET n = n + excluded.n, amount_cents = amount_cents + excluded.amount_cents;
+        INSERT INTO rollup_vendors(vendor_name, approvals, amount_cents, open, open_amount_cents, breaches)
+        VALUES (COALESCE({row}.vendor_name, ''), {sign}, {sign} * {cents}, {sign} * {is_open}, {sign} * {is_open} * {cents}, 0)
+        ON CONFLICT(vendor_name) DO UPDATE SET approvals = approvals + excluded.approvals, amount_cents = amount_cents + excluded.amount_cents,
+            open = open + excluded.open, open_amount_cents = open_amount_cents + excluded.open_amount_cents;
+    """
+
+
+def _rebuild_rollups(cur: sqlite3.Cursor):
+    cur.execute("DELETE FROM rollup_approval_counts")
+    cur.execute("DELETE FROM rollup_vendors")
+    cur.execute("DELETE FROM rollup_approval_latency")
+    cents = _cents_sql("amount")
+    cur.execute(
+        "INSERT INTO rollup_approval_counts(status, escalation_level, requester, n, amount_cents) "
+        f"SELECT COALESCE(status, ''), COALESCE(escalation_level, 0), COALESCE(requester, ''), COUNT(*), SUM({cents}) "
+        "FROM approvals GROUP BY 1, 2, 3"
+    )
+    cur.execute(
+        f"""
+        INSERT INTO rollup_vendors(vendor_name, approvals, amount_cents, open, open_amount_cents, breaches)
+        SELECT v.vendor_name, v.approvals, v.amount_cents, v.open, v.open_amount_cents, COALESCE(b.breaches, 0)
+        FROM (
+            SELECT COALESCE(vendor_name, '') AS vendor_name, COUNT(*) AS approvals, SUM({cents}) AS amount_cents,
+                   SUM(status IN {_OPEN_STATUSES}) AS open,
+                   COALESCE(SUM(CASE WHEN status IN {_OPEN_STATUSES} THEN {cents} END), 0) AS open_amount_cents
+            FROM approvals GROUP BY 1
+        ) v
+        LEFT JOIN (
+            SELECT COALESCE(a.vendor_name, '') AS vendor_name, COUNT(*) AS breaches
+            FROM audit au JOIN approvals a ON a.id = au.approval_id
+            WHERE au.action = 'escalation' GROUP BY 1
+        ) b ON b.vendor_name = v.vendor_name
+        """
+    )
+    cur.execute(
+        f"""
+        INSERT INTO rollup_approval_latency(day, bucket, n, seconds)
+        SELECT day, {_latency_bucket_sql("h")}, COUNT(*), SUM({_seconds_sql("h")})
+        FROM (
+            SELECT date(au.timestamp) AS day, (julianday(au.timestamp) - julianday(a.submitted_at)) * 24 AS h
+            FROM audit au JOIN approvals a ON a.id = au.approval_id
+            WHERE au.action = 'approved'
+        )
+        WHERE h IS NOT NULL GROUP BY 1, 2
+        """
+    )
+
+
+def _migration_3(cur: sqlite3.Cursor):
+    """Dashboard rollups (see rollups.py), kept current by triggers on every write path.
+
+    Amounts are summed as integer cents and latencies as integer seconds:
+    REAL running sums drift from a rebuild's SUM in the last digits, integer
+    ones stay equal to it (see check_rollups). The stored 50% SLA mark
+    (sla_warning_at) lets the SLA window be counted by index range.
+    """
+    cur.execute("PRAGMA table_info(approvals)")
+    if "sla_warning_at" not in [row[1] for row in cur.fetchall()]:
+        cur.execute("ALTER TABLE approvals ADD COLUMN sla_warning_at TEXT")
+    _backfill_sla_warnings(cur)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_approvals_status_sla_warning ON approvals(status, sla_warning_at)")
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS rollup_approval_counts (
+            status TEXT NOT NULL,
+            escalation_level INTEGER NOT NULL,
+            requester TEXT NOT NULL,
+            n INTEGER NOT NULL,
+            amount_cents INTEGER NOT NULL,
+            PRIMARY KEY (status, escalation_level, requester)
+        ) WITHOUT ROWID
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS rollup_vendors (
+            vendor_name TEXT PRIMARY KEY,
+            approvals INTEGER NOT NULL,
+            amount_cents INTEGER NOT NULL,
+            open INTEGER NOT NULL,
+            open_amount_cents INTEGER NOT NULL,
+            breaches INTEGER NOT NULL
+        ) WITHOUT ROWID
+        """
+    )
+    # Approvals approved per UTC day, by hours from submission to the "approved" audit row
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS rollup_approval_latency (
+            day TEXT NOT NULL,
+            bucket INTEGER NOT NULL,
+            n INTEGER NOT NULL,
+            seconds INTEGER NOT NULL,
+            PRIMARY KEY (day, bucket)
+        ) WITHOUT ROWID
+        """
+    )
+    triggers = (
+        f"""
+        CREATE TRIGGER IF NOT EXISTS rollup_approvals_insert AFTER INSERT ON approvals
+        BEGIN {_rollup_approval_sql("NEW", 1)} END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS rollup_approvals_delete AFTER DELETE ON approvals
+        BEGIN {_rollup_approval_sql("OLD", -1)} END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS rollup_approvals_update
+        AFTER UPDATE OF status, escalation_level, requester, vendor_name, amount ON approvals
+        WHEN OLD.status IS NOT NEW.status OR OLD.escalation_level IS NOT NEW.escalation_level
+          OR OLD.requester IS NOT NEW.requester OR OLD.vendor_name IS NOT NEW.vendor_name OR OLD.amount IS NOT NEW.amount
+        BEGIN {_rollup_approval_sql("OLD", -1)} {_rollup_approval_sql("NEW", 1)} END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS rollup_audit_escalation AFTER INSERT ON audit WHEN NEW.action = 'escalation'
+        BEGIN
+            UPDATE rollup_vendors SET breaches = breaches + 1
+            WHERE vendor_name = (SELECT COALESCE(vendor_name, '') FROM approvals WHERE id = NEW.approval_id);
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS rollup_audit_approved AFTER INSERT ON audit WHEN NEW.action = 'approved'
+        BEGIN
+            INSERT INTO rollup_approval_latency(day, bucket, n, seconds)
+            SELECT date(NEW.timestamp), {_latency_bucket_sql("h")}, 1, {_seconds_sql("h")}
+            FROM (SELECT (julianday(NEW.timestamp) - julianday(submitted_at)) * 24 AS h FROM approvals WHERE id = NEW.approval_id)
+            WHERE h IS NOT NULL
+            ON CONFLICT(day, bucket) DO UPDATE SET n = n + 1, seconds = seconds + excluded.seconds;
+        END
+        """,
+    )
+    # One execute per trigger: executescript would commit the migration transaction
+    for sql in triggers:
+        cur.execute(sql)
+    _rebuild_rollups(cur)
+
+
+# Applied in order by init_db; append new steps, never edit released ones.
+MIGRATIONS = [_migration_1, _migration_2, _migration_3]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def _backfill_sla_deadlines(cur: sqlite3.Cursor) -> int:
+    cur.execute("SELECT id, submitted_at, sla_hours, last_reminder_at FROM approvals WHERE sla_deadline IS NULL")
+    missing = cur.fetchall()
+    if missing:
+        cur.executemany(
+            "UPDATE approvals SET reminder_due_at = ?, sla_deadline = ? WHERE id = ?",
+            [(*sla_deadlines(r["submitted_at"], r["sla_hours"], r["last_reminder_at"]), r["id"]) for r in missing],
+        )
+    return len(missing)
+
+
+def _backfill_sla_warnings(cur: sqlite3.Cursor) -> int:
+    cur.execute("SELECT id, submitted_at, sla_hours FROM approvals WHERE sla_warning_at IS NULL")
+    missing = cur.fetchall()
+    if missing:
+        cur.executemany(
+            "UPDATE approvals SET sla_warning_at = ? WHERE id = ?",
+            [(sla_warning_at(r["submitted_at"], r["sla_hours"]), r["id"]) for r in missing],
+        )
+    return len(missing)
+
+
+@timed_db
+def backfill_sla_deadlines() -> int:
+    """Fill reminder_due_at / sla_deadline / sla_warning_at for rows written without them (e.g. raw seed scripts)."""
+    with _transaction() as cur:
+        _backfill_sla_warnings(cur)
+        return _backfill_sla_deadlines(cur)
+
+
+def _schema_version(cur: sqlite3.Cursor) -> int:
+    try:
+        return cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+    except sqlite3.OperationalError:  # no such table: never migrated
+        return 0
+
+
+@timed_db
+def init_db() -> int:
+    """Bring the database up to SCHEMA_VERSION; returns how many migrations ran.
+
+    A current database costs one read. Otherwise the pending migrations run
+    in one BEGIN IMMEDIATE transaction, so when several workers start
+    together only the first applies them and the rest find them done.
+    """
+    if _schema_version(_conn().cursor()) >= SCHEMA_VERSION:
+        return 0
+    with _transaction() as cur:
+        cur.execute("BEGIN IMMEDIATE")
+        cur.execute("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER PRIMARY KEY, applied_at TEXT)")
+        current = _schema_version(cur)
+        for version in range(current + 1, SCHEMA_VERSION + 1):
+            MIGRATIONS[version - 1](cur)
+            cur.execute("INSERT INTO schema_version VALUES (?, ?)", (version, _utc_iso(datetime.now(timezone.utc))))
+        return SCHEMA_VERSION - current
+
+
+def bump_change_version(cur: sqlite3.Cursor) -> int:
+    """Advance the global change version inside the caller's transaction.
+
+    Every write to approvals or audit stamps its rows with the new value, so
+    readers can ask for "everything after version N".
+    """
+    return cur.execute("UPDATE change_version SET version = version + 1 WHERE id = 1 RETURNING version").fetchone()[0]
+
+
+@timed_db
+def current_version() -> int:
+    r = _conn().execute("SELECT version FROM change_version WHERE id = 1").fetchone()
+    return r[0] if r else 0
+
+
+@timed_db
 def get_user(username: str) -> Optional[Dict[str, Any]]:
-    conn = _conn()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM users WHERE username = ?", (username,))
-    r = cur.fetchone()
-    conn.close()
+    r = _conn().execute("SELECT * FROM users WHERE username = ?", (username,)).fetchone()
     if not r:
         return None
     return dict(r)
 
 
-def save_approval(obj: Dict[str, Any]):
-    conn = _conn()
-    cur = conn.cursor()
-    cur.execute(
-        "REPLACE INTO approvals(id, vendor_name, amount, approvers, status, submitted_at, sla_hours, last_reminder_at, escalation_level, requester) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-        (
-            obj["id"],
-            obj["vendor_name"],
-            obj["amount"],
-            json.dumps(obj["approvers"]),
-            obj["status"],
-            obj["submitted_at"],
-            obj["sla_hours"],
-            obj.get("last_reminder_at"),
-            obj.get("escalation_level", 0),
-            obj.get("requester"),
-        ),
-    )
-    conn.commit()
-    conn.close()
-
-
-def list_approvals(requester_filter: Optional[str] = None) -> List[Dict[str, Any]]:
-    conn = _conn()
-    cur = conn.cursor()
-    if requester_filter:
-        cur.execute("SELECT * FROM approvals WHERE requester = ? ORDER BY submitted_at DESC", (requester_filter,))
-    else:
-        cur.execute("SELECT * FROM approvals ORDER BY submitted_at DESC")
-    rows = cur.fetchall()
-    conn.close()
-    out = []
-    for r in rows:
-        out.append(
-            {
-                "id": r["id"],
-                "vendor_name": r["vendor_name"],
-                "amount": r["amount"],
-                "approvers": json.loads(r["approvers"]),
-                "status": r["status"],
-                "submitted_at": r["submitted_at"],
-                "sla_hours": r["sla_hours"],
-                "last_reminder_at": r["last_reminder_at"],
-                "escalation_level": r["escalation_level"],
-                "requester": r["requester"],
-            }
+@timed_db
+def list_users() -> List[Dict[str, Any]]:
+    return [dict(r) for r in _conn().execute("SELECT * FROM users ORDER BY username").fetchall()]
+
+
+@timed_db
+def upsert_user(user: Dict[str, Any]):
+    """Insert or update a user; callers should go through directory.save_user so caches see it."""
+    with _transaction() as cur:
+        cur.execute(
+            "INSERT INTO users(username, password, role, email) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(username) DO UPDATE SET password = excluded.password, role = excluded.role, email = excluded.email",
+            (user["username"], user["password"], user["role"], user.get("email")),
         )
-    return out
 
 
-def get_approval(approval_id: str) -> Optional[Dict[str, Any]]:
-    conn = _conn()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM approvals WHERE id = ?", (approval_id,))
-    r = cur.fetchone()
-    conn.close()
-    if not r:
-        return None
+_APPROVAL_ROW = (
+    "INTO approvals(id, vendor_name, amount, approvers, status, submitted_at, sla_hours, last_reminder_at, escalation_level, requester, reminder_due_at, sla_deadline, sla_warning_at, version) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_REPLACE_APPROVAL = "REPLACE " + _APPROVAL_ROW
+_INSERT_APPROVAL = "INSERT " + _APPROVAL_ROW
+
+
+def _approval_params(obj: Dict[str, Any], version: int) -> tuple:
+    return (
+        obj["id"],
+        obj["vendor_name"],
+        obj["amount"],
+        json.dumps(obj["approvers"]),
+        obj["status"],
+        obj["submitted_at"],
+        obj["sla_hours"],
+        obj.get("last_reminder_at"),
+        obj.get("escalation_level", 0),
+        obj.get("requester"),
+        *sla_deadlines(obj["submitted_at"], obj["sla_hours"], obj.get("last_reminder_at")),
+        sla_warning_at(obj["submitted_at"], obj["sla_hours"]),
+        version,
+    )
+
+
+@timed_db
+def save_approval(obj: Dict[str, Any]):
+    with _transaction() as cur:
+        cur.execute(_REPLACE_APPROVAL, _approval_params(obj, bump_change_version(cur)))
+
+
+def _existing_ids(cur: sqlite3.Cursor, ids: List[str]) -> Dict[str, str]:
+    """id -> status for the ids that exist, queried in chunks of 500."""
+    found = {}
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        found.update(cur.execute(f"SELECT id, status FROM approvals WHERE id IN ({','.join('?' * len(chunk))})", chunk).fetchall())
+    return found
+
+
+@timed_db
+def insert_approvals(objs: List[Dict[str, Any]], audit_entries: List[Dict[str, Any]]) -> List[bool]:
+    """Insert new approvals and their audit rows in one transaction.
+
+    `audit_entries` lines up with `objs`. Returns, per object, whether it was
+    inserted; ids that already exist (or repeat within `objs`) are skipped
+    rather than replaced.
+    """
+    with _transaction() as cur:
+        existing = _existing_ids(cur, [o["id"] for o in objs])
+        inserted, seen = [], set()
+        for o in objs:
+            inserted.append(o["id"] not in existing and o["id"] not in seen)
+            seen.add(o["id"])
+        fresh = [i for i, ok in enumerate(inserted) if ok]
+        if fresh:
+            version = bump_change_version(cur)
+            cur.executemany(_INSERT_APPROVAL, [_approval_params(objs[i], version) for i in fresh])
+            cur.executemany(_INSERT_AUDIT, [_audit_params(audit_entries[i], version) for i in fresh])
+    return inserted
+
+
+@timed_db
+def approve_approvals(ids: List[str], timestamp: str, actor: str = "user") -> Dict[str, str]:
+    """Mark approvals APPROVED in one transaction, with an audit row each.
+
+    Returns id -> "approved", "already_approved" or "not_found". Only the
+    status column is updated; nothing else about the row is rewritten.
+    """
+    ids = list(dict.fromkeys(ids))
+    with _transaction() as cur:
+        statuses = _existing_ids(cur, ids)
+        todo = [i for i in ids if statuses.get(i) not in (None, "APPROVED")]
+        if todo:
+            version = bump_change_version(cur)
+            cur.executemany("UPDATE approvals SET status = 'APPROVED', version = ? WHERE id = ?", [(version, i) for i in todo])
+            cur.executemany(_INSERT_AUDIT, [
+                _audit_params({"timestamp": timestamp, "approval_id": i, "actor": actor, "action": "approved", "message": "Marked approved via bulk API"}, version)
+                for i in todo
+            ])
+    done = set(todo)
     return {
-        "id": r["id"],
-        "vendor_name": r["vendor_name"],
-        "amount": r["amount"],
-        "approvers": json.loads(r["approvers"]),
-        "status": r["status"],
-        "submitted_at": r["submitted_at"],
-        "sla_hours": r["sla_hours"],
-        "last_reminder_at": r["last_reminder_at"],
-        "escalation_level": r["escalation_level"],
+        i: "approved" if i in done else "not_found" if i not in statuses else "already_approved"
+        for i in ids
     }
 
 
-def log_audit(entry: Dict[str, Any]):
-    conn = _conn()
-    cur = conn.cursor()
-    cur.execute(
-        "INSERT INTO audit(timestamp, approval_id, actor, action, message, meta) VALUES (?, ?, ?, ?, ?, ?)",
-        (
-            entry["timestamp"],
-            entry["approval_id"],
-            entry["actor"],
-            entry["action"],
-            entry.get("message"),
-            json.dumps(entry.get("meta")) if entry.get("meta") else None,
-        ),
+APPROVAL_FIELDS = (
+    "id", "vendor_name", "amount", "approvers", "status", "submitted_at",
+    "sla_hours", "last_reminder_at", "escalation_level", "requester",
+)
+# Every full-row approval read selects exactly these columns, in this order,
+# so rows can be mapped by position instead of sqlite3.Row name lookups.
+_APPROVAL_COLUMNS = ", ".join(APPROVAL_FIELDS)
+
+
+def _tuples(sql: str, params=()) -> List[tuple]:
+    """Run a SELECT on a cursor that returns plain tuples."""
+    cur = _conn().cursor()
+    cur.row_factory = None
+    return cur.execute(sql, params).fetchall()
+
+
+def _approval_from_row(row: tuple) -> Dict[str, Any]:
+    item = dict(zip(APPROVAL_FIELDS, row))
+    item["approvers"] = _loads(item["approvers"])
+    return item
+
+
+@timed_db
+def list_approvals_page(
+    requester: Optional[str] = None,
+    statuses: Optional[List[str]] = None,
+    submitted_from: Optional[str] = None,
+    submitted_to: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    limit: Optional[int] = None,
+    after: Optional[Tuple[str, str]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[Tuple[str, str]]]:
+    """One page of approvals, newest first, using keyset pagination.
+
+    `after` is the (submitted_at, id) key of the last row of the previous
+    page; the second return value is the key to pass for the next page, or
+    None on the last page. limit=None returns every match. `fields` limits the returned keys (approvers is
+    only decoded when requested); names outside APPROVAL_FIELDS raise ValueError.
+    """
+    fields = list(dict.fromkeys(fields or APPROVAL_FIELDS))
+    unknown = [f for f in fields if f not in APPROVAL_FIELDS]
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(unknown)}")
+    where, params = [], []
+    if requester:
+        where.append("requester = ?")
+        params.append(requester)
+    if statuses:
+        where.append(f"status IN ({','.join('?' * len(statuses))})")
+        params.extend(statuses)
+    if submitted_from:
+        where.append("submitted_at >= ?")
+        params.append(submitted_from)
+    if submitted_to:
+        where.append("submitted_at < ?")
+        params.append(submitted_to)
+    if after:
+        where.append("(submitted_at, id) < (?, ?)")
+        params.extend(after)
+    # Selected fields first, then the key columns, so rows map by position
+    columns = fields + ["submitted_at", "id"]
+    sql = f"SELECT {', '.join(columns)} FROM approvals"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY submitted_at DESC, id DESC LIMIT ?"
+    rows = _tuples(sql, (*params, -1 if limit is None else limit + 1))
+
+    next_after = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_after = tuple(rows[-1][-2:])
+    out = [dict(zip(fields, r)) for r in rows]
+    if "approvers" in fields:
+        for item in out:
+            item["approvers"] = _loads(item["approvers"])
+    return out, next_after
+
+
+@timed_db
+def claim_due_approvals(
+    now: datetime,
+    token: str,
+    lease_seconds: float,
+    shard: int = 0,
+    shards: int = 1,
+    limit: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """Lease the due approvals of one shard to `token`: PENDING rows with a reminder due or a breached SLA at `now`.
+
+    reminder_due_at already accounts for the reminder cadence, and escalated
+    rows leave the PENDING set, so items handled on an earlier pass are not
+    claimed again. The two predicates are served by
+    idx_approvals_status_reminder_due and idx_approvals_status_sla_deadline
+    (UNION rather than OR so each gets its own index range scan), so the
+    cost tracks the number of actionable rows rather than the table.
+
+    A single conditional UPDATE skips rows whose lease is still live, so
+    concurrent claimers, in this process or another, never get the same row.
+    The rows come back as they are at claim time, newest first.
+    """
+    at = _utc_iso(now)
+    where = "(lease_expires_at IS NULL OR lease_expires_at <= ?)"
+    params: List[Any] = [at]
+    if shards > 1:
+        where += " AND shard_of(id, ?) = ?"
+        params += [shards, shard]
+    with _transaction() as cur:
+        cur.row_factory = None
+        rows = cur.execute(
+            "UPDATE approvals SET lease_token = ?, lease_expires_at = ? WHERE id IN ("
+            "SELECT id FROM approvals WHERE id IN ("
+            "SELECT id FROM approvals WHERE status = 'PENDING' AND reminder_due_at <= ? "
+            "UNION SELECT id FROM approvals WHERE status = 'PENDING' AND sla_deadline <= ?"
+            f") AND {where} ORDER BY submitted_at DESC LIMIT ?"
+            f") RETURNING {_APPROVAL_COLUMNS}",
+            (token, _utc_iso(now + timedelta(seconds=lease_seconds)), at, at, *params, -1 if limit is None else limit),
+        ).fetchall()
+    return sorted((_approval_from_row(r) for r in rows), key=lambda a: (a["submitted_at"], a["id"]), reverse=True)
+
+
+@timed_db
+def claim_approvals(ids: List[str], now: datetime, token: str, lease_seconds: float) -> List[Dict[str, Any]]:
+    """Lease specific PENDING approvals to `token`; ids that are leased elsewhere or no longer pending are left out."""
+    at = _utc_iso(now)
+    expires = _utc_iso(now + timedelta(seconds=lease_seconds))
+    found = {}
+    with _transaction() as cur:
+        cur.row_factory = None
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            rows = cur.execute(
+                "UPDATE approvals SET lease_token = ?, lease_expires_at = ? "
+                f"WHERE id IN ({','.join('?' * len(chunk))}) AND status = 'PENDING' AND (lease_expires_at IS NULL OR lease_expires_at <= ?) "
+                f"RETURNING {_APPROVAL_COLUMNS}",
+                (token, expires, *chunk, at),
+            ).fetchall()
+            found.update((r[0], _approval_from_row(r)) for r in rows)
+    return [found[i] for i in ids if i in found]
+
+
+@timed_db
+def renew_lease(approval_id: str, token: str, now: datetime, lease_seconds: Optional[float] = None) -> bool:
+    """Check that `token` still holds a live lease on a PENDING approval and, with `lease_seconds`, extend it from `now`.
+
+    False once the lease has expired (another claimer may own the row) or the
+    approval has moved on.
+    """
+    at = _utc_iso(now)
+    expires = _utc_iso(now + timedelta(seconds=lease_seconds)) if lease_seconds else None
+    with _transaction() as cur:
+        cur.execute(
+            "UPDATE approvals SET lease_expires_at = COALESCE(?, lease_expires_at) "
+            "WHERE id = ? AND lease_token = ? AND lease_expires_at > ? AND status = 'PENDING'",
+            (expires, approval_id, token, at),
+        )
+        return cur.rowcount > 0
+
+
+@timed_db
+def release_leases(ids: List[str], token: str):
+    """Drop `token`'s leases on `ids` (rows re-leased by someone else are untouched)."""
+    with _transaction() as cur:
+        cur.executemany(
+            "UPDATE approvals SET lease_token = NULL, lease_expires_at = NULL WHERE id = ? AND lease_token = ?",
+            [(i, token) for i in ids],
+        )
+
+
+@timed_db
+def get_approvals(ids: List[str]) -> List[Dict[str, Any]]:
+    """Fetch several approvals by id (missing ids are skipped), in `ids` order."""
+    found = {}
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        rows = _tuples(f"SELECT {_APPROVAL_COLUMNS} FROM approvals WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+        found.update((r[0], _approval_from_row(r)) for r in rows)
+    return [found[i] for i in ids if i in found]
+
+
+@timed_db
+def pending_sla_columns() -> Tuple[List[str], List[float], List[str], List[Optional[str]]]:
+    """(submitted_at, sla_hours, status, last_reminder_at) columns for every PENDING approval."""
+    rows = _tuples("SELECT submitted_at, sla_hours, status, last_reminder_at FROM approvals WHERE status = 'PENDING'")
+    if not rows:
+        return [], [], [], []
+    return tuple(list(col) for col in zip(*rows))
+
+
+@timed_db
+def list_pending_deadlines() -> List[Tuple[str, str, str]]:
+    """(id, reminder_due_at, sla_deadline) for every PENDING approval."""
+    rows = _conn().execute("SELECT id, reminder_due_at, sla_deadline FROM approvals WHERE status = 'PENDING'").fetchall()
+    return [tuple(r) for r in rows]
+
+
+@timed_db
+def get_approval(approval_id: str) -> Optional[Dict[str, Any]]:
+    rows = _tuples(f"SELECT {_APPROVAL_COLUMNS} FROM approvals WHERE id = ?", (approval_id,))
+    return _approval_from_row(rows[0]) if rows else None
+
+
+_INSERT_AUDIT = "INSERT INTO audit(timestamp, approval_id, actor, action, message, meta, version) VALUES (?, ?, ?, ?, ?, ?, ?)"
+
+
+def _audit_params(entry: Dict[str, Any], version: int) -> tuple:
+    return (
+        entry["timestamp"],
+        entry["approval_id"],
+        entry["actor"],
+        entry["action"],
+        entry.get("message"),
+        json.dumps(entry.get("meta")) if entry.get("meta") else None,
+        version,
     )
-    conn.commit()
-    conn.close()
 
 
+@timed_db
+def log_audit(entry: Dict[str, Any]):
+    with _transaction() as cur:
+        cur.execute(_INSERT_AUDIT, _audit_params(entry, bump_change_version(cur)))
+
+
+class UnitOfWork:
+    """Collects agent state transitions and audit rows, then writes them at once.
+
+    Transitions only touch the columns the agent changes (status,
+    escalation_level, last_reminder_at and reminder_due_at), so
+    the approvers JSON and the other columns are never rewritten. Use as a context manager to flush on exit:
+
+        with data.UnitOfWork() as uow:
+            uow.update_state(a["id"], "ESCALATED", 1, a["last_reminder_at"])
+            uow.log_audit({...})
+
+    With a `lease_token` (see claim_due_approvals), each transition only
+    applies while the row is still PENDING and leased to that token, and it
+    releases the lease. Transitions that lost their lease are skipped along
+    with their audit rows and listed in `lost`. Call hold() before a side
+    effect that can't be undone (a notification), so an item whose lease ran
+    out mid-pass is dropped before it is acted on twice.
+    """
+
+    def __init__(self, lease_token: Optional[str] = None, lease_seconds: Optional[float] = None):
+        self.lease_token = lease_token
+        self.lease_seconds = lease_seconds
+        self.transitions: List[tuple] = []
+        self.audit_entries: List[Dict[str, Any]] = []
+        self.lost: List[str] = []
+
+    def update_state(self, approval_id: str, status: str, escalation_level: int, last_reminder_at: Optional[str], reminder_due_at: Optional[str] = None):
+        self.transitions.append((status, escalation_level, last_reminder_at, reminder_due_at, approval_id))
+
+    def log_audit(self, entry: Dict[str, Any]):
+        self.audit_entries.append(entry)
+
+    def hold(self, approval_id: str, now: datetime) -> bool:
+        """Renew the lease on `approval_id` (see renew_lease); False, and the id is listed in `lost`, if it is gone."""
+        if self.lease_token is None or renew_lease(approval_id, self.lease_token, now, self.lease_seconds):
+            return True
+        self.lost.append(approval_id)
+        return False
+
+    @timed_db
+    def flush(self):
+        """Write everything collected so far in one transaction."""
+        if not self.transitions and not self.audit_entries:
+            return
+        with _transaction() as cur:
+            version = bump_change_version(cur)
+            if self.lease_token is None:
+                cur.executemany(
+                    "UPDATE approvals SET status = ?, escalation_level = ?, last_reminder_at = ?, reminder_due_at = ?, version = ? WHERE id = ?",
+                    [(*t[:-1], version, t[-1]) for t in self.transitions],
+                )
+                audit_entries = self.audit_entries
+            else:
+                # Row by row: rowcount tells which transitions still held their lease
+                lost = set()
+                for t in self.transitions:
+                    cur.execute(
+                        "UPDATE approvals SET status = ?, escalation_level = ?, last_reminder_at = ?, reminder_due_at = ?, version = ?, "
+                        "lease_token = NULL, lease_expires_at = NULL WHERE id = ? AND lease_token = ? AND status = 'PENDING'",
+                        (*t[:-1], version, t[-1], self.lease_token),
+                    )
+                    if cur.rowcount == 0:
+                        lost.add(t[-1])
+                self.lost.extend(lost)
+                audit_entries = [e for e in self.audit_entries if e["approval_id"] not in lost]
+            cur.executemany(_INSERT_AUDIT, [_audit_params(e, version) for e in audit_entries])
+        self.transitions.clear()
+        self.audit_entries.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Still flush on error: notifications for collected items already went out.
+        self.flush()
+        return False
+
+
+def _audit_from_row(r: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "timestamp": r["timestamp"],
+        "approval_id": r["approval_id"],
+        "actor": r["actor"],
+        "action": r["action"],
+        "message": r["message"],
+        "meta": json.loads(r["meta"]) if r["meta"] else None,
+    }
+
+
+@timed_db
 def list_audit() -> List[Dict[str, Any]]:
-    conn = _conn()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM audit ORDER BY timestamp DESC LIMIT 200")
-    rows = cur.fetchall()
-    conn.close()
-    out = []
-    for r in rows:
-        out.append(
-            {
-                "timestamp": r["timestamp"],
-                "approval_id": r["approval_id"],
-                "actor": r["actor"],
-                "action": r["action"],
-                "message": r["message"],
-                "meta": json.loads(r["meta"]) if r["meta"] else None,
-            }
+    rows = _conn().execute("SELECT * FROM audit ORDER BY timestamp DESC LIMIT 200").fetchall()
+    return [_audit_from_row(r) for r in rows]
+
+
+@timed_db
+def list_audit_page(limit: int, after: Optional[Tuple[str, int]] = None) -> Tuple[List[Dict[str, Any]], Optional[Tuple[str, int]]]:
+    """Audit stream, newest first, keyset-paginated on (timestamp, id) like list_approvals_page.
+
+    Items carry their audit "id" so callers can continue from the last one.
+    """
+    if after:
+        rows = _conn().execute(
+            "SELECT * FROM audit WHERE (timestamp, id) < (?, ?) ORDER BY timestamp DESC, id DESC LIMIT ?",
+            (*after, limit + 1),
+        ).fetchall()
+    else:
+        rows = _conn().execute("SELECT * FROM audit ORDER BY timestamp DESC, id DESC LIMIT ?", (limit + 1,)).fetchall()
+    next_after = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_after = (rows[-1]["timestamp"], rows[-1]["id"])
+    return [{"id": r["id"], **_audit_from_row(r)} for r in rows], next_after
+
+
+@timed_db
+def list_audit_for_approval(approval_id: str) -> List[Dict[str, Any]]:
+    """Live audit timeline for one approval, oldest first."""
+    rows = _conn().execute(
+        "SELECT * FROM audit WHERE approval_id = ? ORDER BY timestamp, id", (approval_id,)
+    ).fetchall()
+    return [{"id": r["id"], **_audit_from_row(r)} for r in rows]
+
+
+@timed_db
+def fetch_audit_for_archive(before: str, limit: int) -> List[Dict[str, Any]]:
+    """Oldest audit rows with timestamp < `before`, including id and version."""
+    rows = _conn().execute(
+        "SELECT * FROM audit WHERE timestamp < ? ORDER BY timestamp, id LIMIT ?", (before, limit)
+    ).fetchall()
+    return [{"id": r["id"], **_audit_from_row(r), "version": r["version"]} for r in rows]
+
+
+@timed_db
+def commit_archive_segment(path: str, rows: List[Dict[str, Any]], created_at: str) -> int:
+    """Register a written segment and delete its rows from the live table, atomically."""
+    with _transaction() as cur:
+        cur.execute(
+            "INSERT INTO audit_archive_segments(path, min_timestamp, max_timestamp, row_count, created_at) VALUES (?, ?, ?, ?, ?)",
+            (path, rows[0]["timestamp"], rows[-1]["timestamp"], len(rows), created_at),
+        )
+        segment_id = cur.lastrowid
+        cur.executemany(
+            "INSERT OR IGNORE INTO audit_archive_index(approval_id, segment_id) VALUES (?, ?)",
+            [(a, segment_id) for a in {r["approval_id"] for r in rows}],
+        )
+        cur.executemany("DELETE FROM audit WHERE id = ?", [(r["id"],) for r in rows])
+    return segment_id
+
+
+@timed_db
+def archive_segments_for_approval(approval_id: str) -> List[str]:
+    rows = _conn().execute(
+        "SELECT s.path FROM audit_archive_index i JOIN audit_archive_segments s ON s.id = i.segment_id "
+        "WHERE i.approval_id = ? ORDER BY s.min_timestamp",
+        (approval_id,),
+    ).fetchall()
+    return [r["path"] for r in rows]
+
+
+@timed_db
+def list_archive_segments(before: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Segment manifest, newest first; `before` keeps segments starting at or before it."""
+    if before:
+        rows = _conn().execute("SELECT * FROM audit_archive_segments WHERE min_timestamp <= ? ORDER BY max_timestamp DESC, id DESC", (before,)).fetchall()
+    else:
+        rows = _conn().execute("SELECT * FROM audit_archive_segments ORDER BY max_timestamp DESC, id DESC").fetchall()
+    return [dict(r) for r in rows]
+
+
+@timed_db
+def list_changes(since: int, requester: Optional[str] = None) -> Dict[str, Any]:
+    """Approvals and audit rows written after change version `since`.
+
+    The returned "version" is the one to pass as `since` next time. Rows are
+    bounded by it, so a write that commits mid-call is left for the next call
+    rather than half-reported (the version is bumped inside each write's
+    transaction, so everything up to it is already committed).
+    """
+    version = current_version()
+    if requester:
+        rows = _tuples(f"SELECT {_APPROVAL_COLUMNS} FROM approvals WHERE version > ? AND version <= ? AND requester = ? ORDER BY version", (since, version, requester))
+    else:
+        rows = _tuples(f"SELECT {_APPROVAL_COLUMNS} FROM approvals WHERE version > ? AND version <= ? ORDER BY version", (since, version))
+    audit_rows = _conn().execute("SELECT * FROM audit WHERE version > ? AND version <= ? ORDER BY id", (since, version)).fetchall()
+    return {
+        "version": version,
+        "approvals": [_approval_from_row(r) for r in rows],
+        "audit": [_audit_from_row(r) for r in audit_rows],
+    }
+
+
+@timed_db
+def get_llm_cache(key: str, not_before: float) -> Optional[str]:
+    r = _conn().execute("SELECT response FROM llm_cache WHERE key = ? AND created_at >= ?", (key, not_before)).fetchone()
+    return r["response"] if r else None
+
+
+@timed_db
+def put_llm_cache(key: str, response: str, created_at: float):
+    with _transaction() as cur:
+        cur.execute("REPLACE INTO llm_cache(key, response, created_at) VALUES (?, ?, ?)", (key, response, created_at))
+
+
+@timed_db
+def prune_llm_cache(not_before: float, max_entries: int) -> int:
+    """Drop entries older than `not_before`, then all but the newest `max_entries`."""
+    with _transaction() as cur:
+        cur.execute("DELETE FROM llm_cache WHERE created_at < ?", (not_before,))
+        removed = cur.rowcount
+        cur.execute(
+            "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (max_entries,),
+        )
+        return removed + cur.rowcount
+
+
+@timed_db
+def enqueue_notifications(items: List[Dict[str, Any]], now: float):
+    """Add outbound notifications ({channel, kind, recipient, title, message}) to the outbox."""
+    with _transaction() as cur:
+        cur.executemany(
+            "INSERT INTO outbox(channel, kind, recipient, title, message, status, attempts, next_attempt_at, created_at) VALUES (?, ?, ?, ?, ?, 'pending', 0, ?, ?)",
+            [(i["channel"], i.get("kind"), i.get("recipient"), i["title"], i["message"], now, now) for i in items],
         )
+
+
+@timed_db
+def claim_outbox(channel: str, limit: int, now: float) -> List[Dict[str, Any]]:
+    """Atomically mark up to `limit` ready messages for `channel` as sending and return them, oldest first."""
+    with _transaction() as cur:
+        rows = cur.execute(
+            "UPDATE outbox SET status = 'sending', claimed_at = ? WHERE id IN ("
+            "SELECT id FROM outbox WHERE channel = ? AND status = 'pending' AND next_attempt_at <= ? ORDER BY id LIMIT ?"
+            ") RETURNING *",
+            (now, channel, now, limit),
+        ).fetchall()
+    return sorted((dict(r) for r in rows), key=lambda r: r["id"])
+
+
+@timed_db
+def complete_outbox(ids: List[int]):
+    with _transaction() as cur:
+        cur.executemany("UPDATE outbox SET status = 'sent', last_error = NULL WHERE id = ?", [(i,) for i in ids])
+
+
+@timed_db
+def retry_outbox(ids: List[int], next_attempt_at: Optional[float], error: str):
+    """Record a failed send; next_attempt_at=None gives up and marks the messages failed."""
+    status = "failed" if next_attempt_at is None else "pending"
+    with _transaction() as cur:
+        cur.executemany(
+            "UPDATE outbox SET status = ?, attempts = attempts + 1, next_attempt_at = COALESCE(?, next_attempt_at), last_error = ? WHERE id = ?",
+            [(status, next_attempt_at, error, i) for i in ids],
+        )
+
+
+@timed_db
+def requeue_stale_outbox(claimed_before: float) -> int:
+    """Return messages stuck in 'sending' (e.g. the process died mid-send) to the queue."""
+    with _transaction() as cur:
+        cur.execute("UPDATE outbox SET status = 'pending' WHERE status = 'sending' AND claimed_at < ?", (claimed_before,))
+        return cur.rowcount
+
+
+@timed_db
+def outbox_counts() -> Dict[str, Dict[str, int]]:
+    rows = _conn().execute("SELECT channel, status, COUNT(*) AS n FROM outbox GROUP BY channel, status").fetchall()
+    out: Dict[str, Dict[str, int]] = {}
+    for r in rows:
+        out.setdefault(r["channel"], {})[r["status"]] = r["n"]
     return out
+
+
+_AGENT_JOB_COLUMNS = ("id", "status", "submitted_at", "started_at", "finished_at", "trace_id", "params", "result", "error")
+
+
+@timed_db
+def create_agent_job(job_id: str, submitted_at: str, trace_id: Optional[str], params: Dict[str, Any], keep: int):
+    """Record a queued job; only the newest `keep` jobs are kept."""
+    with _transaction() as cur:
+        cur.execute(
+            "INSERT INTO agent_jobs(id, status, submitted_at, trace_id, params) VALUES (?, 'queued', ?, ?, ?)",
+            (job_id, submitted_at, trace_id, json.dumps(params)),
+        )
+        cur.execute(
+            "DELETE FROM agent_jobs WHERE id IN (SELECT id FROM agent_jobs ORDER BY submitted_at DESC, id DESC LIMIT -1 OFFSET ?)",
+            (keep,),
+        )
+
+
+@timed_db
+def start_agent_job(job_id: str, started_at: str):
+    with _transaction() as cur:
+        cur.execute("UPDATE agent_jobs SET status = 'running', started_at = ? WHERE id = ?", (started_at, job_id))
+
+
+@timed_db
+def finish_agent_job(job_id: str, finished_at: str, result: Any = None, error: Optional[str] = None):
+    with _transaction() as cur:
+        cur.execute(
+            "UPDATE agent_jobs SET status = ?, finished_at = ?, result = ?, error = ? WHERE id = ?",
+            ("failed" if error else "done", finished_at, json.dumps(result) if error is None else None, error, job_id),
+        )
+
+
+def _agent_job_from_row(row: tuple) -> Dict[str, Any]:
+    job = dict(zip(_AGENT_JOB_COLUMNS, row))
+    job["params"] = _loads(job["params"]) if job["params"] else {}
+    job["result"] = _loads(job["result"]) if job["result"] else None
+    return job
+
+
+@timed_db
+def get_agent_job(job_id: str) -> Optional[Dict[str, Any]]:
+    rows = _tuples(f"SELECT {', '.join(_AGENT_JOB_COLUMNS)} FROM agent_jobs WHERE id = ?", (job_id,))
+    return _agent_job_from_row(rows[0]) if rows else None
+
+
+@timed_db
+def list_agent_jobs(limit: int = 20) -> List[Dict[str, Any]]:
+    rows = _tuples(f"SELECT {', '.join(_AGENT_JOB_COLUMNS)} FROM agent_jobs ORDER BY submitted_at DESC, id DESC LIMIT ?", (limit,))
+    return [_agent_job_from_row(r) for r in rows]
+
+
+@timed_db
+def rebuild_rollups():
+    """Recompute the rollup tables from approvals and the live audit rows.
+
+    Archived audit rows are not read back, so breach and latency history
+    older than the retention window is dropped from the rollups.
+    """
+    with _transaction() as cur:
+        cur.execute("BEGIN IMMEDIATE")
+        _rebuild_rollups(cur)
+
+
+# Live rows of each rollup table, in a stable order; rows a delete brought back to zero are left out.
+_ROLLUP_ROWS = {
+    "rollup_approval_counts": "SELECT * FROM rollup_approval_counts WHERE n != 0 ORDER BY 1, 2, 3",
+    "rollup_vendors": "SELECT * FROM rollup_vendors WHERE approvals != 0 ORDER BY 1",
+    "rollup_approval_latency": "SELECT * FROM rollup_approval_latency ORDER BY 1, 2",
+}
+
+
+@timed_db
+def check_rollups() -> Dict[str, Dict[str, List[tuple]]]:
+    """Compare the trigger-maintained rollups with a fresh rebuild, leaving both untouched.
+
+    Returns, per table that differs, the rows only in the live table
+    ("live") and only in the rebuild ("rebuilt"); empty when they agree.
+    Breaches and latency of archived audit rows only exist in the live
+    tables (see rebuild_rollups).
+    """
+    with _transaction() as cur:
+        cur.execute("BEGIN IMMEDIATE")
+        live = {table: [tuple(r) for r in cur.execute(sql)] for table, sql in _ROLLUP_ROWS.items()}
+        cur.execute("SAVEPOINT check_rollups")
+        _rebuild_rollups(cur)
+        rebuilt = {table: [tuple(r) for r in cur.execute(sql)] for table, sql in _ROLLUP_ROWS.items()}
+        cur.execute("ROLLBACK TO check_rollups")
+        cur.execute("RELEASE check_rollups")
+    diff = {}
+    for table in _ROLLUP_ROWS:
+        only_live = sorted(set(live[table]) - set(rebuilt[table]))
+        only_rebuilt = sorted(set(rebuilt[table]) - set(live[table]))
+        if only_live or only_rebuilt:
+            diff[table] = {"live": only_live, "rebuilt": only_rebuilt}
+    return diff
+
+
+@timed_db
+def get_rollups(since_day: str, requester: Optional[str] = None) -> Dict[str, List[tuple]]:
+    """Rows of the rollup tables: approval counts (optionally one requester's), vendors, latency from `since_day`.
+
+    Amounts are integer cents and latency is integer seconds.
+    """
+    counts_sql = "SELECT status, escalation_level, requester, n, amount_cents FROM rollup_approval_counts WHERE n != 0"
+    counts_params: tuple = ()
+    if requester:
+        counts_sql += " AND requester = ?"
+        counts_params = (requester,)
+    return {
+        "counts": _tuples(counts_sql, counts_params),
+        "vendors": _tuples("SELECT vendor_name, approvals, amount_cents, open, open_amount_cents, breaches FROM rollup_vendors WHERE approvals != 0 ORDER BY approvals DESC, vendor_name"),
+        "latency": _tuples("SELECT day, bucket, n, seconds FROM rollup_approval_latency WHERE day >= ? ORDER BY day, bucket", (since_day,)),
+    }
+
+
+@timed_db
+def sla_phase_counts(now: datetime, requester: Optional[str] = None) -> Dict[str, int]:
+    """PENDING approvals past 50% of their SLA ("warning") and past the SLA ("breached") at `now`.
+
+    Two range counts on idx_approvals_status_sla_warning and
+    idx_approvals_status_sla_deadline, so the cost follows the items past
+    their 50% mark rather than the whole PENDING backlog.
+    """
+    at = _utc_iso(now)
+    where, params = "status = 'PENDING'", ()
+    if requester:
+        where += " AND requester = ?"
+        params = (requester,)
+    # Every breached item is also past its 50% mark
+    past_warning, breached = _tuples(
+        f"SELECT (SELECT COUNT(*) FROM approvals WHERE {where} AND sla_warning_at <= ?), "
+        f"(SELECT COUNT(*) FROM approvals WHERE {where} AND sla_deadline <= ?)",
+        (*params, at, *params, at),
+    )[0]
+    return {"warning": past_warning - breached, "breached": breached}
@@ -0,0 +1,92 @@
+"""
+In-process user directory.
+
+The users table is tiny and almost never written, yet it was read on every
+login and on every reminder or escalation to find a recipient. The directory
+keeps an immutable snapshot of it (by username and by role), so lookups are
+plain dict reads with no lock and no SQLite round trip.
+
+The snapshot is rebuilt on the first lookup after `invalidate()` (called by
+save_user) or after USER_DIRECTORY_TTL_SECONDS, which bounds how long a write
+made by another process can go unseen.
+"""
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from . import data
+
+USER_DIRECTORY_TTL_SECONDS = float(os.getenv("USER_DIRECTORY_TTL_SECONDS", 300))
+# Role notified at each escalation level (index = level); extra levels reuse the last role.
+ESCALATION_ROLES = [r.strip() for r in os.getenv("ESCALATION_ROLES", "APPROVER,CHAIR,FINANCE").split(",") if r.strip()]
+FALLBACK_RECIPIENT = os.getenv("ESCALATION_FALLBACK_EMAIL", "admin@example.com")
+
+
+class _Snapshot:
+    __slots__ = ("users", "by_role", "loaded_at")
+
+    def __init__(self, users: List[Dict[str, Any]]):
+        self.users = {u["username"]: u for u in users}
+        self.by_role: Dict[str, List[str]] = {}
+        for u in users:
+            if u.get("email"):
+                self.by_role.setdefault(u["role"], []).append(u["email"])
+        self.loaded_at = time.monotonic()
+
+
+class UserDirectory:
+    def __init__(self, ttl: float = USER_DIRECTORY_TTL_SECONDS):
+        self.ttl = ttl
+        self._snapshot: Optional[_Snapshot] = None
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.counters = {"loads": 0, "hits": 0}
+
+    def load(self) -> _Snapshot:
+        """(Re)read the users table; also used to warm the cache at startup."""
+        with self._lock:
+            generation = self._generation
+            snapshot = _Snapshot(data.list_users())
+            self.counters["loads"] += 1
+            # An invalidate() during the read means it may be stale: use it once, don't keep it
+            if generation == self._generation:
+                self._snapshot = snapshot
+        return snapshot
+
+    def invalidate(self):
+        self._generation += 1
+        self._snapshot = None
+
+    def _current(self) -> _Snapshot:
+        snapshot = self._snapshot
+        if snapshot is None or time.monotonic() - snapshot.loaded_at > self.ttl:
+            return self.load()
+        self.counters["hits"] += 1
+        return snapshot
+
+    def get(self, username: str) -> Optional[Dict[str, Any]]:
+        user = self._current().users.get(username)
+        return dict(user) if user else None
+
+    def recipients_for_role(self, role: str) -> List[str]:
+        return list(self._current().by_role.get(role, ()))
+
+    def recipients_for_level(self, level: int) -> List[str]:
+        role = ESCALATION_ROLES[min(max(level, 0), len(ESCALATION_ROLES) - 1)]
+        return self.recipients_for_role(role)
+
+    def save_user(self, user: Dict[str, Any]):
+        data.upsert_user(user)
+        self.invalidate()
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            **self.counters,
+            "users": len(snapshot.users) if snapshot else 0,
+            "roles": {role: len(emails) for role, emails in snapshot.by_role.items()} if snapshot else {},
+        }
+
+
+directory = UserDirectory()
@@ -0,0 +1,72 @@
+"""
+Background agent passes.
+
+POST /agent/run?background=true returns a job id immediately. The pass runs
+on a small dedicated pool (AGENT_JOB_WORKERS), so it never holds a request
+thread. Its status and result go to the agent_jobs table, where any worker
+can read them (GET /agent/jobs/{id}). A foreground /agent/run is the same
+job, awaited.
+
+Jobs execute in the process that accepted them. A job whose process died
+mid-pass stays "running"; its leases expire and the work is picked up
+again by the next pass.
+"""
+import contextvars
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from . import data, telemetry
+
+AGENT_JOB_WORKERS = int(os.getenv("AGENT_JOB_WORKERS", 1))
+AGENT_JOB_HISTORY = int(os.getenv("AGENT_JOB_HISTORY", 200))
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class AgentJobs:
+    def __init__(self, workers: int = AGENT_JOB_WORKERS, keep: int = AGENT_JOB_HISTORY):
+        self.workers = workers
+        self.keep = keep
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="agent-job")
+            return self._executor
+
+    def submit(self, fn: Callable[..., Any], params: Dict[str, Any]) -> Tuple[str, Future]:
+        """Record a queued job and start fn(**params) on the job pool; returns (job id, future)."""
+        job_id = uuid.uuid4().hex
+        data.create_agent_job(job_id, _now(), telemetry.current_trace_id(), params, self.keep)
+        ctx = contextvars.copy_context()
+        return job_id, self._pool().submit(ctx.run, self._run, job_id, fn, params)
+
+    def _run(self, job_id: str, fn: Callable[..., Any], params: Dict[str, Any]) -> Any:
+        data.start_agent_job(job_id, _now())
+        try:
+            result = fn(**params)
+        except Exception as e:
+            data.finish_agent_job(job_id, _now(), error=f"{type(e).__name__}: {e}")
+            telemetry.log_event("agent_job_failed", logging.ERROR, job_id=job_id, error=str(e))
+            raise
+        data.finish_agent_job(job_id, _now(), result=result)
+        return result
+
+    def stop(self):
+        """Wait for queued and running jobs, then drop the pool."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+jobs = AgentJobs()
@@ -0,0 +1,140 @@
+"""
+Response cache for LLM rewrites.
+
+Reminder and escalation prompts are deterministic templates, so an item that
+stays in the reminder window produces the same prompt on every agent tick.
+Caching the rewrite keyed on (deployment, prompt) avoids paying for the same
+completion again.
+
+Caches implement get(key) / set(key, value) / stats(). The default is an
+in-memory LRU; with LLM_CACHE_PERSIST=1 it is backed by a SQLite tier in the
+approvals DB so entries survive restarts and are shared between workers.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from . import data
+
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", 24 * 3600))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 2048))
+LLM_CACHE_PERSIST = os.getenv("LLM_CACHE_PERSIST", "0") == "1"
+LLM_CACHE_PERSIST_MAX_ENTRIES = int(os.getenv("LLM_CACHE_PERSIST_MAX_ENTRIES", 100_000))
+
+
+def cache_key(deployment: str, prompt: str) -> str:
+    return hashlib.sha256(f"{deployment}\0{prompt}".encode()).hexdigest()
+
+
+class MemoryCache:
+    """Thread-safe LRU with a per-entry TTL."""
+
+    def __init__(self, max_entries: int = LLM_CACHE_MAX_ENTRIES, ttl: float = LLM_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.counters["misses"] += 1
+                return None
+            value, expires_at = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                self.counters["expired"] += 1
+                self.counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return value
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            self._entries[key] = (value, time.time() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self.counters, "size": len(self._entries), "max_entries": self.max_entries}
+
+
+class SQLiteCache:
+    """Persistent tier stored in the llm_cache table; pruned every `prune_every` writes."""
+
+    def __init__(self, max_entries: int = LLM_CACHE_PERSIST_MAX_ENTRIES, ttl: float = LLM_CACHE_TTL_SECONDS, prune_every: int = 500):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.prune_every = prune_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key: str) -> Optional[str]:
+        value = data.get_llm_cache(key, not_before=time.time() - self.ttl)
+        with self._lock:
+            self.counters["hits" if value is not None else "misses"] += 1
+        return value
+
+    def set(self, key: str, value: str):
+        data.put_llm_cache(key, value, time.time())
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % self.prune_every == 0
+        if prune:
+            removed = data.prune_llm_cache(time.time() - self.ttl, self.max_entries)
+            with self._lock:
+                self.counters["evictions"] += removed
+
+    def clear(self):
+        data.prune_llm_cache(float("inf"), 0)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self.counters, "max_entries": self.max_entries}
+
+
+class TieredCache:
+    """Memory LRU in front of a slower shared tier; shared hits are promoted."""
+
+    def __init__(self, memory: MemoryCache, shared: SQLiteCache):
+        self.memory = memory
+        self.shared = shared
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is None:
+            value = self.shared.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        return value
+
+    def set(self, key: str, value: str):
+        self.memory.set(key, value)
+        self.shared.set(key, value)
+
+    def clear(self):
+        self.memory.clear()
+        self.shared.clear()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {"memory": self.memory.stats(), "sqlite": self.shared.stats()}
+
+
+def default_cache():
+    if LLM_CACHE_PERSIST:
+        return TieredCache(MemoryCache(), SQLiteCache())
+    return MemoryCache()
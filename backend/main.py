@@ -1,18 +1,61 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from uuid import uuid4
+import asyncio
 from datetime import datetime, timezone
+import base64
 import random
 import json
-from typing import Optional
+import time
+from typing import List, Optional
 
 from pydantic import BaseModel
 
-from . import data
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from . import adata, data
 from .models import ApprovalRequest, Approver
-from .agent_langgraph import run_once
+from . import agent_langgraph
+from .agent_langgraph import LLM_CONCURRENCY_MAX, client_stats
+from .notifications import NOTIFICATION_QUEUE_ENABLED, dispatcher
+from .scheduler import AGENT_SCHEDULER_ENABLED, scheduler
+from .changefeed import event_stream, watcher
+from . import audit_archive
+from . import bulk
+from .directory import directory
+from . import rollups
+from . import sla_batch
+from . import telemetry
+from .jobs import jobs
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Once per worker; a no-op read when the schema is already current
+    data.init_db()
+    directory.load()
+    if NOTIFICATION_QUEUE_ENABLED:
+        dispatcher.start()
+    if AGENT_SCHEDULER_ENABLED:
+        scheduler.start()
+    audit_archive.start_retention()
+    yield
+    await watcher.stop()
+    audit_archive.stop_retention()
+    jobs.stop()
+    scheduler.stop()
+    dispatcher.stop()
+    agent_langgraph.reset_azure_clients()
+    data.close_connections()
 
-app = FastAPI(title="AI Purchasing Committee - Prototype")
+
+app = FastAPI(title="AI Purchasing Committee - Prototype", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -20,7 +63,9 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "X-Trace-Id"],
 )
+app.add_middleware(telemetry.TraceMiddleware)
 
 
 class LoginRequest(BaseModel):
@@ -29,22 +74,31 @@ class LoginRequest(BaseModel):
 
 
 @app.post("/login")
-def login(req: LoginRequest):
-    user = data.get_user(req.username)
+async def login(req: LoginRequest):
+    # Cached, but a TTL expiry reloads the users table
+    user = await adata.run(directory.get, req.username)
     if not user or user["password"] != req.password:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     return {"username": user["username"], "role": user["role"]}
 
 
-data.init_db()
-
 
 def now_iso():
     return datetime.now(timezone.utc).isoformat()
 
 
+async def _not_modified(request: Request, response: Response) -> Optional[Response]:
+    """ETag on the global change version: a 304 when nothing was written since the client's copy."""
+    etag = f'W/"v{await adata.current_version()}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return None
+
+
 @app.post("/approvals")
-def create_dummy_approval(requester: str):
+async def create_dummy_approval(requester: str):
     """Create a synthetic approval request for demo purposes."""
     aid = str(uuid4())
     vendors = ["Acme Supplies", "Global Widgets", "NorthTech", "Zenith Services"]
@@ -67,8 +121,9 @@ def create_dummy_approval(requester: str):
         "escalation_level": 0,
         "requester": requester,
     }
-    data.save_approval(obj)
-    data.log_audit({
+    await adata.save_approval(obj)
+    scheduler.track(obj)
+    await adata.log_audit({
         "timestamp": now_iso(),
         "approval_id": aid,
         "actor": requester,
@@ -78,19 +133,85 @@ def create_dummy_approval(requester: str):
     return obj
 
 
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded with orjson when it is installed."""
+
+    def render(self, content) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content)
+
+
+def _listing(items, response: Response) -> FastJSONResponse:
+    """Return already-plain list rows directly, skipping FastAPI's per-item re-encoding.
+
+    Headers set on the injected `response` (ETag, X-Next-Cursor) are carried over.
+    """
+    return FastJSONResponse(items, headers=dict(response.headers))
+
+
+def _encode_cursor(key) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def _decode_cursor(cursor: str, key_types=(str, str)):
+    try:
+        first, second = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return key_types[0](first), key_types[1](second)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @app.get("/approvals")
-def list_all_approvals(requester: Optional[str] = None):
-    return data.list_approvals(requester_filter=requester)
+async def list_all_approvals(
+    request: Request,
+    response: Response,
+    requester: Optional[str] = None,
+    status: Optional[str] = None,
+    submitted_from: Optional[str] = None,
+    submitted_to: Optional[str] = None,
+    fields: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = None,
+):
+    """List approvals, newest first.
+
+    Without `limit` this returns every match. With it, it returns one page
+    and, if more rows follow, an X-Next-Cursor header to pass back as
+    `cursor`. `status` takes a comma-separated list and `fields` a
+    comma-separated projection of data.APPROVAL_FIELDS (400 on any other
+    name). Supports If-None-Match (see _not_modified).
+    """
+    projection = fields.split(",") if fields else None
+    unknown = [f for f in projection or [] if f not in data.APPROVAL_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    cached = await _not_modified(request, response)
+    if cached:
+        return cached
+    items, next_key = await adata.list_approvals_page(
+        requester=requester,
+        statuses=status.split(",") if status else None,
+        submitted_from=submitted_from,
+        submitted_to=submitted_to,
+        fields=projection,
+        limit=limit,
+        after=_decode_cursor(cursor) if cursor else None,
+    )
+    if next_key:
+        response.headers["X-Next-Cursor"] = _encode_cursor(next_key)
+    return _listing(items, response)
 
 
 @app.post("/approvals/{approval_id}/approve")
-def mark_approved(approval_id: str):
-    a = data.get_approval(approval_id)
+async def mark_approved(approval_id: str):
+    a = await adata.get_approval(approval_id)
     if not a:
         raise HTTPException(status_code=404, detail="Approval not found")
     a["status"] = "APPROVED"
-    data.save_approval(a)
-    data.log_audit({
+    await adata.save_approval(a)
+    scheduler.forget(approval_id)
+    await adata.log_audit({
         "timestamp": now_iso(),
         "approval_id": approval_id,
         "actor": "user",
@@ -100,58 +221,213 @@ def mark_approved(approval_id: str):
     return {"ok": True}
 
 
+@app.post("/approvals/import")
+async def import_approvals(request: Request, requester: Optional[str] = None, format: Optional[str] = None):
+    """Bulk-create approvals from an NDJSON or CSV upload (streamed request body).
+
+    Each row is validated against ApprovalRequest and must be PENDING;
+    `requester` fills rows that do not name one. The format comes from `format` or the Content-Type
+    (text/csv, otherwise NDJSON). Returns a result per input row and the
+    import throughput. Rows are written in BULK_CHUNK_SIZE transactions.
+    """
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    if fmt not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be csv or ndjson")
+    started = time.perf_counter()
+    results, batch = [], []
+
+    async def flush():
+        created = await adata.run(bulk.import_chunk, batch, now_iso())
+        for obj in created:
+            scheduler.track(obj)
+        results.extend(result for _, result in batch)
+        batch.clear()
+
+    async for line, raw in bulk.iter_records(request.stream(), fmt):
+        batch.append(bulk.validate(line, raw, requester))
+        if len(batch) >= bulk.BULK_CHUNK_SIZE:
+            await flush()
+    if batch:
+        await flush()
+    return FastJSONResponse(bulk.summary(results, "created", started))
+
+
+class BulkApproveRequest(BaseModel):
+    ids: List[str]
+
+
+@app.post("/approvals/approve")
+async def bulk_approve(req: BulkApproveRequest):
+    """Approve many approvals at once; one result per distinct id, plus throughput."""
+    started = time.perf_counter()
+    results = []
+    ids = list(dict.fromkeys(req.ids))
+    for i in range(0, len(ids), bulk.BULK_CHUNK_SIZE):
+        outcome = await adata.approve_approvals(ids[i:i + bulk.BULK_CHUNK_SIZE], now_iso())
+        for approval_id, status in outcome.items():
+            if status == "approved":
+                scheduler.forget(approval_id)
+            results.append({"id": approval_id, "status": status})
+    return FastJSONResponse(bulk.summary(results, "approved", started))
+
+
+def _agent_pass(concurrency: Optional[int]):
+    return {"actions": scheduler.run_all_due(datetime.now(timezone.utc), concurrency=concurrency)}
+
+
 @app.post("/agent/run")
-def run_agent():
-    """Run the LangGraph-driven agent logic against pending approvals.
+async def run_agent(concurrency: Optional[int] = Query(None, ge=1, le=LLM_CONCURRENCY_MAX), background: bool = False):
+    """Run the agent graph against pending approvals.
 
     Behavior:
     - If pending < 50% SLA -> no action
-    - If pending >= 50% SLA -> generate reminder
-    - If pending > SLA -> escalate
-    Each action is recorded in the audit log.
+    - If 50% SLA <= pending < SLA -> generate reminder
+    - If pending >= SLA -> escalate
+    Each action is recorded in the audit log. Reminders repeat at most once per
+    REMINDER_CADENCE_FRACTION * SLA, and an item is escalated once per breach.
+
+    LLM generation and notifications fan out over `concurrency` workers
+    (default AGENT_LLM_CONCURRENCY, at most AGENT_LLM_CONCURRENCY_MAX); audit
+    rows are written in selection order.
+
+    The background scheduler runs the same logic automatically as each
+    approval reaches a threshold; this endpoint forces an immediate pass.
+
+    The pass runs on the agent job pool (see jobs.py). With `background`
+    this returns 202 and the job id at once; poll GET /agent/jobs/{id} for
+    the actions.
+    """
+    job_id, future = await adata.run(jobs.submit, _agent_pass, {"concurrency": concurrency})
+    if background:
+        return JSONResponse(
+            {"job_id": job_id, "status": "queued"},
+            status_code=202,
+            headers={"Location": f"/agent/jobs/{job_id}"},
+        )
+    return await asyncio.wrap_future(future)
+
+
+@app.get("/agent/jobs")
+async def list_agent_jobs(limit: int = Query(20, ge=1, le=200)):
+    """Recent agent jobs, newest first."""
+    return await adata.list_agent_jobs(limit)
+
+
+@app.get("/agent/jobs/{job_id}")
+async def get_agent_job(job_id: str):
+    """Status of one agent job: queued, running, done (with `result`) or failed (with `error`)."""
+    job = await adata.get_agent_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/agent/forecast")
+async def agent_forecast(at: Optional[datetime] = None):
+    """What the agent would do to every pending approval at `at` (default now), as counts."""
+    at = at or datetime.now(timezone.utc)
+    if at.tzinfo is None:
+        at = at.replace(tzinfo=timezone.utc)
+    return {"at": at.isoformat(), **await adata.run(sla_batch.forecast, at)}
+
+
+@app.get("/stats")
+async def dashboard_stats(requester: Optional[str] = None, days: int = Query(30, ge=1, le=366)):
+    """Dashboard summary from the rollup tables (see rollups.py).
+
+    Approval counts by status, escalation level and requester, pending items
+    in the SLA warning window or past the SLA, per-vendor totals and a
+    histogram of hours-to-approve over the last `days`. `requester` narrows
+    the approval and SLA counts. No ETag: the SLA counts move with the clock.
     """
-    approvals = data.list_approvals()
-    now = datetime.now(timezone.utc)
-    actions = []
-    for a in approvals:
-        if a["status"] != "PENDING":
-            continue
-        res = run_once(a, now)
-        if res["action"] == "no_action":
-            # nothing to do
-            continue
-        if res["action"] == "send_reminder":
-            # record reminder and update last_reminder_at
-            a["last_reminder_at"] = now.isoformat()
-            data.save_approval(a)
-            data.log_audit({
-                "timestamp": now.isoformat(),
-                "approval_id": a["id"],
-                "actor": "agent",
-                "action": "reminder",
-                "message": res.get("message"),
-            })
-            actions.append({"id": a["id"], "action": "reminder"})
-        if res["action"] == "escalate":
-            # escalate: increment escalation_level and set status to ESCALATED
-            a["escalation_level"] = min(2, a.get("escalation_level", 0) + 1)
-            a["status"] = "ESCALATED"
-            data.save_approval(a)
-            data.log_audit({
-                "timestamp": now.isoformat(),
-                "approval_id": a["id"],
-                "actor": "agent",
-                "action": "escalation",
-                "message": res.get("message"),
-                "meta": {"escalation_level": a["escalation_level"]},
-            })
-            actions.append({"id": a["id"], "action": "escalation"})
-    return {"actions": actions}
+    return await adata.run(rollups.summary, datetime.now(timezone.utc), days, requester)
+
+
+@app.get("/agent/graph/stats")
+async def agent_graph_stats():
+    """Node list of the compiled agent graph, with call counts and timings per node."""
+    return {"nodes": agent_langgraph.graph.node_names, "timings": agent_langgraph.node_timings.stats()}
+
+
+@app.get("/agent/llm/stats")
+async def llm_stats():
+    """Reuse counters for the shared Azure OpenAI clients and the response cache."""
+    cache = agent_langgraph.response_cache
+    return {
+        "clients": dict(client_stats),
+        "cache": cache.stats() if cache is not None else None,
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    """Counters and latency histograms in the Prometheus text format (see telemetry)."""
+    # Gauges are collected from the database at scrape time
+    return Response(await adata.run(telemetry.render), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/notifications/stats")
+async def notification_stats():
+    """Outbox message counts per channel and status."""
+    return {"running": dispatcher.running, "outbox": await adata.run(dispatcher.stats)}
 
 
 @app.get("/audit")
-def get_audit():
-    return data.list_audit()
+async def get_audit(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    include_archived: bool = False,
+):
+    """Audit log, newest first.
+
+    Without `limit` this returns the latest 200 rows. With it, it returns one
+    page plus an X-Next-Cursor header, like GET /approvals; `include_archived`
+    continues into archived segments once the live rows run out.
+    """
+    cached = await _not_modified(request, response)
+    if cached:
+        return cached
+    if limit is None:
+        return _listing(await adata.list_audit(), response)
+    items, next_key = await adata.run(
+        audit_archive.list_audit_stream,
+        limit,
+        after=_decode_cursor(cursor, (str, int)) if cursor else None,
+        include_archived=include_archived,
+    )
+    if next_key:
+        response.headers["X-Next-Cursor"] = _encode_cursor(next_key)
+    return _listing(items, response)
+
+
+@app.get("/approvals/{approval_id}/audit")
+async def get_approval_audit(approval_id: str, include_archived: bool = False):
+    """Timeline for one approval, oldest first, optionally including archived rows."""
+    live = await adata.list_audit_for_approval(approval_id)
+    if not include_archived:
+        return live
+    return await adata.run(audit_archive.archived_timeline, approval_id) + live
+
+
+@app.get("/changes")
+async def get_changes(since: int = Query(0, ge=0), requester: Optional[str] = None):
+    """Approvals and audit rows written after change version `since`."""
+    return await adata.list_changes(since, requester=requester)
+
+
+@app.get("/events")
+async def change_events(request: Request, since: Optional[int] = None):
+    """Server-Sent Events: a `change` event carrying the new version after each write."""
+    last_id = request.headers.get("last-event-id")
+    if since is None and last_id and last_id.isdigit():
+        since = int(last_id)
+    return StreamingResponse(
+        event_stream(request, since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 if __name__ == "__main__":
@@ -1,4 +1,4 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Literal, Optional, Dict, Any
 from pydantic import BaseModel, Field
 from datetime import datetime
 
@@ -14,11 +14,12 @@ class ApprovalRequest(BaseModel):
     vendor_name: str
     amount: float
     approvers: List[Approver]
-    status: str = Field("PENDING")  # PENDING | APPROVED | ESCALATED
+    status: Literal["PENDING", "APPROVED", "ESCALATED"] = Field("PENDING")
     submitted_at: datetime
     sla_hours: int
     last_reminder_at: Optional[datetime] = None
     escalation_level: int = 0  # 0 = none, 1 = chair, 2 = finance head
+    requester: Optional[str] = None
 
 
 class AuditEntry(BaseModel):
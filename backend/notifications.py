@@ -1,11 +1,77 @@
+import logging
 import os
+import random
 import smtplib
-import requests
+import threading
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from dotenv import load_dotenv
 
-load_dotenv()
+from . import data, telemetry
+
+# Outbound queue settings. When the dispatcher is running, notify_all only
+# writes to the outbox table and background workers do the sending.
+NOTIFICATION_QUEUE_ENABLED = os.getenv("NOTIFICATION_QUEUE_ENABLED", "1") == "1"
+NOTIFICATION_DIGEST = os.getenv("NOTIFICATION_DIGEST", "0") == "1"
+# In digest mode, how long a woken worker waits for more messages to coalesce.
+NOTIFY_DIGEST_WINDOW_SECONDS = float(os.getenv("NOTIFY_DIGEST_WINDOW_SECONDS", 2.0))
+OUTLOOK_ENABLED = os.getenv("OUTLOOK_ENABLED", "0") == "1"
+CHANNEL_WORKERS = {
+    "teams": int(os.getenv("NOTIFY_TEAMS_WORKERS", 4)),
+    "outlook": int(os.getenv("NOTIFY_OUTLOOK_WORKERS", 1)),
+}
+NOTIFY_BATCH_SIZE = int(os.getenv("NOTIFY_BATCH_SIZE", 50))
+NOTIFY_MAX_ATTEMPTS = int(os.getenv("NOTIFY_MAX_ATTEMPTS", 5))
+NOTIFY_BACKOFF_SECONDS = float(os.getenv("NOTIFY_BACKOFF_SECONDS", 5))
+NOTIFY_BACKOFF_MAX_SECONDS = 600.0
+# A message still 'sending' this long after its claim belongs to a dead worker
+# and is requeued. Must stay well above the time to send one claimed batch
+# (up to NOTIFY_BATCH_SIZE sends at the 30 s SMTP / 5 s Teams timeouts), or
+# live sends get delivered twice.
+NOTIFY_STALE_SECONDS = float(os.getenv("NOTIFY_STALE_SECONDS", 1800))
+# How often the workers look for stale messages.
+NOTIFY_REQUEUE_INTERVAL_SECONDS = 60.0
+
+
+class _SMTPSession:
+    """One logged-in SMTP connection, reopened when the server drops it."""
+
+    def __init__(self):
+        self.server = None
+
+    def _open(self, host, port, user, password):
+        server = smtplib.SMTP(host, port, timeout=30)
+        server.starttls()
+        server.login(user, password)
+        self.server = server
+
+    def send(self, msg, host, port, user, password):
+        if self.server is None:
+            self._open(host, port, user, password)
+        try:
+            self.server.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            self._open(host, port, user, password)
+            self.server.send_message(msg)
+
+    def close(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except smtplib.SMTPException:
+                pass
+            self.server = None
+
+
+def _observe_send(channel, start, error=None):
+    seconds = time.perf_counter() - start
+    telemetry.NOTIFY_SECONDS.observe(seconds, channel=channel, outcome="error" if error else "ok")
+    if error:
+        telemetry.NOTIFY_FAILURES.inc(channel=channel)
+        telemetry.log_event("notification_failed", logging.WARNING, channel=channel, duration_ms=round(1000 * seconds, 1), error=str(error))
+    else:
+        telemetry.log_event("notification_sent", channel=channel, duration_ms=round(1000 * seconds, 1))
+
 
 class NotificationManager:
     """
@@ -13,8 +79,38 @@ class NotificationManager:
     Supports Microsoft Teams (Webhooks) and Outlook (SMTP).
     """
 
+    _http = None
+    _http_lock = threading.Lock()
+    # One SMTP session per sending thread, kept open across messages.
+    _smtp = threading.local()
+
+    @classmethod
+    def _session(cls):
+        with cls._http_lock:
+            if cls._http is None:
+                # Note: verify=False is used to bypass SSL certificate issues common in hackathon environments.
+                # In a production environment, you should ensure local certificates are correctly configured.
+                import requests
+                import urllib3
+                urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+                session = requests.Session()
+                session.verify = False
+                pool = max(CHANNEL_WORKERS["teams"], 10)
+                session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=pool, pool_maxsize=pool))
+                cls._http = session
+            return cls._http
+
     @staticmethod
-    def send_teams_message(title, message):
+    def teams_configured():
+        return bool(os.getenv("TEAMS_WEBHOOK_URL"))
+
+    @staticmethod
+    def outlook_configured():
+        return bool(os.getenv("OUTLOOK_EMAIL") and os.getenv("OUTLOOK_PASSWORD"))
+
+    @classmethod
+    def send_teams_message(cls, title, message):
         """Sends a message to a Microsoft Teams channel via Webhook."""
         webhook_url = os.getenv("TEAMS_WEBHOOK_URL")
         if not webhook_url:
@@ -39,23 +135,21 @@ class NotificationManager:
             ]
         }
 
+        start = time.perf_counter()
         try:
-            # Note: verify=False is used to bypass SSL certificate issues common in hackathon environments.
-            # In a production environment, you should ensure local certificates are correctly configured.
-            import urllib3
-            urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-            
-            response = requests.post(webhook_url, json=payload, timeout=5, verify=False)
+            response = cls._session().post(webhook_url, json=payload, timeout=5)
             response.raise_for_status()
             print(f"✅ Teams notification sent: {title}")
+            _observe_send("teams", start)
             return True
         except Exception as e:
             print(f"❌ Failed to send Teams notification: {e}")
+            _observe_send("teams", start, e)
             return False
 
-    @staticmethod
-    def send_outlook_email(recipient, subject, body):
-        """Sends an email via Outlook SMTP."""
+    @classmethod
+    def send_outlook_email(cls, recipient, subject, body):
+        """Sends an email via Outlook SMTP, reusing this thread's open connection."""
         smtp_server = os.getenv("SMTP_SERVER", "smtp.office365.com")
         smtp_port = int(os.getenv("SMTP_PORT", 587))
         sender_email = os.getenv("OUTLOOK_EMAIL")
@@ -71,27 +165,190 @@ class NotificationManager:
         msg['Subject'] = subject
         msg.attach(MIMEText(body, 'plain'))
 
+        start = time.perf_counter()
         try:
-            server = smtplib.SMTP(smtp_server, smtp_port)
-            server.starttls()
-            server.login(sender_email, sender_password)
-            server.send_message(msg)
-            server.quit()
+            session = getattr(cls._smtp, "session", None)
+            if session is None:
+                session = cls._smtp.session = _SMTPSession()
+            session.send(msg, smtp_server, smtp_port, sender_email, sender_password)
             print(f"✅ Outlook email sent to {recipient}: {subject}")
+            _observe_send("outlook", start)
             return True
         except Exception as e:
             print(f"❌ Failed to send Outlook email: {e}")
+            _observe_send("outlook", start, e)
+            cls.close_smtp()
             return False
 
     @classmethod
-    def notify_all(cls, title, message, recipient_email=None):
-        """Helper to send to all configured channels."""
+    def close_smtp(cls):
+        session = getattr(cls._smtp, "session", None)
+        if session is not None:
+            session.close()
+
+    @classmethod
+    def notify_all(cls, title, message, recipient_email=None, kind=None):
+        """Helper to send to all configured channels.
+
+        While the dispatcher is running the message is queued in the outbox
+        and this returns immediately; otherwise it is sent inline.
+        """
         print(f"\n📣 [AGENT NOTIFICATION]: {title}")
         print(f"📄 {message}\n")
-        
+
+        if dispatcher.running:
+            items = []
+            if cls.teams_configured():
+                items.append({"channel": "teams", "kind": kind, "recipient": None, "title": title, "message": message})
+            else:
+                print("⚠️ [Teams Mock]: Webhook URL not set. Notification skipped.")
+            if OUTLOOK_ENABLED and recipient_email and cls.outlook_configured():
+                items.append({"channel": "outlook", "kind": kind, "recipient": recipient_email, "title": title, "message": message})
+            dispatcher.enqueue(items)
+            return
+
         # 1. Notify via Teams
         cls.send_teams_message(title, message)
-        
-        # 2. Notify via Outlook (Temporarily disabled)
-        # if recipient_email:
-        #     cls.send_outlook_email(recipient_email, title, message)
+
+        # 2. Notify via Outlook (disabled unless OUTLOOK_ENABLED=1)
+        if OUTLOOK_ENABLED and recipient_email:
+            cls.send_outlook_email(recipient_email, title, message)
+
+
+def _coalesce(rows):
+    """Group claimed rows into sends. In digest mode, reminders to the same
+    recipient on the same channel become one message."""
+    if not NOTIFICATION_DIGEST:
+        return [[r] for r in rows]
+    groups, digests = [], {}
+    for r in rows:
+        if r["kind"] != "reminder":
+            groups.append([r])
+            continue
+        key = r["recipient"]
+        if key not in digests:
+            digests[key] = []
+            groups.append(digests[key])
+        digests[key].append(r)
+    return groups
+
+
+def _render(group):
+    if len(group) == 1:
+        return group[0]["title"], group[0]["message"]
+    title = f"📅 SLA Reminders: {len(group)} approvals need attention"
+    body = "\n\n".join(f"**{r['title']}**\n{r['message']}" for r in group)
+    return title, body
+
+
+class NotificationDispatcher:
+    """Drains the outbox with a fixed number of worker threads per channel.
+
+    Failed sends are retried with exponential backoff up to
+    NOTIFY_MAX_ATTEMPTS, then marked failed. Messages left in 'sending' for
+    NOTIFY_STALE_SECONDS (a crashed process or worker) are requeued on start
+    and then periodically by the workers.
+    """
+
+    def __init__(self, workers=None, poll_seconds=1.0):
+        self.workers = workers or CHANNEL_WORKERS
+        self.poll_seconds = poll_seconds
+        self._wake = {channel: threading.Event() for channel in self.workers}
+        self._threads = []
+        self._stopping = threading.Event()
+        self._requeue_lock = threading.Lock()
+        self._next_requeue = 0.0
+        self.running = False
+
+    def enqueue(self, items):
+        if not items:
+            return
+        data.enqueue_notifications(items, time.time())
+        for item in items:
+            self._wake[item["channel"]].set()
+
+    def _send(self, channel, group):
+        title, message = _render(group)
+        if channel == "teams":
+            return NotificationManager.send_teams_message(title, message)
+        return NotificationManager.send_outlook_email(group[0]["recipient"], title, message)
+
+    def _requeue_stale(self):
+        # Workers share one schedule, so this runs once per interval in total.
+        now = time.time()
+        with self._requeue_lock:
+            if now < self._next_requeue:
+                return
+            self._next_requeue = now + NOTIFY_REQUEUE_INTERVAL_SECONDS
+        try:
+            requeued = data.requeue_stale_outbox(now - NOTIFY_STALE_SECONDS)
+        except Exception as e:
+            print(f"❌ Outbox requeue failed: {e}")
+            return
+        if requeued:
+            print(f"⚠️ Requeued {requeued} stale outbox messages")
+
+    def _worker(self, channel):
+        wake = self._wake[channel]
+        while not self._stopping.is_set():
+            self._requeue_stale()
+            try:
+                rows = data.claim_outbox(channel, NOTIFY_BATCH_SIZE, time.time())
+            except Exception as e:
+                print(f"❌ Outbox claim failed for {channel}: {e}")
+                rows = []
+            if not rows:
+                if channel == "outlook":
+                    # Don't hold an idle SMTP login open
+                    NotificationManager.close_smtp()
+                woken = wake.wait(self.poll_seconds)
+                wake.clear()
+                if woken and NOTIFICATION_DIGEST:
+                    self._stopping.wait(NOTIFY_DIGEST_WINDOW_SECONDS)
+                continue
+            for group in _coalesce(rows):
+                ids = [r["id"] for r in group]
+                if self._send(channel, group):
+                    data.complete_outbox(ids)
+                    continue
+                attempts = max(r["attempts"] for r in group) + 1
+                if attempts >= NOTIFY_MAX_ATTEMPTS:
+                    data.retry_outbox(ids, None, "max attempts reached")
+                else:
+                    delay = min(NOTIFY_BACKOFF_MAX_SECONDS, NOTIFY_BACKOFF_SECONDS * 2 ** (attempts - 1))
+                    data.retry_outbox(ids, time.time() + delay * random.uniform(0.5, 1.0), "send failed")
+        if channel == "outlook":
+            NotificationManager.close_smtp()
+
+    def start(self):
+        if self.running:
+            return
+        self._next_requeue = 0.0
+        self._requeue_stale()
+        self._stopping.clear()
+        for channel, count in self.workers.items():
+            for n in range(count):
+                t = threading.Thread(target=self._worker, args=(channel,), name=f"notify-{channel}-{n}", daemon=True)
+                t.start()
+                self._threads.append(t)
+        self.running = True
+
+    def stop(self, timeout=10.0):
+        self.running = False
+        self._stopping.set()
+        for event in self._wake.values():
+            event.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def stats(self):
+        return data.outbox_counts()
+
+
+dispatcher = NotificationDispatcher()
+
+telemetry.register(telemetry.Gauge(
+    "approval_notification_outbox", "Outbox messages per channel and status.", ["channel", "status"],
+    lambda: {(channel, status): n for channel, counts in data.outbox_counts().items() for status, n in counts.items()},
+))
@@ -0,0 +1,107 @@
+"""
+Dashboard rollups.
+
+Summary tables that SQLite triggers update inside every write to approvals
+and audit (see data._migration_3), so GET /stats reads a handful of small
+rows instead of scanning either table. Amounts are kept as integer cents and
+latency as integer seconds, so the running sums are exact:
+
+- rollup_approval_counts: approvals and their amount per (status,
+  escalation level, requester)
+- rollup_vendors: approvals, amount, open items and SLA breaches per vendor
+- rollup_approval_latency: approvals per UTC day and hours-to-approve bucket
+  (data.LATENCY_BUCKETS_HOURS)
+
+The triggers cover every writer, including scripts that open the database
+directly. After changing the latency buckets, or to recount from the source
+tables, rebuild with:
+    python -m backend.rollups --rebuild
+
+To verify that the incremental tables match a rebuild, without changing
+either (exits 1 and prints the differing rows if they don't):
+    python -m backend.rollups --check
+"""
+import argparse
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from . import data
+
+
+def _mean(seconds: int, n: int) -> Optional[float]:
+    return round(seconds / 3600 / n, 2) if n else None
+
+
+def summary(now: datetime, days: int = 30, requester: Optional[str] = None) -> Dict[str, Any]:
+    """The GET /stats document; `requester` narrows the approval and SLA counts."""
+    rows = data.get_rollups((now - timedelta(days=days - 1)).date().isoformat(), requester)
+
+    by_status: Dict[str, int] = {}
+    by_level: Dict[str, int] = {}
+    by_requester: Dict[str, int] = {}
+    total, cents = 0, 0
+    for status, level, req, n, value in rows["counts"]:
+        by_status[status] = by_status.get(status, 0) + n
+        by_level[str(level)] = by_level.get(str(level), 0) + n
+        by_requester[req] = by_requester.get(req, 0) + n
+        total += n
+        cents += value
+
+    buckets = len(data.LATENCY_BUCKETS_HOURS) + 1
+    by_day: Dict[str, Dict[str, Any]] = {}
+    for day, bucket, n, seconds in rows["latency"]:
+        entry = by_day.setdefault(day, {"day": day, "counts": [0] * buckets, "approved": 0, "seconds": 0})
+        entry["counts"][bucket] += n
+        entry["approved"] += n
+        entry["seconds"] += seconds
+    counts = [sum(d["counts"][i] for d in by_day.values()) for i in range(buckets)]
+    approved = sum(counts)
+
+    return {
+        "at": now.isoformat(),
+        "approvals": {
+            "total": total,
+            "amount": cents / 100,
+            "by_status": by_status,
+            "by_escalation_level": by_level,
+            "by_requester": by_requester,
+        },
+        "sla": data.sla_phase_counts(now, requester),
+        "vendors": [
+            {"vendor_name": v, "approvals": n, "amount": value / 100, "open": open_, "open_amount": open_value / 100, "breaches": breaches}
+            for v, n, value, open_, open_value, breaches in rows["vendors"]
+        ],
+        "approval_latency": {
+            "days": days,
+            "bucket_hours": list(data.LATENCY_BUCKETS_HOURS),
+            "counts": counts,
+            "approved": approved,
+            "mean_hours": _mean(sum(d["seconds"] for d in by_day.values()), approved),
+            "by_day": [
+                {"day": d["day"], "counts": d["counts"], "approved": d["approved"], "mean_hours": _mean(d["seconds"], d["approved"])}
+                for d in by_day.values()
+            ],
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show, check or rebuild the dashboard rollup tables.")
+    parser.add_argument("--rebuild", action="store_true", help="recompute the rollups from approvals and audit first")
+    parser.add_argument("--check", action="store_true", help="compare the rollups with a rebuild and print the differences")
+    parser.add_argument("--days", type=int, default=30)
+    args = parser.parse_args()
+    data.init_db()
+    if args.check:
+        diff = data.check_rollups()
+        print(json.dumps(diff, indent=2) if diff else "rollups match a rebuild")
+        sys.exit(1 if diff else 0)
+    if args.rebuild:
+        data.rebuild_rollups()
+    print(json.dumps(summary(datetime.now(timezone.utc), args.days), indent=2))
+
+
+if __name__ == "__main__":
+    main()
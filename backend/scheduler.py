@@ -0,0 +1,205 @@
+"""
+Background SLA scheduler.
+
+Keeps a min-heap of the next threshold crossing (reminder due or SLA breach)
+for every PENDING approval and sleeps until the earliest one, then runs the
+agent only over the approvals that came due. The heap is updated as approvals
+are created, approved, reminded and escalated, so nothing rescans the table.
+
+Heap entries are invalidated lazily: `_due` holds the current time for each
+tracked approval, and popped entries that no longer match it are dropped.
+
+Every pass leases its approvals first (data.claim_due_approvals), so passes
+in other threads or processes never handle the same row. With AGENT_SHARDS
+above 1, each process only schedules the approvals of its AGENT_SHARD.
+"""
+import heapq
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from . import data
+from .agent_langgraph import run_agent_pass
+
+AGENT_SCHEDULER_ENABLED = os.getenv("AGENT_SCHEDULER_ENABLED", "1") == "1"
+# Re-check delay for items that were due but are still pending after a pass
+# (another pass held the lease, or the pass failed).
+RETRY_SECONDS = float(os.getenv("AGENT_SCHEDULER_RETRY_SECONDS", 60))
+# How long a claimed approval stays reserved for a pass; must outlast the slowest pass.
+LEASE_SECONDS = float(os.getenv("AGENT_LEASE_SECONDS", 300))
+AGENT_SHARDS = int(os.getenv("AGENT_SHARDS", 1))
+AGENT_SHARD = int(os.getenv("AGENT_SHARD", 0))
+
+
+def _ts(iso: str) -> float:
+    return datetime.fromisoformat(iso).timestamp()
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class SLAScheduler:
+    def __init__(self, clock: Callable[[], datetime] = _utcnow, concurrency: Optional[int] = None, shard: int = AGENT_SHARD, shards: int = AGENT_SHARDS):
+        self.clock = clock
+        self.concurrency = concurrency
+        self.shard = shard
+        self.shards = shards
+        self._heap: List[Tuple[float, str]] = []
+        self._due: Dict[str, float] = {}
+        self._cond = threading.Condition()
+        # Serializes agent passes so the scheduler and POST /agent/run never
+        # act on the same approval at once.
+        self._pass_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._loaded = False
+
+    # --- heap maintenance -------------------------------------------------
+
+    def _owns(self, approval_id: str) -> bool:
+        return self.shards <= 1 or data.shard_of(approval_id, self.shards) == self.shard
+
+    def _push(self, approval_id: str, due: float):
+        if not self._owns(approval_id):
+            return
+        with self._cond:
+            if not self._loaded:
+                # Nothing to keep in step with until load() (e.g. scheduler disabled)
+                return
+            self._due[approval_id] = due
+            heapq.heappush(self._heap, (due, approval_id))
+            if self._heap[0][1] == approval_id:
+                self._cond.notify()
+
+    def load(self):
+        """Rebuild the heap from every PENDING approval in the DB."""
+        # reminder_due_at, when set, is always before the deadline
+        entries = [(_ts(r or d), i) for i, r, d in data.list_pending_deadlines() if self._owns(i)]
+        heapq.heapify(entries)
+        with self._cond:
+            self._heap = entries
+            self._due = {i: t for t, i in entries}
+            self._loaded = True
+            self._cond.notify()
+
+    def track(self, approval: Dict[str, Any], after: Optional[datetime] = None):
+        """Schedule the next crossing for a PENDING approval, or forget it otherwise.
+
+        With `after` (the pass that just ran), the next crossing is scheduled
+        exactly. A crossing at or before `after` means the pass did not act
+        on the item (another pass held its lease), so it is re-checked after
+        RETRY_SECONDS.
+        """
+        if approval["status"] != "PENDING":
+            self.forget(approval["id"])
+            return
+        reminder_due, deadline = data.sla_deadlines(approval["submitted_at"], approval["sla_hours"], approval.get("last_reminder_at"))
+        # reminder_due_at, when set, is always before the deadline
+        due = _ts(reminder_due or deadline)
+        if after is not None and due <= after.timestamp():
+            due = after.timestamp() + RETRY_SECONDS
+        self._push(approval["id"], due)
+
+    def forget(self, approval_id: str):
+        with self._cond:
+            self._due.pop(approval_id, None)
+
+    def next_due(self) -> Optional[float]:
+        """Epoch seconds of the earliest live entry, or None if nothing is scheduled."""
+        with self._cond:
+            self._drop_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def _drop_stale(self):
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def _pop_due(self, now: float) -> List[str]:
+        ids = []
+        with self._cond:
+            self._drop_stale()
+            while self._heap and self._heap[0][0] <= now:
+                _, approval_id = heapq.heappop(self._heap)
+                del self._due[approval_id]
+                ids.append(approval_id)
+                self._drop_stale()
+        return ids
+
+    # --- agent passes -----------------------------------------------------
+
+    def run_pending(self, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Process the approvals whose next crossing is at or before `now`."""
+        now = now or self.clock()
+        ids = self._pop_due(now.timestamp())
+        if not ids:
+            return []
+        with self._pass_lock:
+            token = uuid.uuid4().hex
+            approvals = data.claim_approvals(ids, now, token, LEASE_SECONDS)
+            claimed = {a["id"] for a in approvals}
+            # Leased by another pass or no longer pending: reschedule from the current row
+            for a in data.get_approvals([i for i in ids if i not in claimed]):
+                self.track(a, after=now)
+            return self._process(approvals, now, self.concurrency, token)
+
+    def run_all_due(self, now: datetime, concurrency: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Full due-work pass over every shard (POST /agent/run); keeps the heap in step."""
+        with self._pass_lock:
+            token = uuid.uuid4().hex
+            approvals = data.claim_due_approvals(now, token, LEASE_SECONDS)
+            return self._process(approvals, now, concurrency or self.concurrency, token)
+
+    def _process(self, approvals: List[Dict[str, Any]], now: datetime, concurrency: Optional[int], token: str) -> List[Dict[str, Any]]:
+        try:
+            actions = run_agent_pass(approvals, now, concurrency=concurrency, lease_token=token, lease_seconds=LEASE_SECONDS)
+        except Exception:
+            for a in approvals:
+                self._push(a["id"], now.timestamp() + RETRY_SECONDS)
+            raise
+        for a in approvals:
+            self.track(a, after=now)
+        return actions
+
+    # --- background thread ------------------------------------------------
+
+    def _wait_for_work(self) -> bool:
+        with self._cond:
+            while not self._stopping:
+                self._drop_stale()
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                delay = self._heap[0][0] - self.clock().timestamp()
+                if delay <= 0:
+                    return True
+                self._cond.wait(delay)
+            return False
+
+    def _loop(self):
+        while self._wait_for_work():
+            try:
+                self.run_pending()
+            except Exception as e:
+                print(f"❌ SLA scheduler pass failed: {e}")
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self.load()
+        self._thread = threading.Thread(target=self._loop, name="sla-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+scheduler = SLAScheduler()
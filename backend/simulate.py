@@ -0,0 +1,315 @@
+"""
+Discrete-event SLA simulator.
+
+Replays weeks of approval traffic against a scratch database in seconds, on
+a virtual clock. Synthetic requests arrive as a Poisson stream
+(--arrivals-per-hour) with SLAs drawn from --sla-hours. Each one is approved
+after an exponential delay (--approve-mean-hours), and a --never-approved
+fraction is never approved. The agent runs either as the in-process
+SLAScheduler, waking exactly at each crossing, or as agent_worker polls
+every --tick-minutes. Both read the virtual clock.
+
+While it runs, the graph's generate and notify nodes are swapped for
+counting stubs, so no LLM or webhook is called. The stubs count LLM
+requests (batched per AGENT_LLM_BATCH_* as the real node would) and
+notifications. The report covers agent wakeups, actions, LLM and
+notification volume (total and peak per hour), and how late reminders and
+escalations landed against their thresholds. Use it to plan tick frequency
+and provider load before changing production settings:
+
+    python -m backend.simulate --days 28 --arrivals-per-hour 20
+    python -m backend.simulate --days 28 --mode interval --tick-minutes 60
+
+The scratch database is a temporary file unless --db is given. Point the app
+at it with APPROVALS_DB_PATH to browse the simulated state.
+"""
+import argparse
+import heapq
+import itertools
+import json
+import logging
+import math
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from . import agent_langgraph, agent_worker, data, telemetry
+from .agent_graph import Node, compile_graph
+from .scheduler import SLAScheduler
+
+VENDORS = ["Acme Supplies", "Global Widgets", "NorthTech", "Zenith Services"]
+REQUESTERS = ["requester1", "requester2"]
+APPROVERS = [
+    {"name": "Alice", "role": "Reviewer", "level": 1},
+    {"name": "Bob", "role": "Chair", "level": 2},
+]
+
+
+class SimClock:
+    """Virtual time; call it for the current instant (the `clock` the scheduler and worker take)."""
+
+    def __init__(self, start: datetime):
+        self.now = start
+
+    def __call__(self) -> datetime:
+        return self.now
+
+
+def _lag_summary(minutes: List[float]) -> Dict[str, Optional[float]]:
+    if not minutes:
+        return {"count": 0, "mean_min": None, "p95_min": None, "max_min": None}
+    ordered = sorted(minutes)
+    return {
+        "count": len(ordered),
+        "mean_min": round(sum(ordered) / len(ordered), 1),
+        "p95_min": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 1),
+        "max_min": round(ordered[-1], 1),
+    }
+
+
+class Simulation:
+    def __init__(
+        self,
+        start: datetime,
+        days: float,
+        arrivals_per_hour: float,
+        sla_hours: List[int],
+        approve_mean_hours: float,
+        never_approved: float = 0.0,
+        mode: str = "scheduler",
+        tick_minutes: float = 15.0,
+        seed: int = 7,
+    ):
+        self.start = start
+        self.end = start + timedelta(days=days)
+        self.arrivals_per_hour = arrivals_per_hour
+        self.sla_hours = sla_hours
+        self.approve_mean_hours = approve_mean_hours
+        self.never_approved = never_approved
+        self.mode = mode
+        self.tick_minutes = tick_minutes
+        self.rnd = random.Random(seed)
+        self.clock = SimClock(start)
+        self.scheduler = SLAScheduler(clock=self.clock, concurrency=1) if mode == "scheduler" else None
+        self._events: List[tuple] = []
+        self._seq = itertools.count()
+        self._ids = itertools.count()
+        self.counts: Counter = Counter()
+        self.per_hour: Dict[str, Counter] = {"llm_requests": Counter(), "notifications": Counter()}
+        self.lag_minutes: Dict[str, List[float]] = {"reminder": [], "escalation": []}
+
+    # --- events -----------------------------------------------------------
+
+    def _at(self, when: datetime, kind: str, payload: Any = None):
+        heapq.heappush(self._events, (when.timestamp(), next(self._seq), kind, payload))
+
+    def _next_arrival(self):
+        if self.arrivals_per_hour > 0:
+            self._at(self.clock.now + timedelta(hours=self.rnd.expovariate(self.arrivals_per_hour)), "arrival")
+
+    def _arrival(self):
+        now = self.clock.now
+        obj = {
+            "id": f"sim-{next(self._ids):07d}",
+            "vendor_name": self.rnd.choice(VENDORS),
+            "amount": round(self.rnd.uniform(500, 50000), 2),
+            "approvers": APPROVERS,
+            "status": "PENDING",
+            "submitted_at": now.isoformat(),
+            "sla_hours": self.rnd.choice(self.sla_hours),
+            "last_reminder_at": None,
+            "escalation_level": 0,
+            "requester": self.rnd.choice(REQUESTERS),
+        }
+        data.insert_approvals([obj], [{
+            "timestamp": obj["submitted_at"],
+            "approval_id": obj["id"],
+            "actor": obj["requester"],
+            "action": "created",
+            "message": f"Simulated approval for {obj['vendor_name']} ${obj['amount']}",
+        }])
+        if self.scheduler is not None:
+            self.scheduler.track(obj)
+        self.counts["arrivals"] += 1
+        if self.rnd.random() >= self.never_approved:
+            self._at(now + timedelta(hours=self.rnd.expovariate(1 / self.approve_mean_hours)), "approve", obj["id"])
+        self._next_arrival()
+
+    def _approve(self, approval_id: str):
+        outcome = data.approve_approvals([approval_id], self.clock.now.isoformat())
+        if outcome[approval_id] == "approved":
+            self.counts["approved"] += 1
+            if self.scheduler is not None:
+                self.scheduler.forget(approval_id)
+
+    def _tick(self):
+        totals = agent_worker.drain(concurrency=1, clock=self.clock)
+        self.counts["wakeups"] += 1
+        self.counts["passes"] += totals["passes"]
+        self._at(self.clock.now + timedelta(minutes=self.tick_minutes), "tick")
+
+    # --- stub graph nodes -------------------------------------------------
+
+    def _hour(self) -> int:
+        return int(self.clock.now.timestamp() // 3600)
+
+    def _generate(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        self._count_llm([state["prompt"]], 1)
+        return {"message": state["prompt"]}
+
+    def _generate_batch(self, states: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        prompts = [s["prompt"] for s in states]
+        self._count_llm(prompts, len(agent_langgraph._pack_prompts(prompts)))
+        return [{"message": p} for p in prompts]
+
+    def _count_llm(self, prompts: List[str], requests: int):
+        self.counts["llm_prompts"] += len(prompts)
+        self.counts["llm_requests"] += requests
+        self.counts["llm_prompt_tokens_est"] += sum(map(agent_langgraph._estimate_tokens, prompts))
+        self.per_hour["llm_requests"][self._hour()] += requests
+
+    def _notify(self, state: Dict[str, Any]) -> None:
+        self.counts[f"notifications_{state['kind']}"] += 1
+        recipients = [r for r in (state.get("recipient") or "").split(",") if r.strip()]
+        self.counts["email_recipients"] += len(recipients)
+        self.per_hour["notifications"][self._hour()] += 1
+
+    def _observe(self, state: Dict[str, Any]) -> None:
+        """Before persist: how far past its threshold each action landed."""
+        a = state["approval"]
+        reminder_due, deadline = data.sla_deadlines(a["submitted_at"], a["sla_hours"], a.get("last_reminder_at"))
+        due = reminder_due if state["action"] == "send_reminder" else deadline
+        kind = "reminder" if state["action"] == "send_reminder" else "escalation"
+        self.lag_minutes[kind].append((state["now"] - datetime.fromisoformat(due)).total_seconds() / 60)
+
+    def _graph(self):
+        stubs = {
+            "generate": Node("generate", self._generate, batch=self._generate_batch if agent_langgraph.LLM_BATCH_ENABLED else None),
+            "notify": Node("notify", self._notify),
+            "observe": Node("observe", self._observe, ordered=True),
+        }
+        names = agent_langgraph.graph.node_names
+        at = names.index("persist") if "persist" in names else len(names)
+        specs = names[:at] + ["observe"] + names[at:]
+        return compile_graph(specs, {**agent_langgraph.NODES, **stubs})
+
+    # --- main loop --------------------------------------------------------
+
+    def run(self) -> Dict[str, Any]:
+        real_graph = agent_langgraph.graph
+        agent_langgraph.graph = self._graph()
+        began = time.perf_counter()
+        try:
+            if self.scheduler is not None:
+                self.scheduler.load()
+            else:
+                self._at(self.start, "tick")
+            self._next_arrival()
+            handlers = {"arrival": lambda _: self._arrival(), "approve": self._approve, "tick": lambda _: self._tick()}
+            end = self.end.timestamp()
+            while True:
+                next_event = self._events[0][0] if self._events else math.inf
+                next_due = self.scheduler.next_due() if self.scheduler is not None else None
+                if next_due is not None and next_due <= next_event:
+                    if next_due > end:
+                        break
+                    self.clock.now = datetime.fromtimestamp(next_due, timezone.utc)
+                    self.scheduler.run_pending()
+                    self.counts["wakeups"] += 1
+                    self.counts["passes"] += 1
+                    continue
+                if next_event > end:
+                    break
+                t, _, kind, payload = heapq.heappop(self._events)
+                self.clock.now = datetime.fromtimestamp(t, timezone.utc)
+                handlers[kind](payload)
+        finally:
+            agent_langgraph.graph = real_graph
+        return self.report(time.perf_counter() - began)
+
+    def report(self, wall_seconds: float) -> Dict[str, Any]:
+        simulated = (self.end - self.start).total_seconds()
+        days = simulated / 86400
+        c = self.counts
+        notifications = c["notifications_reminder"] + c["notifications_escalation"]
+        return {
+            "start": self.start.isoformat(),
+            "end": self.end.isoformat(),
+            "mode": self.mode,
+            "tick_minutes": self.tick_minutes if self.mode == "interval" else None,
+            "wall_seconds": round(wall_seconds, 2),
+            "speedup": round(simulated / wall_seconds) if wall_seconds else None,
+            "approvals": {
+                "arrived": c["arrivals"],
+                "approved": c["approved"],
+                "open_at_end": c["arrivals"] - c["approved"],
+            },
+            "agent": {
+                "wakeups": c["wakeups"],
+                "passes": c["passes"],
+                "wakeups_per_day": round(c["wakeups"] / days, 1) if days else None,
+                "reminder_lag": _lag_summary(self.lag_minutes["reminder"]),
+                "escalation_lag": _lag_summary(self.lag_minutes["escalation"]),
+            },
+            "llm": {
+                "batched": agent_langgraph.LLM_BATCH_ENABLED,
+                "prompts": c["llm_prompts"],
+                "requests": c["llm_requests"],
+                "prompt_tokens_est": c["llm_prompt_tokens_est"],
+                "requests_per_day": round(c["llm_requests"] / days, 1) if days else None,
+                "peak_requests_per_hour": max(self.per_hour["llm_requests"].values(), default=0),
+            },
+            "notifications": {
+                "reminders": c["notifications_reminder"],
+                "escalations": c["notifications_escalation"],
+                "email_recipients": c["email_recipients"],
+                "per_day": round(notifications / days, 1) if days else None,
+                "peak_per_hour": max(self.per_hour["notifications"].values(), default=0),
+            },
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay synthetic approval traffic on a virtual clock against a scratch DB.")
+    parser.add_argument("--days", type=float, default=14)
+    parser.add_argument("--start", type=datetime.fromisoformat, default=None, help="virtual start time (ISO 8601, default now)")
+    parser.add_argument("--arrivals-per-hour", type=float, default=10)
+    parser.add_argument("--sla-hours", type=int, nargs="+", default=[24, 48, 72])
+    parser.add_argument("--approve-mean-hours", type=float, default=36)
+    parser.add_argument("--never-approved", type=float, default=0.05, help="fraction of requests nobody approves")
+    parser.add_argument("--mode", choices=["scheduler", "interval"], default="scheduler")
+    parser.add_argument("--tick-minutes", type=float, default=15, help="agent poll interval in interval mode")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--db", default=None, help="scratch database (default: a new temporary file)")
+    parser.add_argument("--out", default=None, help="also write the report to this file")
+    args = parser.parse_args()
+
+    start = args.start or datetime.now(timezone.utc)
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    db = args.db or os.path.join(tempfile.mkdtemp(prefix="approvals-sim-"), "sim.db")
+    if os.path.abspath(db) == os.path.abspath(data.DB_PATH):
+        parser.error("--db must not be the application's database")
+    data.DB_PATH = db
+    # Throwaway file: skip the WAL fsyncs
+    data.PRAGMAS["synchronous"] = "OFF"
+    data.close_connections()
+    data.init_db()
+    # One agent_pass line per wakeup would drown the report
+    telemetry.logger.setLevel(max(telemetry.logger.level, logging.WARNING))
+
+    sim = Simulation(start, args.days, args.arrivals_per_hour, args.sla_hours, args.approve_mean_hours,
+                     args.never_approved, args.mode, args.tick_minutes, args.seed)
+    report = {"db": db, **sim.run()}
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
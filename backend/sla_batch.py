@@ -0,0 +1,183 @@
+"""
+Batch SLA classification.
+
+The agent's SLA thresholds, applied to a whole list of approvals at once:
+no_action below 50% of the SLA, send_reminder from there until (not
+including) the deadline unless the last reminder is more recent than the
+cadence, escalate from the deadline on unless already ESCALATED. Only the actionable rows then need the per-item LLM and
+notification path.
+
+With NumPy installed the timestamps are parsed and compared as arrays;
+without it, or for small batches, the same rules run in a plain loop.
+"""
+import importlib.util
+from datetime import datetime, timedelta, timezone
+from operator import itemgetter
+from typing import Any, Dict, List, Optional, Sequence
+
+from . import data
+
+# NumPy takes ~100 ms to import, so it is only loaded by the first batch that uses it.
+NUMPY_AVAILABLE = importlib.util.find_spec("numpy") is not None
+
+
+def _numpy():
+    import numpy
+    return numpy
+
+
+# Below this many rows the plain loop beats NumPy's per-call overhead
+# (the scheduler's passes are usually a handful of rows).
+NUMPY_MIN_ROWS = 32
+
+ACTIONS = ("no_action", "send_reminder", "escalate")
+
+
+def _epoch_us_np(values: Sequence[Optional[str]]):
+    """Microseconds since the epoch for each ISO timestamp, parsed as fixed-width digits.
+
+    Handles the shape every writer here produces, YYYY-MM-DDTHH:MM:SS with
+    optional .ffffff and an optional Z or +HH:MM/-HH:MM offset (no offset is
+    read as UTC). Anything else goes through datetime.fromisoformat. Missing
+    values come back as NaN.
+    """
+    np = _numpy()
+    filled = [v or "" for v in values]
+    n = len(filled)
+    lengths = np.fromiter(map(len, filled), dtype=np.int64, count=n)
+    raw = np.array(filled, dtype="S32").view(np.uint8).reshape(n, 32)
+
+    def num(*cols):
+        out = raw[:, cols[0]].astype(np.int64) - 48
+        for c in cols[1:]:
+            out = out * 10 + (raw[:, c].astype(np.int64) - 48)
+        return out
+
+    def digits(cols):
+        block = raw[:, cols]
+        return ((block >= 48) & (block <= 57)).all(axis=1)
+
+    year, month, day = num(0, 1, 2, 3), num(5, 6), num(8, 9)
+    seconds = num(11, 12) * 3600 + num(14, 15) * 60 + num(17, 18)
+    has_frac = raw[:, 19] == ord(".")
+    micros = np.where(has_frac, num(20, 21, 22, 23, 24, 25), 0)
+    # Offset suffix: starts at 19 or 26; read both candidates and pick per row
+    tz_len = lengths - np.where(has_frac, 26, 19)
+    sign = np.where(has_frac, raw[:, 26], raw[:, 19])
+    tz_seconds = np.where(
+        has_frac,
+        num(27, 28) * 3600 + num(30, 31) * 60,
+        num(20, 21) * 3600 + num(23, 24) * 60,
+    )
+    offset = np.where(tz_len == 6, np.where(sign == ord("-"), -tz_seconds, tz_seconds), 0)
+
+    ok = (
+        (raw[:, 4] == ord("-")) & (raw[:, 7] == ord("-")) & ((raw[:, 10] == ord("T")) | (raw[:, 10] == ord(" ")))
+        & (raw[:, 13] == ord(":")) & (raw[:, 16] == ord(":"))
+        & digits([0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18])
+        & ((tz_len == 0) | ((tz_len == 1) & (sign == ord("Z"))) | ((tz_len == 6) & ((sign == ord("+")) | (sign == ord("-")))))
+        & (~has_frac | digits([20, 21, 22, 23, 24, 25]))
+    )
+
+    # days_from_civil (proleptic Gregorian), as in datetime.toordinal
+    y = year - (month <= 2)
+    era = y // 400
+    yoe = y - era * 400
+    doy = (153 * (month + np.where(month > 2, -3, 9)) + 2) // 5 + day - 1
+    days = era * 146097 + yoe * 365 + yoe // 4 - yoe // 100 + doy - 719468
+    us = ((days * 86400 + seconds - offset) * 1_000_000 + micros).astype(np.float64)
+
+    missing = lengths == 0
+    us[missing] = np.nan
+    for i in np.flatnonzero(~ok & ~missing):
+        ts = datetime.fromisoformat(filled[i])
+        if ts.tzinfo is None:
+            ts = ts.replace(tzinfo=timezone.utc)
+        us[i] = (ts - _EPOCH) // timedelta(microseconds=1)
+    return us
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _hours_since_np(now: datetime, values: Sequence[Optional[str]]):
+    """Hours from each ISO timestamp to `now` (NaN where missing)."""
+    now_us = (now - _EPOCH) // timedelta(microseconds=1)
+    # Same arithmetic as timedelta.total_seconds() / 3600 in _classify_one
+    return (now_us - _epoch_us_np(values)) / 1e6 / 3600.0
+
+
+def _codes_np(now, submitted_at, sla_hours, status, last_reminder_at):
+    """Index into ACTIONS for every row, as an int8 array."""
+    np = _numpy()
+    n = len(submitted_at)
+    pending = _hours_since_np(now, submitted_at)
+    sla = np.asarray(sla_hours, dtype=float)
+    escalated = np.fromiter((s == "ESCALATED" for s in status), dtype=bool, count=n)
+    recently_reminded = np.zeros(n, dtype=bool)
+    reminded = [i for i, v in enumerate(last_reminder_at) if v]
+    if reminded:
+        since = _hours_since_np(now, [last_reminder_at[i] for i in reminded])
+        recently_reminded[reminded] = since < data.REMINDER_CADENCE_FRACTION * sla[reminded]
+    codes = np.zeros(n, dtype=np.int8)
+    codes[(pending >= 0.5 * sla) & (pending < sla) & ~recently_reminded] = 1
+    codes[(pending >= sla) & ~escalated] = 2
+    return codes
+
+
+def classify_columns(
+    now: datetime,
+    submitted_at: Sequence[str],
+    sla_hours: Sequence[float],
+    status: Sequence[str],
+    last_reminder_at: Sequence[Optional[str]],
+) -> List[str]:
+    """Action per row for column-oriented input; see classify."""
+    if not submitted_at:
+        return []
+    if not NUMPY_AVAILABLE or len(submitted_at) < NUMPY_MIN_ROWS:
+        rows = zip(submitted_at, sla_hours, status, last_reminder_at)
+        return [_classify_one(now, *row) for row in rows]
+    codes = _codes_np(now, submitted_at, sla_hours, status, last_reminder_at)
+    return _numpy().array(ACTIONS, dtype=object)[codes].tolist()
+
+
+def _classify_one(now: datetime, submitted_at: str, sla: float, status: str, last_reminder_at: Optional[str]) -> str:
+    pending = (now - datetime.fromisoformat(submitted_at)).total_seconds() / 3600.0
+    if pending < 0.5 * sla:
+        return "no_action"
+    if pending < sla:
+        if last_reminder_at:
+            since = (now - datetime.fromisoformat(last_reminder_at)).total_seconds() / 3600.0
+            if since < data.reminder_cadence_hours(sla):
+                return "no_action"
+        return "send_reminder"
+    return "no_action" if status == "ESCALATED" else "escalate"
+
+
+def classify_one(approval: Dict[str, Any], now: datetime) -> str:
+    return _classify_one(now, approval["submitted_at"], approval["sla_hours"], approval.get("status", "PENDING"), approval.get("last_reminder_at"))
+
+
+def classify(approvals: List[Dict[str, Any]], now: datetime) -> List[str]:
+    """Action the agent takes for each approval at `now`, in input order."""
+    return classify_columns(
+        now,
+        list(map(itemgetter("submitted_at"), approvals)),
+        list(map(itemgetter("sla_hours"), approvals)),
+        [a.get("status", "PENDING") for a in approvals],
+        [a.get("last_reminder_at") for a in approvals],
+    )
+
+
+def forecast(now: datetime) -> Dict[str, int]:
+    """Counts of what the agent would do to every pending approval at `now` (what-if report)."""
+    columns = data.pending_sla_columns()
+    if not columns[0]:
+        counts = [0] * len(ACTIONS)
+    elif NUMPY_AVAILABLE:
+        counts = _numpy().bincount(_codes_np(now, *columns), minlength=len(ACTIONS)).tolist()
+    else:
+        actions = classify_columns(now, *columns)
+        counts = [actions.count(a) for a in ACTIONS]
+    return {"pending": len(columns[0]), **dict(zip(ACTIONS, counts))}
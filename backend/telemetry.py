@@ -0,0 +1,281 @@
+"""
+Metrics and structured logs.
+
+Metrics are in-process counters and histograms rendered in the Prometheus
+text format by GET /metrics:
+
+- approval_db_seconds{function}: latency of each data-layer function
+- approval_llm_seconds{outcome}, approval_llm_tokens{kind}: Azure OpenAI calls
+- approval_llm_batch_items, approval_llm_batch_fallbacks_total{reason}:
+  batched prompts (AGENT_LLM_BATCH)
+- approval_notification_seconds{channel,outcome},
+  approval_notification_failures_total{channel}: Teams / Outlook sends
+- approval_agent_pass_seconds, approval_agent_actions_total{action},
+  approval_agent_node_seconds{node}: agent passes and graph nodes
+- approval_http_seconds{method,route,status}: API requests
+
+Log lines are JSON objects on the "approval_agent" logger and carry the
+current trace id. Each API request and agent pass runs under one trace id,
+which is also stored in the meta of the audit rows the pass writes, so an
+audit row can be matched to the log lines with its timings.
+"""
+import bisect
+import contextvars
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_labels_text(self.labelnames, k)} {_number(v)}" for k, v in values]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # label values -> [per-bucket counts (last one is +Inf), sum, count]
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self) -> Dict[tuple, Tuple[List[int], float, int]]:
+        """Per label values: cumulative bucket counts, sum and count."""
+        with self._lock:
+            series = {k: (list(v[0]), v[1], v[2]) for k, v in self._series.items()}
+        out = {}
+        for key, (counts, total, count) in series.items():
+            running, cumulative = 0, []
+            for c in counts:
+                running += c
+                cumulative.append(running)
+            out[key] = (cumulative, total, count)
+        return out
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        bounds = [_number(b) for b in self.buckets] + ["+Inf"]
+        for key, (cumulative, total, count) in sorted(self.snapshot().items()):
+            for le, c in zip(bounds, cumulative):
+                le_label = 'le="' + le + '"'
+                lines.append(f"{self.name}_bucket{_labels_text(self.labelnames, key, le_label)} {c}")
+            lines.append(f"{self.name}_sum{_labels_text(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels_text(self.labelnames, key)} {count}")
+        return lines
+
+
+class Gauge:
+    """Gauge read at scrape time from `collect`, which returns {label values: value}."""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str], collect: Callable[[], Dict[tuple, float]]):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        try:
+            values = sorted(self.collect().items())
+        except Exception as e:
+            log_event("metrics_collect_failed", logging.WARNING, metric=self.name, error=str(e))
+            return lines
+        lines += [f"{self.name}{_labels_text(self.labelnames, k)} {_number(v)}" for k, v in values]
+        return lines
+
+
+_registry: List = []
+_registry_lock = threading.Lock()
+
+
+def register(metric):
+    with _registry_lock:
+        _registry.append(metric)
+    return metric
+
+
+def render() -> str:
+    """Every registered metric in the Prometheus text exposition format (0.0.4)."""
+    with _registry_lock:
+        metrics = list(_registry)
+    lines: List[str] = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+DB_SECONDS = register(Histogram("approval_db_seconds", "Latency of data-layer functions.", ["function"]))
+LLM_SECONDS = register(Histogram("approval_llm_seconds", "Azure OpenAI call latency, retries included.", ["outcome"]))
+LLM_TOKENS = register(Histogram("approval_llm_tokens", "Tokens per Azure OpenAI completion.", ["kind"], TOKEN_BUCKETS))
+LLM_BATCH_ITEMS = register(Histogram("approval_llm_batch_items", "Prompts per batched Azure OpenAI request.", buckets=(1, 2, 5, 10, 20, 50, 100)))
+LLM_BATCH_FALLBACKS = register(Counter("approval_llm_batch_fallbacks_total", "Batched prompts answered per item (single) or with the template.", ["reason"]))
+NOTIFY_SECONDS = register(Histogram("approval_notification_seconds", "Notification send latency.", ["channel", "outcome"]))
+NOTIFY_FAILURES = register(Counter("approval_notification_failures_total", "Failed notification sends.", ["channel"]))
+AGENT_PASS_SECONDS = register(Histogram("approval_agent_pass_seconds", "Duration of agent passes."))
+AGENT_ACTIONS = register(Counter("approval_agent_actions_total", "Reminders and escalations recorded by the agent.", ["action"]))
+AGENT_NODE_SECONDS = register(Histogram("approval_agent_node_seconds", "Agent graph node runs (batch nodes once per pass).", ["node"]))
+HTTP_SECONDS = register(Histogram("approval_http_seconds", "API request latency.", ["method", "route", "status"]))
+
+
+def timed_db(fn):
+    """Decorator: observe the function's latency in approval_db_seconds."""
+    name = fn.__qualname__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            DB_SECONDS.observe(time.perf_counter() - start, function=name)
+
+    return wrapper
+
+
+# --- trace ids and structured logs -----------------------------------------
+
+_trace_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("trace_id", default=None)
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex
+
+
+def current_trace_id() -> Optional[str]:
+    return _trace_id.get()
+
+
+@contextmanager
+def trace(trace_id: Optional[str] = None) -> Iterator[str]:
+    """Run the block under `trace_id` (a new one if None); yields the id."""
+    trace_id = trace_id or new_trace_id()
+    token = _trace_id.set(trace_id)
+    try:
+        yield trace_id
+    finally:
+        _trace_id.reset(token)
+
+
+class _JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}Z",
+            "level": record.levelname.lower(),
+            "event": record.getMessage(),
+        }
+        trace_id = getattr(record, "trace_id", None) or _trace_id.get()
+        if trace_id:
+            entry["trace_id"] = trace_id
+        entry.update(getattr(record, "fields", {}))
+        return json.dumps(entry, default=str)
+
+
+logger = logging.getLogger("approval_agent")
+if not logger.handlers:
+    _handler = logging.StreamHandler(sys.stderr)
+    _formatter = _JSONFormatter()
+    _formatter.converter = time.gmtime
+    _handler.setFormatter(_formatter)
+    logger.addHandler(_handler)
+    logger.setLevel(LOG_LEVEL)
+    logger.propagate = False
+
+
+def log_event(event: str, level: int = logging.INFO, trace_id: Optional[str] = None, **fields):
+    """Write one JSON log line: {"ts", "level", "event", "trace_id", **fields}."""
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={"fields": fields, "trace_id": trace_id})
+
+
+class TraceMiddleware:
+    """ASGI middleware: runs each HTTP request under a trace id and times it.
+
+    A valid incoming X-Trace-Id header is reused, otherwise a new id is made;
+    either way it is echoed back on the response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        incoming = dict(scope.get("headers") or []).get(b"x-trace-id", b"").decode("latin-1")
+        trace_id = incoming if 0 < len(incoming) <= 64 and incoming.replace("-", "").isalnum() else None
+        status = [500]
+
+        async def send_with_trace(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-trace-id", _trace_id.get().encode())]
+            await send(message)
+
+        with trace(trace_id):
+            start = time.perf_counter()
+            try:
+                await self.app(scope, receive, send_with_trace)
+            finally:
+                seconds = time.perf_counter() - start
+                route = getattr(scope.get("route"), "path", "unmatched")
+                HTTP_SECONDS.observe(seconds, method=scope["method"], route=route, status=status[0])
+                log_event("http_request", method=scope["method"], path=scope["path"], status=status[0],
+                          duration_ms=round(1000 * seconds, 1))
@@ -0,0 +1,85 @@
+"""
+Agent pass wall time against the fake LLM endpoint at different concurrency caps.
+
+Usage:
+    python benchmarks/bench_agent_concurrency.py --items 200 --latency 0.2 --concurrency 1 8 32
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import fake_llm_server  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--rate-limit-every", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    args = parser.parse_args()
+
+    srv = fake_llm_server.start(latency=args.latency, rate_limit_every=args.rate_limit_every)
+    os.environ.update({
+        "AZURE_OPENAI_API_KEY": "fake",
+        "AZURE_OPENAI_ENDPOINT": srv.url,
+        "AZURE_OPENAI_DEPLOYMENT": "fake",
+        "AZURE_OPENAI_API_VERSION": "2024-12-01-preview",
+        "AZURE_OPENAI_BACKOFF": "0.05",
+    })
+    os.environ.pop("TEAMS_WEBHOOK_URL", None)
+    os.environ["APPROVALS_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="approvals-bench-"), "agent.db")
+
+    from backend import agent_langgraph, data
+
+    data.init_db()
+
+    now = datetime.now(timezone.utc)
+    approvals = [
+        {
+            "id": f"bench-{i:06d}",
+            "vendor_name": "Acme Supplies",
+            "amount": 1000.0 + i,
+            "approvers": [],
+            "status": "PENDING",
+            "submitted_at": (now - timedelta(hours=100)).isoformat(),
+            "sla_hours": 48,
+            "last_reminder_at": None,
+            "escalation_level": 0,
+        }
+        for i in range(args.items)
+    ]
+
+    results = []
+    for workers in args.concurrency:
+        srv.max_in_flight = 0
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            out = agent_langgraph.run_many(approvals, now, concurrency=workers)
+        elapsed = time.perf_counter() - start
+        assert all(a["id"] in r["message"] for a, r in zip(approvals, out)), "results out of order"
+        results.append({
+            "concurrency": workers,
+            "items": args.items,
+            "seconds": round(elapsed, 3),
+            "items_per_s": round(args.items / elapsed, 1),
+            "max_in_flight": srv.max_in_flight,
+        })
+    results.append({
+        "rate_limited_responses": srv.rate_limited,
+        "completions": srv.completions,
+        "azure_clients": dict(agent_langgraph.client_stats),
+    })
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Multi-process agent load test against a local SQLite file.
+
+Seeds a backlog of due approvals and drains it with several worker processes.
+In "sharded" mode each worker owns one shard; in "contended" mode every worker
+claims from the whole backlog. Then it checks that every approval got exactly
+one transition (one reminder or one escalation audit row) and none got two.
+
+Usage:
+    python benchmarks/bench_agent_workers.py --items 20000 --workers 4
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing as mp
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+APPROVERS = json.dumps([{"name": "Alice", "role": "Reviewer", "level": 1}])
+
+
+def _worker(path, shard, shards, batch, start, out):
+    sys.path.insert(0, ROOT)
+    os.environ["APPROVALS_DB_PATH"] = path
+    for var in ("TEAMS_WEBHOOK_URL", "AZURE_OPENAI_API_KEY"):
+        os.environ.pop(var, None)
+    from backend import agent_worker
+
+    start.wait()
+    with contextlib.redirect_stdout(io.StringIO()):
+        out.put(agent_worker.drain(shard, shards, batch))
+
+
+def seed(path, items):
+    """Half the backlog is in the reminder window, half past its SLA."""
+    from backend import data
+
+    data.DB_PATH = path
+    data.init_db()
+    now = datetime.now(timezone.utc)
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO approvals(id, vendor_name, amount, approvers, status, submitted_at, sla_hours, last_reminder_at, escalation_level, requester) "
+        "VALUES (?, 'Acme Supplies', 1000, ?, 'PENDING', ?, 48, NULL, 0, 'requester1')",
+        [(f"load-{i:07d}", APPROVERS, (now - timedelta(hours=30 if i % 2 else 60)).isoformat()) for i in range(items)],
+    )
+    conn.commit()
+    conn.close()
+    data.backfill_sla_deadlines()  # derived columns for the raw-inserted rows
+    data.close_connections()
+
+
+def run(mode, items, workers, batch):
+    path = os.path.join(tempfile.mkdtemp(prefix="approvals-load-"), "agent.db")
+    seed(path, items)
+    ctx = mp.get_context("spawn")
+    start, out = ctx.Event(), ctx.Queue()
+    shards = workers if mode == "sharded" else 1
+    procs = [
+        ctx.Process(target=_worker, args=(path, i if mode == "sharded" else 0, shards, batch, start, out))
+        for i in range(workers)
+    ]
+    for p in procs:
+        p.start()
+    time.sleep(2)  # let the interpreters finish importing before the clock starts
+    began = time.perf_counter()
+    start.set()
+    totals = [out.get() for _ in procs]
+    elapsed = time.perf_counter() - began
+    for p in procs:
+        p.join()
+
+    conn = sqlite3.connect(path)
+    per_item = conn.execute(
+        "SELECT COUNT(*), SUM(n > 1) FROM (SELECT approval_id, COUNT(*) AS n FROM audit "
+        "WHERE action IN ('reminder', 'escalation') GROUP BY approval_id)"
+    ).fetchone()
+    leased = conn.execute("SELECT COUNT(*) FROM approvals WHERE lease_token IS NOT NULL").fetchone()[0]
+    conn.close()
+    transitions = sum(t["reminder"] + t["escalation"] for t in totals)
+    return {
+        "mode": mode,
+        "items": items,
+        "workers": workers,
+        "seconds": round(elapsed, 3),
+        "transitions_per_s": round(transitions / elapsed, 1),
+        "transitions": transitions,
+        "items_transitioned": per_item[0],
+        "items_transitioned_twice": per_item[1] or 0,
+        "leases_left": leased,
+        "exactly_once": transitions == items == per_item[0] and not per_item[1] and not leased,
+        "per_worker": totals,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=20_000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch", type=int, default=200)
+    parser.add_argument("--modes", nargs="+", default=["sharded", "contended"])
+    args = parser.parse_args()
+    sys.path.insert(0, ROOT)
+    print(json.dumps([run(m, args.items, args.workers, args.batch) for m in args.modes], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Throughput of GET /approvals and POST /agent/run against a seeded scratch DB.
+
+Usage:
+    python benchmarks/bench_data_layer.py --rows 10000 100000
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+_TMP = tempfile.mkdtemp(prefix="approvals-bench-")
+os.environ.setdefault("APPROVALS_DB_PATH", os.path.join(_TMP, "bootstrap.db"))
+for var in ("TEAMS_WEBHOOK_URL", "AZURE_OPENAI_API_KEY"):
+    os.environ.pop(var, None)
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from backend import data  # noqa: E402
+from backend.main import app  # noqa: E402
+
+APPROVERS = json.dumps([
+    {"name": "Alice", "role": "Reviewer", "level": 1},
+    {"name": "Bob", "role": "Chair", "level": 2},
+])
+
+
+def seed(path, rows, pending_ratio=0.02, seed_value=7):
+    """Write `rows` approvals straight to SQLite; mostly approved history."""
+    rnd = random.Random(seed_value)
+    now = datetime.now(timezone.utc)
+    records = []
+    for i in range(rows):
+        sla = rnd.choice([24, 48, 72])
+        pending = rnd.random() < pending_ratio
+        age = rnd.uniform(0, 1.5 * sla) if pending else rnd.uniform(sla, 24 * 365)
+        records.append((
+            f"bench-{i:08d}",
+            rnd.choice(["Acme Supplies", "Global Widgets", "NorthTech", "Zenith Services"]),
+            round(rnd.uniform(500, 50000), 2),
+            APPROVERS,
+            "PENDING" if pending else "APPROVED",
+            (now - timedelta(hours=age)).isoformat(),
+            sla,
+            None,
+            0,
+            rnd.choice(["requester1", "requester2"]),
+        ))
+    conn = sqlite3.connect(path)
+    conn.executemany("INSERT INTO approvals(id, vendor_name, amount, approvers, status, submitted_at, sla_hours, last_reminder_at, escalation_level, requester) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", records)
+    conn.commit()
+    conn.close()
+
+
+def _timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return {"median_s": samples[len(samples) // 2], "min_s": samples[0], "per_s": 1.0 / samples[len(samples) // 2]}
+
+
+def run(rows, repeat):
+    path = os.path.join(_TMP, f"bench-{rows}.db")
+    if os.path.exists(path):
+        os.remove(path)
+    data.DB_PATH = path
+    data.init_db()
+    seed(path, rows)
+    data.backfill_sla_deadlines()  # derived columns for the raw-inserted rows
+    client = TestClient(app)
+
+    result = {"rows": rows}
+    result["get_approvals"] = _timed(lambda: client.get("/approvals").raise_for_status(), repeat)
+
+    def agent_pass():
+        with contextlib.redirect_stdout(io.StringIO()):
+            resp = client.post("/agent/run")
+        resp.raise_for_status()
+        return resp
+
+    # The first pass reminds and escalates; later passes measure an idle tick.
+    result["agent_run_first"] = _timed(agent_pass, 1)
+    result["agent_run_steady"] = _timed(agent_pass, repeat)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps([run(n, args.repeat) for n in args.rows], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Azure OpenAI requests and wall time for an agent sweep, one prompt per request vs batched.
+
+Runs the agent graph (run_many) over a breached backlog against the fake
+LLM endpoint, once with per-item calls and once with AGENT_LLM_BATCH-style
+batching, and reports request counts, tokens and wall time.
+
+Usage:
+    python benchmarks/bench_llm_batching.py --items 1000 --latency 0.5 --batch-items 20
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import fake_llm_server  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--batch-items", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    srv = fake_llm_server.start(latency=args.latency)
+    os.environ.update({
+        "AZURE_OPENAI_API_KEY": "fake",
+        "AZURE_OPENAI_ENDPOINT": srv.url,
+        "AZURE_OPENAI_DEPLOYMENT": "fake",
+        "AZURE_OPENAI_API_VERSION": "2024-12-01-preview",
+        "APPROVALS_DB_PATH": os.path.join(tempfile.mkdtemp(prefix="approvals-bench-"), "batching.db"),
+        "LOG_LEVEL": "WARNING",
+    })
+    os.environ.pop("TEAMS_WEBHOOK_URL", None)
+
+    from backend import agent_langgraph, data, telemetry
+    from backend.agent_graph import Node
+
+    data.init_db()
+    agent_langgraph.LLM_BATCH_MAX_ITEMS = args.batch_items
+    now = datetime.now(timezone.utc)
+
+    def backlog(tag):
+        # Distinct ids per run so the response cache never answers
+        return [
+            {
+                "id": f"{tag}-{i:06d}",
+                "vendor_name": "Acme Supplies",
+                "amount": 1000.0 + i,
+                "approvers": [],
+                "status": "PENDING",
+                "submitted_at": (now - timedelta(hours=100)).isoformat(),
+                "sla_hours": 48,
+                "last_reminder_at": None,
+                "escalation_level": 0,
+            }
+            for i in range(args.items)
+        ]
+
+    results = []
+    for mode, batch in (("per_item", None), ("batched", agent_langgraph.generate_batch)):
+        agent_langgraph.NODES["generate"] = Node("generate", agent_langgraph.generate_node, batch=batch)
+        agent_langgraph.set_graph(agent_langgraph.AGENT_GRAPH_NODES)
+        approvals = backlog(mode)
+        before = srv.completions
+        tokens_before = telemetry.LLM_TOKENS.snapshot()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            out = agent_langgraph.run_many(approvals, now, concurrency=args.concurrency)
+        elapsed = time.perf_counter() - start
+        assert all(a["id"] in r["message"] and r["message"].startswith("[fake]") for a, r in zip(approvals, out)), "messages out of order"
+        tokens = {
+            key[0]: total - tokens_before.get(key, (None, 0, 0))[1]
+            for key, (_, total, _) in telemetry.LLM_TOKENS.snapshot().items()
+        }
+        results.append({
+            "mode": mode,
+            "items": args.items,
+            "requests": srv.completions - before,
+            "seconds": round(elapsed, 3),
+            "items_per_s": round(args.items / elapsed, 1),
+            "prompt_tokens": int(tokens.get("prompt", 0)),
+            "completion_tokens": int(tokens.get("completion", 0)),
+        })
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Dashboard read latency while an agent pass is in flight.
+
+Seeds a scratch DB with a due backlog, starts the app under uvicorn with the
+LLM and Teams stubs, and fires GET /approvals?limit=50 and GET /audit?limit=100
+with `concurrency` in flight:
+
+    idle        no pass running
+    foreground  while a POST /agent/run is waiting for its pass
+    background  while a POST /agent/run?background=true job runs (polled
+                through GET /agent/jobs/{id})
+
+Reads keep going until the pass finishes. Each phase reports read p50/p99 and
+the pass duration. Before each pass the backlog is time-shifted back to its
+seeded ages, so every pass has the same work.
+
+Usage:
+    python benchmarks/bench_read_latency.py --rows 20000 --pending-ratio 0.02 --llm-latency 0.2
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+import fake_llm_server  # noqa: E402
+import fake_teams_server  # noqa: E402
+import load_test  # noqa: E402
+
+READS = [("GET", "/approvals", {"params": {"limit": 50}}), ("GET", "/audit", {"params": {"limit": 100}})]
+
+
+async def _read_until(client, done, concurrency):
+    """Cycle through READS with `concurrency` in flight until `done()` is true."""
+    latencies, statuses = [], Counter()
+
+    async def worker(offset):
+        i = offset
+        while not done():
+            method, url, kwargs = READS[i % len(READS)]
+            i += 1
+            start = time.perf_counter()
+            r = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            statuses[r.status_code] += 1
+
+    began = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return latencies, statuses, time.perf_counter() - began
+
+
+async def _foreground_pass(client):
+    r = await client.post("/agent/run")
+    r.raise_for_status()
+    return len(r.json()["actions"])
+
+
+async def _background_pass(client):
+    r = await client.post("/agent/run", params={"background": "true"})
+    r.raise_for_status()
+    location = r.headers["location"]
+    while True:
+        job = (await client.get(location)).json()
+        if job["status"] == "done":
+            return len(job["result"]["actions"])
+        if job["status"] == "failed":
+            raise RuntimeError(job["error"])
+        await asyncio.sleep(0.05)
+
+
+async def run_phase(client, path, phase, args):
+    if phase == "idle":
+        began = time.monotonic()
+        latencies, statuses, busy = await _read_until(client, lambda: time.monotonic() - began > args.idle_seconds, args.concurrency)
+        return load_test._summary(phase, latencies, busy, statuses)
+
+    await asyncio.to_thread(load_test.time_shift, path, "backlog")
+    run_pass = _foreground_pass if phase == "foreground" else _background_pass
+    began = time.perf_counter()
+    agent = asyncio.create_task(run_pass(client))
+    latencies, statuses, busy = await _read_until(client, agent.done, args.concurrency)
+    actions = await agent
+    return load_test._summary(phase, latencies, busy, statuses, {
+        "pass_s": round(time.perf_counter() - began, 2),
+        "actions": actions,
+    })
+
+
+async def run(path, args):
+    async with load_test.serve_uvicorn(path, connections=args.concurrency + 2) as client:
+        return [await run_phase(client, path, phase, args) for phase in args.phases]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--pending-ratio", type=float, default=0.02)
+    parser.add_argument("--phases", choices=["idle", "foreground", "background"], nargs="+", default=["idle", "foreground", "background"])
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--idle-seconds", type=float, default=5.0)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--teams-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    llm = fake_llm_server.start(latency=args.llm_latency)
+    teams = fake_teams_server.start(latency=args.teams_latency)
+    path = os.path.join(tempfile.mkdtemp(prefix="approvals-read-latency-"), "read-latency.db")
+    os.environ.update({
+        "APPROVALS_DB_PATH": path,
+        "AZURE_OPENAI_API_KEY": "fake",
+        "AZURE_OPENAI_ENDPOINT": llm.url,
+        "AZURE_OPENAI_DEPLOYMENT": "fake",
+        "AZURE_OPENAI_API_VERSION": "2024-12-01-preview",
+        "TEAMS_WEBHOOK_URL": teams.url,
+        "AGENT_SCHEDULER_ENABLED": "0",
+        "AUDIT_RETENTION_DAYS": "0",
+        "LOG_LEVEL": "WARNING",
+    })
+    from backend import data
+
+    pending = load_test.seed(args.rows, args.pending_ratio, 1, "backlog")
+    data.close_connections()
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = asyncio.run(run(path, args))
+    print(json.dumps({"rows": args.rows, "pending": pending, "concurrency": args.concurrency, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Rows/second and peak memory for mapping and encoding a full approvals listing.
+
+Compares the old name-lookup mapper (sqlite3.Row + json.loads per row,
+serialized through FastAPI's encoder) with the positional mapper and the
+orjson-backed listing response.
+
+Usage:
+    python benchmarks/bench_row_mapping.py --rows 100000
+"""
+import argparse
+import json
+import os
+import time
+import tracemalloc
+
+from bench_data_layer import _TMP, app, data, seed  # sets up sys.path and a scratch DB
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from backend.main import FastJSONResponse
+
+
+def legacy_rows():
+    rows = data._conn().execute("SELECT * FROM approvals ORDER BY submitted_at DESC, id DESC").fetchall()
+    return [
+        {
+            "id": r["id"],
+            "vendor_name": r["vendor_name"],
+            "amount": r["amount"],
+            "approvers": json.loads(r["approvers"]),
+            "status": r["status"],
+            "submitted_at": r["submitted_at"],
+            "sla_hours": r["sla_hours"],
+            "last_reminder_at": r["last_reminder_at"],
+            "escalation_level": r["escalation_level"],
+            "requester": r["requester"],
+        }
+        for r in rows
+    ]
+
+
+def positional_rows():
+    return data.list_approvals_page()[0]
+
+
+def _measure(fn, rows, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    median = sorted(samples)[len(samples) // 2]
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"median_s": round(median, 4), "rows_per_s": round(rows / median), "peak_mib": round(peak / 2**20, 1)}
+
+
+def run(rows, repeat):
+    path = os.path.join(_TMP, f"rows-{rows}.db")
+    if os.path.exists(path):
+        os.remove(path)
+    data.DB_PATH = path
+    data.init_db()
+    seed(path, rows)
+    data.backfill_sla_deadlines()
+    client = TestClient(app)
+
+    return {
+        "rows": rows,
+        "map_legacy": _measure(legacy_rows, rows, repeat),
+        "map_positional": _measure(positional_rows, rows, repeat),
+        "map_and_encode_legacy": _measure(lambda: JSONResponse(jsonable_encoder(legacy_rows())), rows, repeat),
+        "map_and_encode_fast": _measure(lambda: FastJSONResponse(positional_rows()), rows, repeat),
+        "get_approvals_http": _measure(lambda: client.get("/approvals").raise_for_status(), rows, repeat),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps([run(n, args.repeat) for n in args.rows], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Batch SLA classification against the per-item run_once loop.
+
+The per-item loop runs with LLM generation and notifications stubbed out,
+so both sides only pay for deciding what to do. Also checks that both agree
+on every row.
+
+Usage:
+    python benchmarks/bench_sla_classify.py --items 100000 1000000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ["APPROVALS_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="approvals-bench-"), "classify.db")
+
+from backend import agent_langgraph, data, sla_batch  # noqa: E402
+
+
+def backlog(items, now, seed_value=7):
+    rnd = random.Random(seed_value)
+    out = []
+    for i in range(items):
+        sla = rnd.choice([24, 48, 72])
+        age = rnd.uniform(0, 1.5 * sla)
+        reminded = now - timedelta(hours=rnd.uniform(0, age)) if age > 0.5 * sla and rnd.random() < 0.5 else None
+        out.append({
+            "id": f"bench-{i:08d}",
+            "vendor_name": "Acme Supplies",
+            "amount": 1000.0,
+            "approvers": [],
+            "status": "ESCALATED" if age > sla and rnd.random() < 0.3 else "PENDING",
+            "submitted_at": (now - timedelta(hours=age)).isoformat(),
+            "sla_hours": sla,
+            "last_reminder_at": reminded.isoformat() if reminded else None,
+            "escalation_level": 0,
+        })
+    return out
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def run(items):
+    now = datetime.now(timezone.utc)
+    approvals = backlog(items, now)
+    with mock.patch.object(agent_langgraph, "generate_llm_text", lambda prompt: prompt), \
+            mock.patch.object(agent_langgraph.NotificationManager, "notify_all", lambda *a, **k: None):
+        loop, loop_s = _timed(lambda: [agent_langgraph.run_once(a, now)["action"] for a in approvals])
+    result = {"items": items, "per_item_loop_s": round(loop_s, 3)}
+
+    if sla_batch.NUMPY_AVAILABLE:
+        batch, batch_s = _timed(lambda: sla_batch.classify(approvals, now))
+        assert batch == loop, "numpy classification disagrees with run_once"
+        result.update(numpy_s=round(batch_s, 3), numpy_speedup=round(loop_s / batch_s, 1))
+        # Column input, as /agent/forecast reads it straight from SQLite
+        columns = (
+            [a["submitted_at"] for a in approvals],
+            [a["sla_hours"] for a in approvals],
+            [a["status"] for a in approvals],
+            [a["last_reminder_at"] for a in approvals],
+        )
+        _, cols_s = _timed(lambda: sla_batch._codes_np(now, *columns))
+        result.update(numpy_columns_s=round(cols_s, 3), numpy_columns_speedup=round(loop_s / cols_s, 1))
+    with mock.patch.object(sla_batch, "NUMPY_AVAILABLE", False):
+        plain, plain_s = _timed(lambda: sla_batch.classify(approvals, now))
+    assert plain == loop, "fallback classification disagrees with run_once"
+    result.update(python_fallback_s=round(plain_s, 3), python_fallback_speedup=round(loop_s / plain_s, 1))
+    result["actionable"] = sum(a != "no_action" for a in loop)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, nargs="+", default=[100_000])
+    args = parser.parse_args()
+    data.init_db()  # escalation routing reads the users table
+    print(json.dumps([run(n) for n in args.items], indent=2))
+
+
+if __name__ == "__main__":
+    main()
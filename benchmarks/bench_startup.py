@@ -0,0 +1,83 @@
+"""
+Cold start of an API worker: import time and lifespan startup, each in a fresh interpreter.
+
+Reports the median wall time of `import backend.main` and of the app's
+startup (migrations, user directory, background workers) against a new
+database and against one that is already migrated. It also lists the slowest
+imports from `python -X importtime` and which heavy SDKs got loaded at
+import.
+
+Usage:
+    python benchmarks/bench_startup.py --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+HEAVY = ["openai", "numpy", "requests", "dotenv", "httpx"]
+
+PROBE = """
+import asyncio, json, sys, time
+t = time.perf_counter()
+import backend.main
+imported = time.perf_counter() - t
+
+async def startup():
+    async with backend.main.app.router.lifespan_context(backend.main.app):
+        return time.perf_counter() - t
+
+started = asyncio.run(startup()) - imported
+print(json.dumps({"import_s": imported, "startup_s": started,
+                  "loaded": [m for m in %r if m in sys.modules]}))
+"""
+
+
+def _probe(db_path):
+    env = {**os.environ, "APPROVALS_DB_PATH": db_path, "AGENT_SCHEDULER_ENABLED": "0", "LOG_LEVEL": "WARNING"}
+    out = subprocess.run([sys.executable, "-c", PROBE % HEAVY], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _slowest_imports(limit):
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import backend.main"], cwd=ROOT, capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            name = parts[2].strip()
+            # top-level packages and our own modules only
+            if "." not in name or name.startswith("backend."):
+                rows.append((int(parts[1]), name))
+    return [{"module": name, "cumulative_ms": round(us / 1000, 1)} for us, name in sorted(rows, reverse=True)[:limit]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="approvals-startup-")
+    migrated = os.path.join(tmp, "migrated.db")
+    _probe(migrated)  # create and migrate once
+
+    fresh = [_probe(os.path.join(tmp, f"fresh-{i}.db")) for i in range(args.runs)]
+    warm = [_probe(migrated) for _ in range(args.runs)]
+    median_ms = lambda runs, key: round(1000 * statistics.median(r[key] for r in runs), 1)  # noqa: E731
+    print(json.dumps({
+        "runs": args.runs,
+        "import_ms": median_ms(fresh + warm, "import_s"),
+        "startup_new_db_ms": median_ms(fresh, "startup_s"),
+        "startup_migrated_db_ms": median_ms(warm, "startup_s"),
+        "heavy_modules_loaded_at_import": warm[0]["loaded"],
+        "slowest_imports": _slowest_imports(args.top),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Local stand-in for the Azure OpenAI chat completions endpoint.
+
+Every POST gets a canned completion after `latency` seconds; a request
+with response_format json_object (the agent's batch mode) gets one rewrite
+per item of its JSON payload. With
+`rate_limit_every=N`, every Nth request is answered with HTTP 429 and a
+Retry-After header instead, to exercise the agent's backoff.
+
+Usage:
+    python benchmarks/fake_llm_server.py --port 8100 --latency 0.3
+    AZURE_OPENAI_ENDPOINT=http://127.0.0.1:8100 AZURE_OPENAI_API_KEY=fake \
+    AZURE_OPENAI_DEPLOYMENT=fake AZURE_OPENAI_API_VERSION=2024-12-01-preview ...
+"""
+import argparse
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, rate_limit_every=0, retry_after=0.05):
+        super().__init__(address, _Handler)
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.counter = itertools.count(1)
+        self.completions = 0
+        self.rate_limited = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: FakeLLMServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        srv = self.server
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        n = next(srv.counter)
+        if srv.rate_limit_every and n % srv.rate_limit_every == 0:
+            with srv._lock:
+                srv.rate_limited += 1
+            self._send(429, {"error": {"code": "429", "message": "Rate limit"}}, {"Retry-After": str(srv.retry_after)})
+            return
+
+        with srv._lock:
+            srv.in_flight += 1
+            srv.max_in_flight = max(srv.max_in_flight, srv.in_flight)
+        time.sleep(srv.latency)
+        with srv._lock:
+            srv.in_flight -= 1
+            srv.completions += 1
+
+        prompt = body.get("messages", [{}])[-1].get("content", "")
+        content = f"[fake] {prompt}"
+        sent = sum(len(m.get("content", "")) for m in body.get("messages", []))
+        if body.get("response_format", {}).get("type") == "json_object":
+            # Batch request: one rewrite per {"key", "text"} item
+            items = json.loads(prompt)
+            content = json.dumps({"messages": [{"key": it["key"], "message": f"[fake] {it['text']}"} for it in items]})
+        self._send(200, {
+            "id": f"fake-{n}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": content},
+            }],
+            "usage": {"prompt_tokens": sent // 4, "completion_tokens": len(content) // 4, "total_tokens": (sent + len(content)) // 4},
+        })
+
+    def _send(self, status, payload, headers=None):
+        raw = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(raw)
+
+
+def start(latency=0.0, rate_limit_every=0, port=0):
+    """Start a server on a background thread and return it (see `.url`)."""
+    srv = FakeLLMServer(("127.0.0.1", port), latency=latency, rate_limit_every=rate_limit_every)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--rate-limit-every", type=int, default=0)
+    args = parser.parse_args()
+    srv = FakeLLMServer(("127.0.0.1", args.port), latency=args.latency, rate_limit_every=args.rate_limit_every)
+    print(f"Fake Azure OpenAI listening on {srv.url}")
+    srv.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
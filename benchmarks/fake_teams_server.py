@@ -0,0 +1,81 @@
+"""
+Local stand-in for a Microsoft Teams incoming webhook.
+
+Every POST is answered with "1" (what Teams returns) after `latency` seconds
+and counted. With `fail_every=N`, every Nth request gets HTTP 500 instead, to
+exercise the outbox retries.
+
+Usage:
+    python benchmarks/fake_teams_server.py --port 8101 --latency 0.05
+    TEAMS_WEBHOOK_URL=http://127.0.0.1:8101/webhook ...
+"""
+import argparse
+import itertools
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeTeamsServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, fail_every=0):
+        super().__init__(address, _Handler)
+        self.latency = latency
+        self.fail_every = fail_every
+        self.counter = itertools.count(1)
+        self.delivered = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/webhook"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: FakeTeamsServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        srv = self.server
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        n = next(srv.counter)
+        time.sleep(srv.latency)
+        failed = bool(srv.fail_every) and n % srv.fail_every == 0
+        with srv._lock:
+            if failed:
+                srv.failed += 1
+            else:
+                srv.delivered += 1
+        raw = b"Webhook failed" if failed else b"1"
+        self.send_response(500 if failed else 200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+
+def start(latency=0.0, fail_every=0, port=0):
+    """Start a server on a background thread and return it (see `.url`)."""
+    srv = FakeTeamsServer(("127.0.0.1", port), latency=latency, fail_every=fail_every)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8101)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--fail-every", type=int, default=0)
+    args = parser.parse_args()
+    srv = FakeTeamsServer(("127.0.0.1", args.port), latency=args.latency, fail_every=args.fail_every)
+    print(f"Fake Teams webhook listening on {srv.url}")
+    srv.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
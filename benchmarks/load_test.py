@@ -0,0 +1,399 @@
+"""
+Load test for the approval API.
+
+Seeds a scratch SQLite DB with a configurable volume, points Azure OpenAI and
+the Teams webhook at local stub servers, and drives the app in-process
+(httpx over ASGI, lifespan included) or under uvicorn. Reports latency
+percentiles and throughput per scenario and writes them to a JSON file;
+--baseline compares the run with an earlier file and exits non-zero on a
+regression.
+
+Scenarios:
+    approvals       GET /approvals (full listing)
+    approvals_page  GET /approvals?limit=50
+    audit           GET /audit?limit=100
+    login           POST /login
+    agent_run       POST /agent/run, one at a time; before each request the
+                    pending backlog is time-shifted back to its seeded ages
+                    (not timed), so every pass has the same work to do
+
+Usage:
+    python benchmarks/load_test.py --rows 10000 100000
+    python benchmarks/load_test.py --rows 100000 --target uvicorn --workers 2 --concurrency 32
+    python benchmarks/load_test.py --rows 10000 --baseline benchmarks/results/load-20260101T000000Z.json
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+import httpx  # noqa: E402
+
+import fake_llm_server  # noqa: E402
+import fake_teams_server  # noqa: E402
+
+APPROVERS = [
+    {"name": "Alice", "role": "Reviewer", "level": 1},
+    {"name": "Bob", "role": "Chair", "level": 2},
+]
+VENDORS = ["Acme Supplies", "Global Widgets", "NorthTech", "Zenith Services"]
+
+# Age of a pending approval, in multiples of its SLA
+DISTRIBUTIONS = {
+    # evenly spread from just submitted to 50% past the SLA
+    "uniform": lambda rnd: rnd.uniform(0, 1.5),
+    # most items fresh, a long tail in the reminder window and past the SLA
+    "recent": lambda rnd: rnd.expovariate(1 / 0.4),
+    # everything due: half in the reminder window, half breached
+    "backlog": lambda rnd: rnd.choice([0.75, 1.25]) + rnd.uniform(-0.2, 0.2),
+}
+
+SCENARIOS = {
+    "approvals": ("GET", "/approvals", {}),
+    "approvals_page": ("GET", "/approvals", {"params": {"limit": 50}}),
+    "audit": ("GET", "/audit", {"params": {"limit": 100}}),
+    "login": ("POST", "/login", {"json": {"username": "reviewer", "password": "pass123"}}),
+    "agent_run": ("POST", "/agent/run", {}),
+}
+
+
+def _pending_ages(ids_and_slas, distribution, seed_value):
+    """Hours pending per id, drawn in id order so every shift repeats the same ages."""
+    rnd = random.Random(seed_value)
+    draw = DISTRIBUTIONS[distribution]
+    return {aid: draw(rnd) * sla for aid, sla in sorted(ids_and_slas)}
+
+
+def seed(rows, pending_ratio, audit_per_row, distribution, seed_value=7, chunk=5000):
+    """Fill the current DB (data.DB_PATH) with `rows` approvals, mostly approved history."""
+    from backend import data
+
+    data.init_db()
+    rnd = random.Random(seed_value)
+    now = datetime.now(timezone.utc)
+    pending = []
+    for start in range(0, rows, chunk):
+        objs, audit = [], []
+        for i in range(start, min(rows, start + chunk)):
+            sla = rnd.choice([24, 48, 72])
+            is_pending = rnd.random() < pending_ratio
+            age = 0 if is_pending else rnd.uniform(sla, 24 * 365)
+            obj = {
+                "id": f"load-{i:08d}",
+                "vendor_name": rnd.choice(VENDORS),
+                "amount": round(rnd.uniform(500, 50000), 2),
+                "approvers": APPROVERS,
+                "status": "PENDING" if is_pending else "APPROVED",
+                "submitted_at": (now - timedelta(hours=age)).isoformat(),
+                "sla_hours": sla,
+                "last_reminder_at": None,
+                "escalation_level": 0,
+                "requester": rnd.choice(["requester1", "requester2"]),
+            }
+            if is_pending:
+                pending.append(obj["id"])
+            objs.append(obj)
+            audit.append({
+                "timestamp": obj["submitted_at"],
+                "approval_id": obj["id"],
+                "actor": obj["requester"],
+                "action": "created",
+                "message": f"Load-test approval for {obj['vendor_name']}",
+            })
+        data.insert_approvals(objs, audit)
+
+    if audit_per_row > 1:
+        conn = sqlite3.connect(data.DB_PATH)
+        extra = (
+            ((now - timedelta(hours=rnd.uniform(0, 24 * 365))).isoformat(), f"load-{i:08d}", "agent", "reminder", "Load-test history", None, 0)
+            for i in range(rows)
+            for _ in range(audit_per_row - 1)
+        )
+        conn.executemany("INSERT INTO audit(timestamp, approval_id, actor, action, message, meta, version) VALUES (?, ?, ?, ?, ?, ?, ?)", extra)
+        conn.commit()
+        conn.close()
+    time_shift(data.DB_PATH, distribution, seed_value)
+    return len(pending)
+
+
+def time_shift(path, distribution, seed_value=7, now=None):
+    """Reset every open approval to PENDING, unreminded, submitted at its seeded age before `now`.
+
+    Stored deadlines move with submitted_at and the change version is bumped,
+    so the agent selects them as it would at that age. Returns the number of
+    rows shifted.
+    """
+    from backend.data import bump_change_version, sla_deadlines, sla_warning_at
+
+    now = now or datetime.now(timezone.utc)
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT id, sla_hours FROM approvals WHERE status IN ('PENDING', 'ESCALATED')")
+        rows = cur.fetchall()
+        ages = _pending_ages(rows, distribution, seed_value)
+        version = bump_change_version(cur)
+        params = []
+        for aid, sla in rows:
+            submitted = (now - timedelta(hours=ages[aid])).isoformat()
+            params.append((submitted, *sla_deadlines(submitted, sla), sla_warning_at(submitted, sla), version, aid))
+        cur.executemany(
+            "UPDATE approvals SET status = 'PENDING', escalation_level = 0, last_reminder_at = NULL, "
+            "lease_token = NULL, lease_expires_at = NULL, submitted_at = ?, reminder_due_at = ?, sla_deadline = ?, sla_warning_at = ?, version = ? "
+            "WHERE id = ?",
+            params,
+        )
+        conn.commit()
+        return len(params)
+    finally:
+        conn.close()
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def _summary(name, latencies, busy_seconds, statuses, extra=None):
+    ordered = sorted(latencies)
+    ms = lambda v: round(1000 * v, 2)  # noqa: E731
+    return {
+        "scenario": name,
+        "requests": len(latencies),
+        "req_per_s": round(len(latencies) / busy_seconds, 1) if busy_seconds else 0.0,
+        "p50_ms": ms(_percentile(ordered, 0.50)),
+        "p95_ms": ms(_percentile(ordered, 0.95)),
+        "p99_ms": ms(_percentile(ordered, 0.99)),
+        "max_ms": ms(ordered[-1]) if ordered else 0.0,
+        "errors": sum(n for status, n in statuses.items() if status >= 400),
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+        **(extra or {}),
+    }
+
+
+async def run_scenario(client, name, requests, concurrency, warmup=2):
+    """Fire `requests` requests with `concurrency` in flight; wall time gives req/s."""
+    method, url, kwargs = SCENARIOS[name]
+    for _ in range(warmup):
+        await client.request(method, url, **kwargs)
+    latencies, statuses = [], Counter()
+    remaining = iter(range(requests))
+
+    async def worker():
+        for _ in remaining:
+            start = time.perf_counter()
+            r = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            statuses[r.status_code] += 1
+
+    began = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return _summary(name, latencies, time.perf_counter() - began, statuses)
+
+
+async def run_agent_scenario(client, path, requests, distribution):
+    """Serial agent passes over the same backlog; shifting it back is not timed."""
+    method, url, kwargs = SCENARIOS["agent_run"]
+    latencies, statuses, actions = [], Counter(), 0
+    for _ in range(requests):
+        await asyncio.to_thread(time_shift, path, distribution)
+        start = time.perf_counter()
+        r = await client.request(method, url, **kwargs)
+        latencies.append(time.perf_counter() - start)
+        statuses[r.status_code] += 1
+        if r.status_code == 200:
+            actions += len(r.json()["actions"])
+    busy = sum(latencies)
+    return _summary("agent_run", latencies, busy, statuses, {
+        "actions_per_pass": actions // max(1, requests),
+        "actions_per_s": round(actions / busy, 1) if busy else 0.0,
+    })
+
+
+async def run_target(client, path, args):
+    results = []
+    for name in args.scenarios:
+        if name == "agent_run":
+            results.append(await run_agent_scenario(client, path, args.agent_requests, args.distribution))
+        else:
+            results.append(await run_scenario(client, name, args.requests, args.concurrency))
+    return results
+
+
+async def run_inprocess(path, args):
+    from backend import data
+    from backend.main import app
+
+    data.DB_PATH = path
+    data.close_connections()
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=300) as client:
+            return await run_target(client, path, args)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextlib.asynccontextmanager
+async def serve_uvicorn(path, workers=1, connections=8):
+    """Run the app under uvicorn against `path`; yields an httpx client once it answers."""
+    port = _free_port()
+    env = {**os.environ, "APPROVALS_DB_PATH": path}
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits) as client:
+            deadline = time.monotonic() + 60
+            while True:
+                try:
+                    if (await client.get("/metrics")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if proc.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError(f"uvicorn did not start (exit code {proc.poll()})")
+                await asyncio.sleep(0.2)
+            yield client
+    finally:
+        proc.terminate()
+        proc.wait(10)
+
+
+async def run_uvicorn(path, args):
+    async with serve_uvicorn(path, args.workers, args.concurrency) as client:
+        return await run_target(client, path, args)
+
+
+def compare(results, baseline, tolerance):
+    """Rows whose p95 rose or whose req/s fell by more than `tolerance` against `baseline`."""
+    key = lambda r: (r["target"], r["rows"], r["scenario"])  # noqa: E731
+    before = {key(r): r for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        b = before.get(key(r))
+        if b is None:
+            continue
+        p95 = r["p95_ms"] / b["p95_ms"] if b["p95_ms"] else 1.0
+        rps = r["req_per_s"] / b["req_per_s"] if b["req_per_s"] else 1.0
+        if p95 > 1 + tolerance or rps < 1 - tolerance:
+            regressions.append({
+                "target": r["target"], "rows": r["rows"], "scenario": r["scenario"],
+                "p95_ms": [b["p95_ms"], r["p95_ms"]], "req_per_s": [b["req_per_s"], r["req_per_s"]],
+            })
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000])
+    parser.add_argument("--pending-ratio", type=float, default=0.02)
+    parser.add_argument("--audit-per-row", type=int, default=1)
+    parser.add_argument("--distribution", choices=sorted(DISTRIBUTIONS), default="recent")
+    parser.add_argument("--target", choices=["inprocess", "uvicorn"], nargs="+", default=["inprocess"])
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--scenarios", choices=list(SCENARIOS), nargs="+", default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--agent-requests", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--teams-latency", type=float, default=0.05)
+    parser.add_argument("--out", default=None, help="result file (default benchmarks/results/load-<UTC time>.json)")
+    parser.add_argument("--baseline", default=None, help="earlier result file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    llm = fake_llm_server.start(latency=args.llm_latency)
+    teams = fake_teams_server.start(latency=args.teams_latency)
+    workdir = tempfile.mkdtemp(prefix="approvals-load-")
+    os.environ.update({
+        "APPROVALS_DB_PATH": os.path.join(workdir, "bootstrap.db"),
+        "AZURE_OPENAI_API_KEY": "fake",
+        "AZURE_OPENAI_ENDPOINT": llm.url,
+        "AZURE_OPENAI_DEPLOYMENT": "fake",
+        "AZURE_OPENAI_API_VERSION": "2024-12-01-preview",
+        "AZURE_OPENAI_BACKOFF": "0.05",
+        "TEAMS_WEBHOOK_URL": teams.url,
+        "AGENT_SCHEDULER_ENABLED": "0",
+        "AUDIT_RETENTION_DAYS": "0",
+        "LOG_LEVEL": os.getenv("LOG_LEVEL", "WARNING"),
+    })
+    from backend import data
+
+    started = datetime.now(timezone.utc)
+    results = []
+    for rows in args.rows:
+        path = os.path.join(workdir, f"load-{rows}.db")
+        data.DB_PATH = path
+        data.close_connections()
+        seed_began = time.perf_counter()
+        pending = seed(rows, args.pending_ratio, args.audit_per_row, args.distribution)
+        seed_s = round(time.perf_counter() - seed_began, 2)
+        data.close_connections()
+        for target in args.target:
+            runner = run_inprocess if target == "inprocess" else run_uvicorn
+            with contextlib.redirect_stdout(io.StringIO()):
+                rows_results = asyncio.run(runner(path, args))
+            for r in rows_results:
+                results.append({"target": target, "rows": rows, "pending": pending, "seed_s": seed_s, **r})
+                print(f"{target:9} {rows:>8} rows  {r['scenario']:15} {r['req_per_s']:>9} req/s  "
+                      f"p50 {r['p50_ms']:>8} ms  p95 {r['p95_ms']:>8} ms  p99 {r['p99_ms']:>8} ms  errors {r['errors']}",
+                      file=sys.stderr)
+
+    report = {
+        "meta": {
+            "started_at": started.isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args),
+            "stubs": {"llm_completions": llm.completions, "teams_delivered": teams.delivered},
+        },
+        "results": results,
+    }
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["regressions"] = compare(results, json.load(f), args.tolerance)
+    out = args.out or os.path.join(ROOT, "benchmarks", "results", f"load-{started:%Y%m%dT%H%M%SZ}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    print(f"Results written to {out}", file=sys.stderr)
+    if report.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 import React, { useEffect, useState, useRef } from 'react';
 import { Layout, Button, Row, Col, Table, Tag, Timeline, Space, Form, Input, Card, message, Statistic, Progress, Avatar, Tooltip, Divider } from 'antd';
-import { listApprovals, createDummy, runAgent, listAudit, approve, login } from './api';
+import { getStats, listApprovalsPage, createDummy, runAgent, listAudit, approve, login, subscribeChanges } from './api';
 import {
   ClockCircleOutlined,
   UserOutlined,
@@ -17,6 +17,8 @@ import {
 
 const { Header, Content } = Layout;
 
+const PAGE_SIZE = 6;
+
 function formatPendingHours(submitted) {
   const then = new Date(submitted);
   const diff = (Date.now() - then.getTime()) / 3600 / 1000;
@@ -51,15 +53,25 @@ function SLAProgress({ approval }) {
 export default function App() {
   const [user, setUser] = useState(null);
   const [approvals, setApprovals] = useState([]);
+  const [summary, setSummary] = useState(null);
   const [audit, setAudit] = useState([]);
+  // Keyset pagination: cursors of the pages visited so far (null = first page).
+  const [cursors, setCursors] = useState([null]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const cursorsRef = useRef([null]);
   const pollingRef = useRef(null);
 
   const load = async () => {
     if (!user) return;
     try {
       const filter = user?.role === 'REQUESTER' ? user.username : null;
-      const a = await listApprovals(filter);
-      setApprovals(a);
+      const stack = cursorsRef.current;
+      const page = await listApprovalsPage({ requester: filter, limit: PAGE_SIZE, cursor: stack[stack.length - 1] });
+      setApprovals(page.items);
+      setNextCursor(page.nextCursor);
+      // Stat cards come from the server-side rollups, not the full list
+      const s = await getStats(filter);
+      setSummary(s);
       const au = await listAudit();
       setAudit(au);
     } catch (err) {
@@ -67,11 +79,23 @@ export default function App() {
     }
   };
 
+  const goToPage = (stack) => {
+    cursorsRef.current = stack;
+    setCursors(stack);
+    load();
+  };
+
   useEffect(() => {
     if (user) {
       load();
-      pollingRef.current = setInterval(load, 5000);
-      return () => clearInterval(pollingRef.current);
+      // Reload only when the backend reports a write. The slow poll is a
+      // safety net; unchanged data comes back as 304 via the ETag.
+      const unsubscribe = subscribeChanges(() => load());
+      pollingRef.current = setInterval(load, 60000);
+      return () => {
+        unsubscribe();
+        clearInterval(pollingRef.current);
+      };
     }
   }, [user]);
 
@@ -88,6 +112,8 @@ export default function App() {
   const onLogout = () => {
     setUser(null);
     clearInterval(pollingRef.current);
+    cursorsRef.current = [null];
+    setCursors([null]);
   };
 
   const onCreate = async () => {
@@ -117,14 +143,12 @@ export default function App() {
   const isApprover = ['APPROVER', 'CHAIR', 'FINANCE'].includes(user?.role);
 
   // Stats calculation
+  const byStatus = summary?.approvals.by_status || {};
   const stats = {
-    pending: approvals.filter(a => a.status === 'PENDING').length,
-    warnings: approvals.filter(a => {
-      const p = parseFloat(formatPendingHours(a.submitted_at));
-      return a.status === 'PENDING' && p >= (a.sla_hours * 0.5) && p < a.sla_hours;
-    }).length,
-    breached: approvals.filter(a => a.status === 'ESCALATED' || parseFloat(formatPendingHours(a.submitted_at)) >= a.sla_hours).length,
-    totalValue: approvals.reduce((acc, curr) => acc + curr.amount, 0).toLocaleString()
+    pending: byStatus.PENDING || 0,
+    warnings: summary?.sla.warning || 0,
+    breached: (byStatus.ESCALATED || 0) + (summary?.sla.breached || 0),
+    totalValue: (summary?.approvals.amount || 0).toLocaleString()
   };
 
   const columns = [
@@ -310,8 +334,19 @@ export default function App() {
                 dataSource={approvals}
                 columns={columns}
                 rowKey="id"
-                pagination={{ pageSize: 6 }}
+                pagination={false}
               />
+              <Row justify="end" style={{ marginTop: 16 }}>
+                <Space>
+                  <Button disabled={cursors.length <= 1} onClick={() => goToPage(cursors.slice(0, -1))}>
+                    Previous
+                  </Button>
+                  <span style={{ color: '#64748b' }}>Page {cursors.length}</span>
+                  <Button disabled={!nextCursor} onClick={() => goToPage([...cursors, nextCursor])}>
+                    Next
+                  </Button>
+                </Space>
+              </Row>
             </Card>
           </Col>
 